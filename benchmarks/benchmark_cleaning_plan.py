@@ -0,0 +1,87 @@
+"""Measures the column rewrite stage of a cleaning plan on a wide table,
+run serially, on threads only and on threads with worker processes.
+
+Each rewrite kind gets its own table of text columns, so the timings show
+which kinds threads speed up and which only speed up in processes. Every
+number is measured on this machine; nothing is extrapolated, and with a
+single core no pool can be faster than the serial run.
+
+Run from the repository root:
+
+    python -m benchmarks.benchmark_cleaning_plan --rows 50000 --columns 120
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from core.configuration_enums import Configuration
+from services import cleaning_plan
+from services.cleaning_plan import build_cleaning_plan
+
+
+def make_table(kind: str, rows: int, columns: int, rng: np.random.Generator) -> tuple[pd.DataFrame, dict]:
+    """Builds a table of text columns and the option that rewrites each."""
+    if kind == "int64":
+        make_values = lambda: rng.integers(0, 10 ** 6, rows).astype(str)
+        option = {Configuration.DATA_TYPE: "int64"}
+    elif kind == "datetime64[ns]":
+        dates = pd.date_range("2000-01-01", periods=rows, freq="min").strftime("%Y-%m-%d %H:%M").to_numpy()
+        make_values = lambda: rng.permutation(dates)
+        option = {Configuration.DATA_TYPE: "datetime64[ns]"}
+    elif kind == "category":
+        make_values = lambda: rng.choice([f"value {i}" for i in range(50)], rows)
+        option = {Configuration.DATA_TYPE: "category"}
+    elif kind == "truncate":
+        make_values = lambda: rng.integers(10 ** 5, 10 ** 6, rows).astype(str)
+        option = {Configuration.DATA_TYPE: "string", Configuration.STRING_MAX: "3"}
+    else:
+        canonical = [f"canonical{i}" for i in range(100)]
+        make_values = lambda: rng.choice([f"canonicl{i}" for i in range(1000)], rows)
+        option = {Configuration.DATA_TYPE: "category", Configuration.CATEGORIES: " ".join(canonical)}
+
+    table = pd.DataFrame({f"column_{i}": pd.Series(make_values(), dtype=object) for i in range(columns)})
+    config = {
+        Configuration.COLUMNS: {column: dict(option) for column in table.columns},
+        Configuration.DELETE_DUPLICATES: False,
+        Configuration.DROP_MISSING: False,
+        Configuration.IMPUTE_MISSING_MEAN: False,
+        Configuration.IMPUTE_MISSING_MEDIAN: False
+    }
+    return table, config
+
+
+def timed(table: pd.DataFrame, config: dict, workers: int, min_process_values: int) -> tuple[float, pd.DataFrame]:
+    cleaning_plan.PROCESS_POOL_MIN_VALUES = min_process_values
+    plan = build_cleaning_plan(config)
+    start = time.perf_counter()
+    cleaned = plan.execute(table, workers=workers)
+    return time.perf_counter() - start, cleaned
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--columns", type=int, default=120)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{args.columns} columns x {args.rows:,} rows, {args.workers} workers, {os.cpu_count()} CPUs")
+    print(f"{'rewrite':<18}{'serial':>10}{'threads':>10}{'processes':>11}{'thread x':>10}{'process x':>11}")
+    rng = np.random.default_rng(args.seed)
+    for kind in ("int64", "datetime64[ns]", "category", "truncate", "categories"):
+        table, config = make_table(kind, args.rows, args.columns, rng)
+        serial, expected = timed(table, config, 1, cleaning_plan.PROCESS_POOL_MIN_VALUES)
+        threads, threaded = timed(table, config, args.workers, np.iinfo(np.int64).max)
+        processes, separated = timed(table, config, args.workers, 0)
+        pd.testing.assert_frame_equal(threaded, expected)
+        pd.testing.assert_frame_equal(separated, expected)
+        print(f"{kind:<18}{serial:>9.2f}s{threads:>9.2f}s{processes:>10.2f}s"
+              f"{serial / threads:>9.2f}x{serial / processes:>10.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Measures category autocorrection on a high-cardinality column, reporting
+the two sources of speedup separately.
+
+The kernel section scores the same (distinct value, canonical value) pairs
+with fuzzywuzzy, the pure-Python fallback and rapidfuzz, and reports the
+time per pair. The deduplication section runs the current backend once per
+row and once per distinct value on the whole column. Every number is
+measured; nothing is extrapolated.
+
+Run from the repository root:
+
+    python -m benchmarks.benchmark_string_similarity --rows 50000 --distinct 2000
+"""
+import argparse
+import random
+import string
+import time
+
+import pandas as pd
+from fuzzywuzzy import fuzz as fuzzywuzzy_scorers
+
+import core.string_similarity as string_similarity
+from core.category_correction import autocorrect_column
+from core.string_similarity import BACKEND, cdist, extract_one, preprocess
+
+
+def make_column(rows: int, distinct: int, canonical: list[str], seed: int) -> pd.Series:
+    """Builds a categorical column of misspelled canonical values."""
+    rng = random.Random(seed)
+
+    def misspell(value: str) -> str:
+        position = rng.randrange(len(value))
+        return value[:position] + rng.choice(string.ascii_lowercase) + value[position + 1:]
+
+    dirty = [misspell(rng.choice(canonical)) for _ in range(distinct)]
+    return pd.Series(rng.choices(dirty, k=rows), dtype="category")
+
+
+def timed(function, *args) -> tuple[float, object]:
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+def report(label: str, seconds: float, pairs: int = None):
+    per_pair = f"{seconds / pairs * 1e6:>12.2f} us/pair" if pairs else ""
+    print(f"{label:<44}{seconds:>10.3f}s{per_pair}")
+
+
+def benchmark_kernels(queries: list[str], canonical: list[str], scorer: str):
+    """Scores every query against every canonical value, one pair at a time
+    for the per-pair scorers and in one batch for cdist."""
+    queries, canonical = [preprocess(query) for query in queries], [preprocess(value) for value in canonical]
+    pairs = len(queries) * len(canonical)
+    print(f"Kernel: {scorer} on {pairs:,} preprocessed pairs")
+
+    def score_pairs(scorer_function):
+        return [[scorer_function(query, choice) for choice in canonical] for query in queries]
+
+    fuzzywuzzy_scorer = getattr(fuzzywuzzy_scorers, scorer)
+    report("fuzzywuzzy, per pair", timed(score_pairs, lambda a, b: fuzzywuzzy_scorer(a, b, full_process=False))[0],
+           pairs)
+    report("pure-Python fallback, per pair", timed(score_pairs, string_similarity._PYTHON_SCORERS[scorer])[0], pairs)
+    if BACKEND == "rapidfuzz":
+        report("rapidfuzz, per pair", timed(score_pairs, string_similarity.get_scorer(scorer))[0], pairs)
+        report("rapidfuzz cdist, one batch", timed(cdist, queries, canonical, scorer)[0], pairs)
+
+
+def benchmark_deduplication(series: pd.Series, canonical: list[str], scorer: str):
+    """Corrects the whole column row by row and once per distinct value with
+    the current backend, so only the number of comparisons differs."""
+    distinct = series.cat.categories.size
+    print(f"Deduplication: {len(series):,} rows, {distinct:,} distinct values, {BACKEND} backend")
+
+    def row_wise(values: list[str]) -> list[str]:
+        corrected = []
+        for value in values:
+            match = extract_one(value, canonical, scorer, 80)
+            corrected.append(match[0] if match else value)
+        return corrected
+
+    rows = len(series)
+    report("extract_one per row", timed(row_wise, series.astype(str).tolist())[0], rows * len(canonical))
+    seconds, (_, changed) = timed(autocorrect_column, series, canonical, 80, scorer)
+    report("autocorrect_column, per distinct value", seconds, distinct * len(canonical))
+    print(f"{changed:,} rows corrected")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--distinct", type=int, default=2_000)
+    parser.add_argument("--canonical", type=int, default=200)
+    parser.add_argument("--kernel-queries", type=int, default=200,
+                        help="distinct values scored against every canonical value in the kernel section")
+    parser.add_argument("--scorer", choices=string_similarity.SCORERS, default=string_similarity.DEFAULT_SCORER)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    canonical = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(6, 14))) for _ in range(args.canonical)]
+    series = make_column(args.rows, args.distinct, canonical, args.seed)
+
+    benchmark_kernels(series.cat.categories[:args.kernel_queries].tolist(), canonical, args.scorer)
+    print()
+    benchmark_deduplication(series, canonical, args.scorer)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""Headless cleaning runner.
+
+Loads tables from files or a PostgreSQL database, applies a saved cleaning
+and analytics configuration with the same services the GUI uses, and writes
+the cleaned tables and a JSON report of statistics. It only imports the
+core and services packages, which do not depend on Qt, so it runs in batch
+jobs and containers without a display or the Qt libraries.
+
+Example:
+    python cli.py orders.csv customers.csv --config config.json --output-dir cleaned
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+_DELIMITERS = {"comma": ",", "tab": "\t", "space": " "}
+
+
+def parse_args(argv: list[str] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="cli.py",
+        description="Clean tables without the GUI using a saved cleaning and analytics configuration."
+    )
+    parser.add_argument("sources", nargs="*", help="CSV files to clean (Parquet is also accepted with --stream)")
+    parser.add_argument(
+        "--config",
+        required=True,
+        help="configuration file saved by the GUI with the cleaning script, or a JSON object with "
+             "\"cleaning\" and \"analytics\" sections"
+    )
+    parser.add_argument("--output-dir", default="cleaned", help="folder for the cleaned tables (default: cleaned)")
+    parser.add_argument("--format", choices=("csv", "parquet"), default="csv", help="output file format")
+    parser.add_argument("--report", help="JSON file for the cleaning and analytics statistics")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="tables cleaned at the same time")
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="clean files chunk by chunk instead of loading them, for files larger than memory (no analytics)"
+    )
+    parser.add_argument("--chunk-size", type=int, default=100_000, help="rows per chunk with --stream")
+    parser.add_argument(
+        "--corrections",
+        help="JSON store of remembered category corrections (default: the GUI's store)"
+    )
+    parser.add_argument("--no-corrections", action="store_true", help="do not read or record category corrections")
+
+    csv_group = parser.add_argument_group("CSV options")
+    csv_group.add_argument("--delimiter", choices=tuple(_DELIMITERS), default="comma")
+    csv_group.add_argument("--quotechar", default='"')
+    csv_group.add_argument("--escapechar", default=None)
+    csv_group.add_argument("--no-doublequote", action="store_true")
+
+    db_group = parser.add_argument_group(
+        "database options",
+        "Load every table in the public schema instead of files. The password is read from the "
+        "CLEANING_ASSISTANT_DB_PASSWORD environment variable."
+    )
+    db_group.add_argument("--db-name")
+    db_group.add_argument("--db-user")
+    db_group.add_argument("--db-host", default="localhost")
+    db_group.add_argument("--db-port", type=int, default=5432)
+
+    args = parser.parse_args(argv)
+    if not args.sources and not args.db_name:
+        parser.error("give at least one source file or --db-name")
+    if args.sources and args.db_name:
+        parser.error("give either source files or --db-name, not both")
+    if args.stream and args.db_name:
+        parser.error("--stream only works with source files")
+    return args
+
+
+def analyze_table(analytics_service, table_name: str, analytics_config: dict) -> dict:
+    """Calculates the configured statistics for a table, as the cleaning
+    worker does after a run. Plots are left out."""
+    from core.configuration_enums import Configuration
+
+    analytics_service.set_table(table_name)
+    analytics_service.set_analytics_config(analytics_config)
+
+    if analytics_config[Configuration.ANALYZE_MISSINGNESS]:
+        analytics_service.calculate_missingness_stats()
+    if analytics_config[Configuration.ANALYZE_CATEGORIES]:
+        analytics_service.calculate_category_stats()
+    if analytics_config[Configuration.ANALYZE_OUTLIERS]:
+        analytics_service.calculate_outlier_stats()
+
+    return analytics_service.statistics
+
+
+def write_table(table, path: str):
+    if path.endswith(".parquet"):
+        table.to_parquet(path, index=False)
+    else:
+        table.to_csv(path, index=False)
+
+
+def to_json(value):
+    """Converts numpy and pandas values in a report to plain JSON types."""
+    if isinstance(value, dict):
+        return {str(key): to_json(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_json(item) for item in value]
+    if hasattr(value, "item"):
+        return value.item()
+    return value
+
+
+def run(args: argparse.Namespace) -> int:
+    from core.config_serializer import load_config_file
+    from core.correction_store import CorrectionStore
+    from core.table_store import TableStore
+    from services.analytics_service import AnalyticsService
+    from services.batch_cleaning import apply_config_template, summarize_batch
+    from services.data_cleaning_service import DataCleaningService
+    from services.database_service import DatabaseService
+    from services.streaming_cleaner import read_columns
+
+    started = time.perf_counter()
+    cleaning_config, analytics_config = load_config_file(args.config)
+    csv_config = {
+        "sep": _DELIMITERS[args.delimiter],
+        "escapechar": args.escapechar,
+        "quotechar": args.quotechar,
+        "doublequote": not args.no_doublequote
+    }
+
+    correction_store = None
+    if not args.no_corrections:
+        correction_store = CorrectionStore(args.corrections) if args.corrections else CorrectionStore()
+
+    model = TableStore()
+    data_cleaning_service = DataCleaningService(model, correction_store)
+    os.makedirs(args.output_dir, exist_ok=True)
+    report = {"tables": {}}
+
+    if args.stream:
+        for source in args.sources:
+            name = os.path.splitext(os.path.basename(source))[0]
+            destination = os.path.join(args.output_dir, f"{name}.{args.format}")
+            config = apply_config_template(cleaning_config, read_columns(source, csv_config))
+            cleaner = data_cleaning_service.create_streaming_cleaner(config, args.chunk_size, csv_config)
+            for _ in cleaner.clean_file(source, destination):
+                pass
+            report["tables"][name] = {"cleaning": cleaner.stats, "output": destination}
+            print(f"{name}: {cleaner.stats['rows_read']:,} rows read, {cleaner.stats['rows_written']:,} written")
+    else:
+        database_service = DatabaseService(model)
+        if args.db_name:
+            database_service.load_from_database({
+                "db_name": args.db_name,
+                "user": args.db_user,
+                "host": args.db_host,
+                "password": os.environ.get("CLEANING_ASSISTANT_DB_PASSWORD", ""),
+                "port": args.db_port
+            })
+        else:
+            database_service.load_from_files(args.sources, csv_config)
+
+        configs = {
+            table_name: apply_config_template(cleaning_config, list(table.columns))
+            for table_name, table in model.get_database().items()
+        }
+        results = data_cleaning_service.clean_tables(configs, args.workers)
+        report["summary"] = summarize_batch(results)
+
+        analytics_service = AnalyticsService(model)
+        for table_name, result in results.items():
+            entry = {"cleaning": result}
+            if result["error"] is None:
+                entry["analytics"] = analyze_table(analytics_service, table_name, analytics_config)
+                entry["output"] = os.path.join(args.output_dir, f"{table_name}.{args.format}")
+                write_table(model.get_table(table_name), entry["output"])
+                print(f"{table_name}: {result['rows_before']:,} rows cleaned to {result['rows_after']:,}")
+            else:
+                print(f"{table_name}: failed: {result['error']}", file=sys.stderr)
+            report["tables"][table_name] = entry
+
+    report["seconds"] = round(time.perf_counter() - started, 3)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as file:
+            json.dump(to_json(report), file, indent=2)
+
+    return 1 if report.get("summary", {}).get("failed") else 0
+
+
+def main(argv: list[str] = None) -> int:
+    args = parse_args(argv)
+    try:
+        return run(args)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
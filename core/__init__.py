@@ -0,0 +1,7 @@
+from .table_store import TableStore
+from .category_index import CategoryIndex
+from .category_correction import autocorrect_column, build_correction_map
+from .config_serializer import load_config_file, save_config_file, serialize_configs, deserialize_configs
+from .configuration_enums import Configuration
+from .correction_store import CorrectionStore
+from .string_similarity import cdist, extract, extract_one
@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+from pandas import Series
+
+from core.category_index import CategoryIndex
+from core.string_similarity import DEFAULT_SCORER, cdist
+
+# Similarity score a value must reach before it is replaced by a correct category
+DEFAULT_SCORE_CUTOFF = 80
+
+# Vocabularies larger than this are matched through an n-gram index instead of all pairs
+INDEX_THRESHOLD = 500
+
+
+def build_correction_map(
+        values: list[str],
+        choices: list[str],
+        score_cutoff: int = DEFAULT_SCORE_CUTOFF,
+        scorer: str = DEFAULT_SCORER,
+        index: CategoryIndex = None
+) -> dict[str, str]:
+    """Maps each distinct value to its best matching choice, leaving out
+    values whose best score falls below the cutoff or that already match.
+    Large vocabularies are searched through an n-gram index, built here
+    unless one over the same choices is passed in."""
+    if not len(values) or not len(choices):
+        return {}
+
+    if index is None and len(choices) > INDEX_THRESHOLD:
+        index = CategoryIndex(choices)
+
+    if index is not None:
+        correction_map = {}
+        for value in values:
+            match = index.extract_one(value, scorer, score_cutoff)
+            if match and match[0] != value:
+                correction_map[value] = match[0]
+        return correction_map
+
+    scores = cdist(values, choices, scorer, score_cutoff)
+    best = scores.argmax(axis=1)
+    best_scores = scores[np.arange(len(values)), best]
+
+    return {
+        value: choices[choice]
+        for value, choice, score in zip(values, best, best_scores)
+        if score >= score_cutoff and score > 0 and value != choices[choice]
+    }
+
+
+def autocorrect_column(
+        series: Series,
+        choices: list[str],
+        score_cutoff: int = DEFAULT_SCORE_CUTOFF,
+        scorer: str = DEFAULT_SCORER,
+        index: CategoryIndex = None
+) -> tuple[Series, int]:
+    """Corrects a categorical column towards the given categories. Matching
+    runs once per category in use instead of once per row, and the result
+    is rebuilt from the category codes. Returns the corrected column and the
+    number of rows that changed. Missing values are left as they are."""
+    correction_map = build_correction_map(get_used_categories(series), list(choices), score_cutoff, scorer, index)
+    return apply_correction_map(series, correction_map)
+
+
+def get_used_categories(series: Series) -> list[str]:
+    """Returns the distinct values of a column as strings, leaving out
+    categories that no row uses."""
+    if not series.dtype == "category":
+        series = series.astype("category")
+
+    codes = series.cat.codes.to_numpy()
+    counts = np.bincount(codes[codes >= 0], minlength=len(series.cat.categories))
+    return series.cat.categories.astype(str)[counts > 0].tolist()
+
+
+def apply_correction_map(series: Series, correction_map: dict[str, str]) -> tuple[Series, int]:
+    """Renames the values of a column through a correction map by remapping
+    its category codes. Returns the corrected categorical column and the
+    number of rows that changed."""
+    if not series.dtype == "category":
+        series = series.astype("category")
+
+    categories = series.cat.categories.astype(str)
+    codes = series.cat.codes.to_numpy()
+    counts = np.bincount(codes[codes >= 0], minlength=len(categories))
+
+    corrected = np.array([correction_map.get(category, category) for category in categories], dtype=object)
+    new_categories = np.array(sorted(set(corrected[counts > 0])), dtype=object)
+
+    # Translate old codes to new ones through a lookup table, keeping -1 for missing values
+    lookup = np.append(np.searchsorted(new_categories, corrected), -1) if len(new_categories) else np.array([-1])
+    new_codes = lookup[codes]
+
+    result = Series(
+        pd.Categorical.from_codes(new_codes, categories=pd.Index(new_categories, dtype=object)),
+        index=series.index,
+        name=series.name
+    )
+    changed = int(counts[corrected != categories.to_numpy(dtype=object)].sum())
+
+    return result, changed
@@ -0,0 +1,102 @@
+from collections import defaultdict
+
+import numpy as np
+
+from core.string_similarity import DEFAULT_SCORER, cdist, preprocess
+
+
+class CategoryIndex:
+    """A character n-gram inverted index over a list of canonical values.
+    Lookups first narrow the vocabulary to the few values sharing the most
+    n-grams with the query, then score only those candidates exactly, so
+    matching stays fast with tens of thousands of canonical values."""
+
+    def __init__(self, choices: list[str], n: int = 3, max_posting_fraction: float = 0.1):
+        self._choices = list(choices)
+        self._n = n
+
+        postings = defaultdict(list)
+        self._gram_counts = np.zeros(len(self._choices), dtype=np.int32)
+        for position, choice in enumerate(self._choices):
+            grams = self.get_ngrams(choice)
+            self._gram_counts[position] = len(grams)
+            for gram in grams:
+                postings[gram].append(position)
+
+        # N-grams shared by a large part of the vocabulary say little about a match, so they are only
+        # consulted when a query has no other n-grams
+        common_size = max(int(len(self._choices) * max_posting_fraction), 50)
+        self._postings = {gram: np.array(positions, dtype=np.int32) for gram, positions in postings.items()}
+        self._common = {gram for gram, positions in self._postings.items() if len(positions) > common_size}
+
+    def __len__(self) -> int:
+        return len(self._choices)
+
+    @property
+    def choices(self) -> list[str]:
+        return self._choices
+
+    def get_ngrams(self, value: str) -> set[str]:
+        """Returns the distinct n-grams of a normalized value, padded so that
+        the start and end of each word are represented."""
+        padded = f" {preprocess(str(value))} "
+        if len(padded) <= self._n:
+            return {padded}
+        return {padded[i:i + self._n] for i in range(len(padded) - self._n + 1)}
+
+    def candidates(self, query: str, limit: int = 25) -> np.ndarray:
+        """Returns the positions of up to `limit` canonical values with the
+        highest n-gram overlap (Jaccard) with the query, best first."""
+        grams = self.get_ngrams(query)
+        known = [gram for gram in grams if gram in self._postings]
+        selective = [gram for gram in known if gram not in self._common] or known
+        if not selective:
+            return np.array([], dtype=np.int32)
+
+        positions, shared = np.unique(
+            np.concatenate([self._postings[gram] for gram in selective]),
+            return_counts=True
+        )
+        similarity = shared / (len(grams) + self._gram_counts[positions] - shared)
+
+        if len(positions) > limit:
+            top = np.argpartition(-similarity, limit - 1)[:limit]
+            positions, similarity = positions[top], similarity[top]
+
+        return positions[np.argsort(-similarity, kind="stable")]
+
+    def extract(
+            self,
+            query: str,
+            scorer: str = DEFAULT_SCORER,
+            score_cutoff: float = 0,
+            limit: int = 5,
+            candidate_limit: int = 25
+    ) -> list[tuple[str, float, int]]:
+        """Returns up to `limit` (choice, score, index) matches for the query,
+        scoring only the n-gram candidates. Scores below the cutoff are left
+        out."""
+        positions = self.candidates(query, max(candidate_limit, limit))
+        if not len(positions):
+            return []
+
+        scores = cdist([query], [self._choices[position] for position in positions], scorer, score_cutoff)[0]
+        order = np.argsort(-scores, kind="stable")[:limit]
+
+        return [
+            (self._choices[positions[i]], float(scores[i]), int(positions[i]))
+            for i in order
+            if scores[i] >= score_cutoff and scores[i] > 0
+        ]
+
+    def extract_one(
+            self,
+            query: str,
+            scorer: str = DEFAULT_SCORER,
+            score_cutoff: float = 0,
+            candidate_limit: int = 25
+    ) -> tuple[str, float, int] | None:
+        """Returns the best (choice, score, index) match for the query, or
+        None if no candidate reaches the cutoff."""
+        matches = self.extract(query, scorer, score_cutoff, 1, candidate_limit)
+        return matches[0] if matches else None
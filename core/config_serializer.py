@@ -0,0 +1,136 @@
+import json
+import os
+from datetime import datetime, timezone
+
+from core.configuration_enums import Configuration
+
+CONFIG_FORMAT = "cleaning_assistant.config"
+CONFIG_VERSION = 1
+
+_CLEANING_OPTIONS = (
+    Configuration.DELETE_DUPLICATES,
+    Configuration.DROP_MISSING,
+    Configuration.IMPUTE_MISSING_MEAN,
+    Configuration.IMPUTE_MISSING_MEDIAN
+)
+_ANALYTICS_OPTIONS = (
+    Configuration.ANALYZE_MISSINGNESS,
+    Configuration.ANALYZE_CATEGORIES,
+    Configuration.ANALYZE_OUTLIERS
+)
+_COLUMN_OPTIONS = {
+    Configuration.DATA_TYPE,
+    Configuration.INT_MIN,
+    Configuration.INT_MAX,
+    Configuration.FLOAT_MIN,
+    Configuration.FLOAT_MAX,
+    Configuration.STRING_MAX,
+    Configuration.DATE_MIN,
+    Configuration.DATE_MAX,
+    Configuration.CATEGORIES,
+    Configuration.ANALYZE_DISTRIBUTION
+}
+
+
+def encode_config(config: dict) -> dict:
+    """Converts a Configuration-keyed config into JSON types, using each
+    option's value as its key."""
+    encoded = {key.value: value for key, value in config.items() if key != Configuration.COLUMNS}
+    encoded[Configuration.COLUMNS.value] = {
+        str(column): {key.value: value for key, value in options.items()}
+        for column, options in config.get(Configuration.COLUMNS, {}).items()
+    }
+    return encoded
+
+
+def decode_config(data: dict, options: tuple) -> dict:
+    """Converts an encoded config back to Configuration keys. General options
+    that are missing are turned off, and unknown options raise a
+    ValueError."""
+    def to_option(key: str, allowed) -> Configuration:
+        try:
+            option = Configuration(key)
+        except ValueError:
+            raise ValueError(f"Unknown configuration option \"{key}\".") from None
+        if option not in allowed:
+            raise ValueError(f"The \"{key}\" option is not allowed here.")
+        return option
+
+    config = {option: False for option in options}
+    for key, value in data.items():
+        if key != Configuration.COLUMNS.value:
+            config[to_option(key, options)] = value
+
+    config[Configuration.COLUMNS] = {
+        column: {to_option(key, _COLUMN_OPTIONS): value for key, value in column_options.items()}
+        for column, column_options in data.get(Configuration.COLUMNS.value, {}).items()
+    }
+    return config
+
+
+def serialize_configs(
+        cleaning_config: dict,
+        analytics_config: dict = None,
+        table_name: str = None,
+        columns: list[str] = None
+) -> dict:
+    """Returns a versioned, JSON-ready document holding a cleaning and an
+    optional analytics configuration, with the table they were made for."""
+    return {
+        "format": CONFIG_FORMAT,
+        "version": CONFIG_VERSION,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "table": table_name,
+        "columns": [str(column) for column in columns] if columns is not None else None,
+        "cleaning": encode_config(cleaning_config),
+        "analytics": encode_config(analytics_config) if analytics_config is not None else None
+    }
+
+
+def deserialize_configs(data: dict) -> tuple[dict, dict]:
+    """Reads the cleaning and analytics configurations from a document made by
+    serialize_configs. Documents without a version, which only have the
+    "cleaning" and "analytics" sections, are read as well."""
+    if not isinstance(data, dict):
+        raise ValueError("A configuration file must contain a JSON object.")
+
+    version = data.get("version", 0)
+    if version:
+        if data.get("format") != CONFIG_FORMAT:
+            raise ValueError("The file is not a cleaning assistant configuration.")
+        if version > CONFIG_VERSION:
+            raise ValueError(
+                f"The configuration uses format version {version}, but only versions up to "
+                f"{CONFIG_VERSION} can be read. Update the application to use it."
+            )
+
+    cleaning = decode_config(data.get("cleaning") or {}, _CLEANING_OPTIONS)
+    analytics = decode_config(data.get("analytics") or {}, _ANALYTICS_OPTIONS)
+    return cleaning, analytics
+
+
+def save_config_file(
+        path: str,
+        cleaning_config: dict,
+        analytics_config: dict = None,
+        table_name: str = None,
+        columns: list[str] = None
+):
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(serialize_configs(cleaning_config, analytics_config, table_name, columns), file, indent=2)
+
+
+def load_config_file(path: str) -> tuple[dict, dict]:
+    """Reads a saved configuration file, returning the cleaning and analytics
+    configurations."""
+    with open(path, "r", encoding="utf-8") as file:
+        try:
+            data = json.load(file)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"The configuration file is not valid JSON: {e}") from None
+
+    return deserialize_configs(data)
@@ -0,0 +1,88 @@
+import json
+import os
+import threading
+
+default_store_path = os.path.join(os.path.expanduser("~"), ".cleaning_assistant", "corrections.json")
+
+
+class CorrectionStore:
+    """Remembers accepted category corrections between sessions. Mappings
+    are kept per key, which is either a column name or the name of a shared
+    vocabulary, and saved as JSON after every change."""
+
+    def __init__(self, path: str = default_store_path):
+        self._path = path
+        self._lock = threading.Lock()
+        self._corrections: dict[str, dict[str, str]] = {}
+        self.load()
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    def load(self):
+        """Reads the saved corrections, starting empty if the file is missing
+        or unreadable."""
+        try:
+            with open(self._path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            data = {}
+
+        with self._lock:
+            self._corrections = {
+                key: {str(value): str(correction) for value, correction in mapping.items()}
+                for key, mapping in data.get("corrections", {}).items()
+                if isinstance(mapping, dict)
+            }
+
+    def save(self):
+        with self._lock:
+            data = {"corrections": self._corrections}
+            folder = os.path.dirname(self._path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+
+            # Write to a temporary file first so an interrupted save never leaves a truncated store
+            temp_path = f"{self._path}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as file:
+                json.dump(data, file, indent=2, sort_keys=True)
+            os.replace(temp_path, self._path)
+
+    def get_corrections(self, key: str) -> dict[str, str]:
+        with self._lock:
+            return dict(self._corrections.get(key, {}))
+
+    def get_keys(self) -> list[str]:
+        with self._lock:
+            return sorted(self._corrections)
+
+    def record(self, key: str, correction_map: dict) -> int:
+        """Adds accepted corrections under the key and saves the store.
+        Returns the number of mappings that were new or changed."""
+        updates = {
+            str(value): str(correction)
+            for value, correction in correction_map.items()
+            if str(value) != str(correction)
+        }
+
+        with self._lock:
+            mapping = self._corrections.setdefault(key, {})
+            changed = {value: correction for value, correction in updates.items() if mapping.get(value) != correction}
+            mapping.update(changed)
+
+        if changed:
+            self.save()
+        return len(changed)
+
+    def forget(self, key: str, values: list[str] = None):
+        """Removes the corrections for some values under the key, or the
+        whole key when no values are given."""
+        with self._lock:
+            if values is None:
+                self._corrections.pop(key, None)
+            else:
+                mapping = self._corrections.get(key, {})
+                for value in values:
+                    mapping.pop(str(value), None)
+        self.save()
@@ -0,0 +1,273 @@
+import re
+
+import numpy as np
+
+# Scores come from rapidfuzz's compiled kernels; rapidfuzz is listed in
+# requirements.txt. The pure-Python scorers below are only a fallback for
+# environments where it cannot be installed. They give identical scores,
+# which the tests check against rapidfuzz, but are far slower on large
+# vocabularies.
+try:
+    from rapidfuzz import fuzz as _fuzz, process as _process
+
+    BACKEND = "rapidfuzz"
+except ImportError:
+    _fuzz = _process = None
+    BACKEND = "python"
+
+SCORERS = ("ratio", "partial_ratio", "token_sort_ratio", "token_set_ratio", "WRatio")
+DEFAULT_SCORER = "WRatio"
+
+_NON_ALPHANUMERIC = re.compile(r"(?ui)\W")
+
+
+def preprocess(value: str) -> str:
+    """Normalizes a string before scoring: non-alphanumeric characters are
+    replaced by spaces, then the string is trimmed and lowercased. Both
+    backends score strings processed by this function only."""
+    return _NON_ALPHANUMERIC.sub(" ", value).strip().lower()
+
+
+def _lcs_length(first: str, second: str) -> int:
+    """Length of the longest common subsequence, using the bit-parallel
+    algorithm of Hyyrö with one bit per character of first."""
+    if not first or not second:
+        return 0
+
+    masks = {}
+    bit = 1
+    for character in first:
+        masks[character] = masks.get(character, 0) | bit
+        bit <<= 1
+
+    full = (1 << len(first)) - 1
+    row = full
+    for character in second:
+        matches = row & masks.get(character, 0)
+        row = ((row + matches) | (row - matches)) & full
+
+    return len(first) - row.bit_count()
+
+
+def _ratio(first: str, second: str) -> float:
+    # Normalized Indel similarity, computed in the same order as rapidfuzz
+    total = len(first) + len(second)
+    if not total:
+        return 100.0
+    distance = total - 2 * _lcs_length(first, second)
+    return (1.0 - distance / total) * 100
+
+
+def _norm_distance(distance: int, total: int) -> float:
+    return 100 - 100 * distance / total if total else 100
+
+
+def _partial_ratio_shorter(shorter: str, longer: str) -> float:
+    """Best ratio of shorter against the windows of longer with its length,
+    and the prefixes and suffixes of longer shorter than that. Windows
+    ending (or, for suffixes, starting) with a character shorter does not
+    contain are skipped."""
+    characters = set(shorter)
+    length, longer_length = len(shorter), len(longer)
+    best = 0.0
+
+    for end in range(1, length):
+        if longer[end - 1] in characters:
+            best = max(best, _ratio(shorter, longer[:end]))
+            if best == 100:
+                return best
+
+    for start in range(longer_length - length):
+        if longer[start + length - 1] in characters:
+            best = max(best, _ratio(shorter, longer[start:start + length]))
+            if best == 100:
+                return best
+
+    for start in range(longer_length - length, longer_length):
+        if longer[start] in characters:
+            best = max(best, _ratio(shorter, longer[start:]))
+            if best == 100:
+                return best
+
+    return best
+
+
+def _partial_ratio(first: str, second: str) -> float:
+    if not first and not second:
+        return 100.0
+
+    shorter, longer = (first, second) if len(first) <= len(second) else (second, first)
+    score = _partial_ratio_shorter(shorter, longer)
+    if score != 100 and len(first) == len(second):
+        score = max(score, _partial_ratio_shorter(longer, shorter))
+    return score
+
+
+def _token_sort_ratio(first: str, second: str) -> float:
+    return _ratio(" ".join(sorted(first.split())), " ".join(sorted(second.split())))
+
+
+def _token_set_ratio(first: str, second: str) -> float:
+    tokens_first, tokens_second = set(first.split()), set(second.split())
+    if not tokens_first or not tokens_second:
+        return 0
+
+    shared = tokens_first & tokens_second
+    only_first, only_second = tokens_first - tokens_second, tokens_second - tokens_first
+    if shared and (not only_first or not only_second):
+        return 100
+
+    joined_first, joined_second = " ".join(sorted(only_first)), " ".join(sorted(only_second))
+    shared_length = len(" ".join(shared))
+    first_length = shared_length + (shared_length != 0) + len(joined_first)
+    second_length = shared_length + (shared_length != 0) + len(joined_second)
+
+    total = len(joined_first) + len(joined_second)
+    distance = total - 2 * _lcs_length(joined_first, joined_second)
+    score = _norm_distance(distance, first_length + second_length)
+    if not shared_length:
+        return score
+
+    return max(
+        score,
+        _norm_distance((shared_length != 0) + len(joined_first), shared_length + first_length),
+        _norm_distance((shared_length != 0) + len(joined_second), shared_length + second_length)
+    )
+
+
+def _partial_token_ratio(first: str, second: str) -> float:
+    split_first, split_second = first.split(), second.split()
+    tokens_first, tokens_second = set(split_first), set(split_second)
+    if tokens_first & tokens_second:
+        return 100
+
+    only_first, only_second = tokens_first - tokens_second, tokens_second - tokens_first
+    score = _partial_ratio(" ".join(sorted(split_first)), " ".join(sorted(split_second)))
+    if len(split_first) == len(only_first) and len(split_second) == len(only_second):
+        return score
+    return max(score, _partial_ratio(" ".join(sorted(only_first)), " ".join(sorted(only_second))))
+
+
+def _weighted_ratio(first: str, second: str) -> float:
+    """rapidfuzz's WRatio: the plain ratio, or scaled token and partial
+    ratios when those score higher, depending on the length difference."""
+    if not first or not second:
+        return 0
+
+    length_ratio = max(len(first), len(second)) / min(len(first), len(second))
+    score = _ratio(first, second)
+    if length_ratio < 1.5:
+        return max(score, max(_token_set_ratio(first, second), _token_sort_ratio(first, second)) * 0.95)
+
+    partial_scale = 0.9 if length_ratio <= 8.0 else 0.6
+    score = max(score, _partial_ratio(first, second) * partial_scale)
+    return max(score, _partial_token_ratio(first, second) * 0.95 * partial_scale)
+
+
+_PYTHON_SCORERS = {
+    "ratio": _ratio,
+    "partial_ratio": _partial_ratio,
+    "token_sort_ratio": _token_sort_ratio,
+    "token_set_ratio": _token_set_ratio,
+    "WRatio": _weighted_ratio
+}
+
+
+def get_scorer(name: str):
+    """Returns the backend's implementation of a named scorer. Every scorer
+    compares two preprocessed strings and returns a similarity from 0 to
+    100."""
+    if name not in SCORERS:
+        raise ValueError(f"Unknown similarity scorer \"{name}\". Available scorers: {', '.join(SCORERS)}.")
+    return getattr(_fuzz, name) if BACKEND == "rapidfuzz" else _PYTHON_SCORERS[name]
+
+
+def _ratio_upper_bound(first: str, second: str) -> float:
+    """The best ratio two strings can reach given only their lengths."""
+    total = len(first) + len(second)
+    return 200 * min(len(first), len(second)) / total if total else 100
+
+
+def _score_pair(scorer_name: str, scorer, query: str, choice: str, score_cutoff: float) -> float:
+    # Pure ratios cannot beat the length bound, so hopeless pairs skip the edit distance entirely
+    if scorer_name == "ratio" and _ratio_upper_bound(query, choice) < score_cutoff:
+        return 0
+    score = scorer(query, choice)
+    return score if score >= score_cutoff else 0
+
+
+def cdist(
+        queries: list[str],
+        choices: list[str],
+        scorer: str = DEFAULT_SCORER,
+        score_cutoff: float = 0,
+        workers: int = 1
+) -> np.ndarray:
+    """Scores every query against every choice, returning a (queries x choices)
+    float32 matrix. Strings are normalized with preprocess, and those left
+    empty score 0. Scores below the cutoff are reported as 0, which lets the
+    backend abandon those comparisons early."""
+    scorer_function = get_scorer(scorer)
+
+    # Normalize each string once rather than once per comparison
+    processed_queries = [preprocess(query) for query in queries]
+    processed_choices = [preprocess(choice) for choice in choices]
+
+    if BACKEND == "rapidfuzz":
+        scores = _process.cdist(
+            processed_queries,
+            processed_choices,
+            scorer=scorer_function,
+            processor=None,
+            score_cutoff=score_cutoff,
+            dtype=np.float32,
+            workers=workers
+        )
+        scores[[not query for query in processed_queries], :] = 0
+        scores[:, [not choice for choice in processed_choices]] = 0
+        return scores
+
+    scores = np.zeros((len(queries), len(choices)), dtype=np.float32)
+    for row, query in enumerate(processed_queries):
+        if not query:
+            continue
+        scores[row] = [
+            _score_pair(scorer, scorer_function, query, choice, score_cutoff) if choice else 0
+            for choice in processed_choices
+        ]
+
+    return scores
+
+
+def extract(
+        query: str,
+        choices: list[str],
+        scorer: str = DEFAULT_SCORER,
+        score_cutoff: float = 0,
+        limit: int = 5
+) -> list[tuple[str, float, int]]:
+    """Returns up to `limit` (choice, score, index) matches for a query, best
+    first, leaving out choices that score below the cutoff."""
+    if not len(choices):
+        return []
+
+    scores = cdist([query], choices, scorer, score_cutoff)[0]
+    order = np.argsort(-scores, kind="stable")[:limit]
+
+    return [
+        (choices[index], float(scores[index]), int(index))
+        for index in order
+        if scores[index] >= score_cutoff and scores[index] > 0
+    ]
+
+
+def extract_one(
+        query: str,
+        choices: list[str],
+        scorer: str = DEFAULT_SCORER,
+        score_cutoff: float = 0
+) -> tuple[str, float, int] | None:
+    """Returns the best (choice, score, index) match for a query, or None if
+    no choice reaches the cutoff."""
+    matches = extract(query, choices, scorer, score_cutoff, limit=1)
+    return matches[0] if matches else None
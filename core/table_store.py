@@ -0,0 +1,98 @@
+from pandas import DataFrame
+
+# In-place row edits remembered per table; older edits force a full copy of the table
+_MAX_ROW_CHANGES = 1000
+
+
+class TableStore:
+    """Holds the loaded tables with their versions and where they were loaded
+    from. It has no Qt dependency, so services can run on it headless;
+    DataModel adds the change signal used by the GUI."""
+
+    def __init__(self, database: dict[str, DataFrame] = None):
+        self._database = database
+        self._observers = []
+        self._versions: dict[str, int] = {}
+        self._sources: dict[str, dict] = {}
+
+        # Per table: the version the table was last replaced at, and the versions and
+        # index labels of the rows edited in place since
+        self._row_changes: dict[str, tuple[int, list[tuple[int, list]]]] = {}
+
+    def get_database(self):
+        return self._database
+
+    def get_table(self, table_name: str) -> DataFrame:
+        return self._database[table_name]
+
+    def get_table_version(self, table_name: str) -> int:
+        """Returns a counter that increases every time the table is replaced or modified."""
+        return self._versions.get(table_name, 0)
+
+    def get_table_source(self, table_name: str) -> dict | None:
+        """Returns where a table was loaded from (the database engine, schema and
+        table name) if it has not been modified since, otherwise None."""
+        source = self._sources.get(table_name)
+        if source is None or source["version"] != self.get_table_version(table_name):
+            return None
+        return source
+
+    def get_changed_rows(self, table_name: str, since_version: int) -> list | None:
+        """Returns the index labels of the rows edited in place since a version
+        of a table, or None if the table was replaced since then or the edits
+        are no longer recorded."""
+        base_version, changes = self._row_changes.get(table_name, (None, []))
+        if base_version is None or since_version < base_version:
+            return None
+        return list(dict.fromkeys(label for version, labels in changes if version > since_version for label in labels))
+
+    def set_database(self, database: dict[str, DataFrame], sources: dict[str, dict] = None):
+        self._database = database
+        for table_name in database:
+            self._bump_version(table_name)
+
+        # Record provenance against the loaded version, so any later change marks the table as modified
+        self._sources = {
+            table_name: {**source, "version": self._versions[table_name]}
+            for table_name, source in (sources or {}).items()
+        }
+        self._notify_changed()
+
+    def set_table(self, table_name: str, table: DataFrame):
+        self._database[table_name] = table
+        self._bump_version(table_name)
+        self._notify_changed()
+
+    def _bump_version(self, table_name: str, changed_rows: list = None):
+        """Increases a table's version. changed_rows lists the index labels
+        of rows edited in place; without it the whole table was replaced."""
+        version = self._versions.get(table_name, 0) + 1
+        self._versions[table_name] = version
+
+        if changed_rows is None or table_name not in self._row_changes:
+            self._row_changes[table_name] = (version, [])
+            return
+
+        base_version, changes = self._row_changes[table_name]
+        changes.append((version, changed_rows))
+        if len(changes) > _MAX_ROW_CHANGES:
+            base_version = changes.pop(0)[0]
+        self._row_changes[table_name] = (base_version, changes)
+
+    def _notify_changed(self):
+        """Called after every change to the tables."""
+        pass
+
+    def update_row(self, table_name: str, new_row_df: DataFrame) -> bool:
+        # Check for the table in the database
+        if table_name not in self._database:
+            return False
+
+        # Update the row in the database, or return False if not found
+        if not new_row_df.index.difference(self._database[table_name].index).empty:
+            return False
+        else:
+            self._database[table_name].update(new_row_df)
+            self._bump_version(table_name, list(new_row_df.index))
+            self._notify_changed()
+            return True
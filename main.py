@@ -2,6 +2,7 @@ import sys
 
 from PyQt6.QtWidgets import QApplication, QMainWindow, QStackedWidget
 
+from core import CorrectionStore
 from model import DataModel
 from navigation import NavigationController, Screen
 from services import DataEditorService, QueryService, DataCleaningService, AnalyticsService, DatabaseService
@@ -41,7 +42,7 @@ if __name__ == '__main__':
     database_service = DatabaseService(model)
     data_editor_service = DataEditorService(model)
     query_service = QueryService(model)
-    data_cleaning_service = DataCleaningService(model)
+    data_cleaning_service = DataCleaningService(model, CorrectionStore())
     analytics_service = AnalyticsService(model)
 
     # Initialize analytics notifier
@@ -1,2 +1,3 @@
 from .data_model import DataModel
 from .dataframe_model import DataFrameModel
+from .query_result_model import QueryResultModel
@@ -1,16 +1,68 @@
-from PyQt6.QtCore import QAbstractTableModel, Qt, QVariant, QModelIndex
-from pandas import DataFrame
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from PyQt6.QtCore import QAbstractTableModel, Qt, QVariant, QModelIndex, pyqtSignal
+from pandas import DataFrame, Series
+
+
+def format_display_strings(
+        series: Series,
+        float_precision: int = 6,
+        datetime_format: str = "%Y-%m-%d %H:%M:%S",
+        na_rep: str = "<NA>"
+) -> np.ndarray:
+    """Formats a block of column values as display strings in a single
+    vectorized pass. Returns an object array with one string per value."""
+    missing = series.isna().to_numpy(dtype=bool)
+
+    if pd.api.types.is_bool_dtype(series) or pd.api.types.is_integer_dtype(series):
+        strings = series.astype(str).to_numpy(dtype=object)
+    elif pd.api.types.is_float_dtype(series):
+        values = series.to_numpy(dtype="float64", na_value=np.nan)
+        strings = np.round(values, float_precision).astype(str).astype(object)
+    elif pd.api.types.is_datetime64_any_dtype(series):
+        strings = series.dt.strftime(datetime_format).to_numpy(dtype=object)
+    else:
+        strings = series.astype(str).to_numpy(dtype=object)
+
+    strings[missing] = na_rep
+    return strings
 
 
 class DataFrameModel(QAbstractTableModel):
-    def __init__(self, dataframe: DataFrame):
+    row_edited: pyqtSignal = pyqtSignal(int)
+
+    def __init__(
+            self,
+            dataframe: DataFrame,
+            block_size: int = 256,
+            max_cached_blocks: int = 512,
+            float_precision: int = 6,
+            datetime_format: str = "%Y-%m-%d %H:%M:%S",
+            na_rep: str = "<NA>"
+    ):
         super().__init__()
         self._dataframe = dataframe
         self._editable = False
 
+        # Optional positional row order used to present sorted or filtered views
+        self._row_order: np.ndarray | None = None
+        self._inverse_row_order: np.ndarray | None = None
+
+        # Display string cache keyed by (row block, column)
+        self._block_size = block_size
+        self._max_cached_blocks = max_cached_blocks
+        self._display_cache: OrderedDict[tuple[int, int], np.ndarray] = OrderedDict()
+        self._float_precision = float_precision
+        self._datetime_format = datetime_format
+        self._na_rep = na_rep
+
     # Override QAbstractTableModel methods
 
     def rowCount(self, parent=None):
+        if self._row_order is not None:
+            return len(self._row_order)
         return self._dataframe.shape[0]
 
     def columnCount(self, parent=None):
@@ -18,13 +70,18 @@ class DataFrameModel(QAbstractTableModel):
 
     def data(self, index, role=Qt.ItemDataRole.DisplayRole):
         if index.isValid() and role == Qt.ItemDataRole.DisplayRole:
-            return str(self._dataframe.iloc[index.row(), index.column()])
+            row = index.row()
+            block = self.get_display_block(row // self._block_size, index.column())
+            return block[row % self._block_size]
         return QVariant()
 
     def setData(self, index: QModelIndex, value, role=Qt.ItemDataRole.EditRole):
         if self._editable and role == Qt.ItemDataRole.EditRole:
-            self._dataframe.iat[index.row(), index.column()] = value
+            position = self.map_to_source(index.row())
+            self._dataframe.iat[position, index.column()] = value
+            self._display_cache.pop((index.row() // self._block_size, index.column()), None)
             self.dataChanged.emit(index, index)
+            self.row_edited.emit(position)
             return True
         return False
 
@@ -45,13 +102,117 @@ class DataFrameModel(QAbstractTableModel):
         if orientation == Qt.Orientation.Horizontal:
             return str(self._dataframe.columns[section])
         elif orientation == Qt.Orientation.Vertical:
-            return str(self._dataframe.index[section])
+            return str(self._dataframe.index[self.map_to_source(section)])
         return QVariant()
 
     def get_dataframe(self) -> DataFrame:
         return self._dataframe
 
-    def set_dataframe(self, dataframe: DataFrame):
+    def set_dataframe(self, dataframe: DataFrame, row_order: np.ndarray = None):
         self.beginResetModel()
         self._dataframe = dataframe
+        self._row_order = row_order
+        self._inverse_row_order = None
+        self.clear_display_cache()
         self.endResetModel()
+
+    def set_row_order(self, row_order: np.ndarray | None):
+        """Presents the DataFrame rows in the given positional order, or in
+        their natural order when None. The DataFrame itself is not modified."""
+        self.set_dataframe(self._dataframe, row_order)
+
+    def map_to_source(self, row: int) -> int:
+        """Maps a model row to its position in the underlying DataFrame."""
+        if self._row_order is not None:
+            return int(self._row_order[row])
+        return row
+
+    def map_from_source(self, position: int) -> int:
+        """Maps a position in the underlying DataFrame to its model row, or -1
+        if the row is not part of the current row order."""
+        if position >= self._dataframe.shape[0]:
+            return -1
+
+        if self._row_order is None:
+            return position
+
+        if self._inverse_row_order is None:
+            self._inverse_row_order = np.full(self._dataframe.shape[0], -1)
+            self._inverse_row_order[self._row_order] = np.arange(len(self._row_order))
+
+        return int(self._inverse_row_order[position])
+
+    def update_dataframe(self, dataframe: DataFrame, row_order: np.ndarray = None):
+        """Replaces the DataFrame while keeping attached views stable. Tables
+        with the same columns are updated in place so scroll position and
+        selection survive; anything else falls back to a full model reset."""
+        if not dataframe.columns.equals(self._dataframe.columns):
+            self.set_dataframe(dataframe, row_order)
+            return
+
+        old_rows = self.rowCount()
+        new_rows = len(row_order) if row_order is not None else dataframe.shape[0]
+
+        if new_rows < old_rows:
+            self.beginRemoveRows(QModelIndex(), new_rows, old_rows - 1)
+            self._dataframe, self._row_order = dataframe, row_order
+            self.endRemoveRows()
+        elif new_rows > old_rows:
+            self.beginInsertRows(QModelIndex(), old_rows, new_rows - 1)
+            self._dataframe, self._row_order = dataframe, row_order
+            self.endInsertRows()
+        else:
+            self._dataframe, self._row_order = dataframe, row_order
+
+        self._inverse_row_order = None
+        self.clear_display_cache()
+        if new_rows:
+            self.dataChanged.emit(self.index(0, 0), self.index(new_rows - 1, self.columnCount() - 1))
+        self.headerDataChanged.emit(Qt.Orientation.Vertical, 0, max(new_rows - 1, 0))
+
+    def set_display_format(self, float_precision: int = None, datetime_format: str = None, na_rep: str = None):
+        if float_precision is not None:
+            self._float_precision = float_precision
+        if datetime_format is not None:
+            self._datetime_format = datetime_format
+        if na_rep is not None:
+            self._na_rep = na_rep
+
+        self.clear_display_cache()
+        self.dataChanged.emit(
+            self.index(0, 0),
+            self.index(self.rowCount() - 1, self.columnCount() - 1)
+        )
+
+    def clear_display_cache(self):
+        self._display_cache.clear()
+
+    def get_column_values(self, rows: slice | np.ndarray, column: int) -> Series:
+        """Returns the values of a column at the given DataFrame positions."""
+        return self._dataframe.iloc[rows, column]
+
+    def get_display_block(self, block: int, column: int) -> np.ndarray:
+        """Returns the display strings for one block of rows in a column,
+        formatting and caching the whole block on a cache miss."""
+        key = (block, column)
+        strings = self._display_cache.get(key)
+
+        if strings is not None:
+            self._display_cache.move_to_end(key)
+            return strings
+
+        start = block * self._block_size
+        end = min(start + self._block_size, self.rowCount())
+        rows = self._row_order[start:end] if self._row_order is not None else slice(start, end)
+        strings = format_display_strings(
+            self.get_column_values(rows, column),
+            self._float_precision,
+            self._datetime_format,
+            self._na_rep
+        )
+
+        self._display_cache[key] = strings
+        if len(self._display_cache) > self._max_cached_blocks:
+            self._display_cache.popitem(last=False)
+
+        return strings
@@ -0,0 +1,125 @@
+from bisect import bisect_right
+
+import numpy as np
+import pandas as pd
+from PyQt6.QtCore import QModelIndex, Qt, QVariant, pyqtSignal
+from pandas import DataFrame, Series
+
+from model.dataframe_model import DataFrameModel
+
+
+class QueryResultModel(DataFrameModel):
+    """DataFrameModel that streams a query result from a cursor, starting
+    from its first block of rows. As attached views scroll towards the end
+    the model asks for the next block through fetch_requested, and whoever
+    owns the cursor fetches it, off the GUI thread, and passes it to
+    append_block. Until it arrives a placeholder row at the end shows that
+    rows are loading. The cursor needs an exhausted flag, like QueryCursor.
+    Fetched blocks are kept as they are and rows are looked up by block, so
+    each fetch costs the same however many rows are already loaded."""
+    rows_fetched: pyqtSignal = pyqtSignal(int)
+    fetch_requested: pyqtSignal = pyqtSignal(int)
+
+    def __init__(self, cursor, first_block: DataFrame, fetch_size: int = 1000, **kwargs):
+        super().__init__(first_block, **kwargs)
+        self._cursor = cursor
+        self._fetch_size = fetch_size
+        self._fetching = False
+        self._loading_row = False
+
+        # Fetched blocks and the row each one starts at
+        self._blocks: list[DataFrame] = [first_block]
+        self._block_starts: list[int] = [0]
+        self._row_total = len(first_block)
+
+    def get_cursor(self):
+        return self._cursor
+
+    def rowCount(self, parent=None):
+        if self._row_order is not None:
+            return len(self._row_order)
+        return self._row_total + (1 if self._loading_row else 0)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if self.is_loading_row(index.row()):
+            if role == Qt.ItemDataRole.DisplayRole:
+                return "Loading..." if index.column() == 0 else ""
+            return QVariant()
+        return super().data(index, role)
+
+    def is_loading_row(self, row: int) -> bool:
+        return self._loading_row and row == self._row_total
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Vertical:
+            if self.is_loading_row(section):
+                return ""
+            position = self.map_to_source(section)
+            block = bisect_right(self._block_starts, position) - 1
+            return str(self._blocks[block].index[position - self._block_starts[block]])
+        return super().headerData(section, orientation, role)
+
+    def get_dataframe(self) -> DataFrame:
+        """Returns the rows fetched so far as one DataFrame."""
+        if len(self._blocks) > 1:
+            self._blocks = [pd.concat(self._blocks)]
+            self._block_starts = [0]
+        return self._blocks[0]
+
+    def get_column_values(self, rows: slice | np.ndarray, column: int) -> Series:
+        if not isinstance(rows, slice):
+            return self.get_dataframe().iloc[rows, column]
+
+        first = bisect_right(self._block_starts, rows.start) - 1
+        last = bisect_right(self._block_starts, rows.stop - 1) - 1
+        parts = [
+            self._blocks[block].iloc[
+                max(rows.start - self._block_starts[block], 0):rows.stop - self._block_starts[block], column
+            ]
+            for block in range(first, last + 1)
+        ]
+        return parts[0] if len(parts) == 1 else pd.concat(parts)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._fetching and not self._cursor.exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._fetching:
+            return
+
+        self._fetching = True
+        if self._row_order is None:
+            self.beginInsertRows(QModelIndex(), self._row_total, self._row_total)
+            self._loading_row = True
+            self.endInsertRows()
+        self.fetch_requested.emit(self._fetch_size)
+
+    def append_block(self, block: DataFrame):
+        """Adds the block of rows answering the last fetch request. An empty
+        block ends the request without adding rows."""
+        self._fetching = False
+        if self._loading_row:
+            self.beginRemoveRows(QModelIndex(), self._row_total, self._row_total)
+            self._loading_row = False
+            self.endRemoveRows()
+
+        if block.empty:
+            self.rows_fetched.emit(self.rowCount())
+            return
+
+        start = self._row_total
+        self.beginInsertRows(QModelIndex(), start, start + len(block) - 1)
+        if start:
+            self._blocks.append(block)
+            self._block_starts.append(start)
+        else:
+            self._blocks = [block]
+        self._row_total += len(block)
+
+        # The last display block was cut short by the previous end of the data
+        last_block = (start - 1) // self._block_size if start else 0
+        for column in range(self.columnCount()):
+            self._display_cache.pop((last_block, column), None)
+        self.endInsertRows()
+
+        self.rows_fetched.emit(self.rowCount())
@@ -1,8 +1,9 @@
 from .abstract_service import AbstractService
 from .database_access import DatabaseAccess
 from .analytics_service import AnalyticsService
+from .batch_cleaning import apply_config_template, summarize_batch
+from .cleaning_plan import CleaningPlan, build_cleaning_plan, optimize_cleaning_plan, select_cleaning_plan
 from .data_cleaning_service import DataCleaningService
 from .data_editor_service import DataEditorService
-from .database_export_worker import DatabaseExportWorker
 from .database_service import DatabaseService
 from .query_service import QueryService
@@ -1,17 +1,17 @@
 from abc import ABC, abstractmethod
 
-from model import DataModel
+from core.table_store import TableStore
 
 
 class AbstractService(ABC):
     @property
     @abstractmethod
-    def model(self) -> DataModel:
+    def model(self) -> TableStore:
         """Abstract attribute for data model"""
         pass
 
     @model.setter
     @abstractmethod
-    def model(self, value: DataModel):
+    def model(self, value: TableStore):
         """Abstract setter for data model"""
         pass
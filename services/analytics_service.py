@@ -1,13 +1,13 @@
 import pandas as pd
 from pandas import DataFrame
 
-from model import DataModel
-from services import AbstractService
+from core.table_store import TableStore
+from services.abstract_service import AbstractService
 
 
 class AnalyticsService(AbstractService):
     @property
-    def model(self) -> DataModel:
+    def model(self) -> TableStore:
         return self._model
 
     @property
@@ -30,7 +30,7 @@ class AnalyticsService(AbstractService):
     def analytics_available(self) -> bool:
         return self._analytics_available
 
-    def __init__(self, model: DataModel):
+    def __init__(self, model: TableStore):
         self._model = model
         self._analytics_config = None
         self._table_name = None
@@ -0,0 +1,90 @@
+import re
+
+from core.configuration_enums import Configuration
+from services.cleaning_plan import ROW_FILTERS
+
+_GENERAL_OPTIONS = (
+    Configuration.DELETE_DUPLICATES,
+    Configuration.DROP_MISSING,
+    Configuration.IMPUTE_MISSING_MEAN,
+    Configuration.IMPUTE_MISSING_MEDIAN
+)
+
+
+def normalize_column_name(column: str) -> str:
+    """Reduces a column name to lowercase letters and digits, so that names
+    like "Customer ID", "customer_id" and "CustomerId" match."""
+    return re.sub(r"[^0-9a-z]", "", str(column).lower())
+
+
+def apply_config_template(template: dict, columns: list[str]) -> dict:
+    """Builds a table's cleaning configuration from a template. Column
+    options are matched by exact name first, then by normalized name;
+    template columns the table does not have are left out, and the general
+    options are copied as they are."""
+    normalized = {}
+    for column in columns:
+        normalized.setdefault(normalize_column_name(column), column)
+
+    config_columns = {}
+    for template_column, options in template[Configuration.COLUMNS].items():
+        column = template_column if template_column in columns \
+            else normalized.get(normalize_column_name(template_column))
+        if column is not None and column not in config_columns:
+            config_columns[column] = dict(options)
+
+    config = {key: template[key] for key in _GENERAL_OPTIONS}
+    config[Configuration.COLUMNS] = config_columns
+    return config
+
+
+def init_batch_stats() -> dict:
+    return {
+        "operations": 0,
+        "data_types": 0,
+        "duplicates": 0,
+        "outliers": 0,
+        "missing_dropped": 0,
+        "missing_imputed": 0
+    }
+
+
+def add_step_stats(stats: dict, step: dict, result: dict):
+    """Adds the result of one executed plan step to cleaning statistics,
+    counted the same way as a single-table run."""
+    operation, changed = step["operation"], int(result["changed"])
+
+    if operation == Configuration.DATA_TYPE:
+        stats["data_types"] += changed
+        stats["operations"] += result["rows"] * changed
+        return
+
+    if operation in ROW_FILTERS:
+        stats["outliers"] += changed
+    elif operation == Configuration.DELETE_DUPLICATES:
+        stats["duplicates"] += changed
+    elif operation == Configuration.DROP_MISSING:
+        stats["missing_dropped"] += changed
+    elif operation in (Configuration.IMPUTE_MISSING_MEAN, Configuration.IMPUTE_MISSING_MEDIAN):
+        stats["missing_imputed"] += changed
+    stats["operations"] += changed
+
+
+def summarize_batch(results: dict[str, dict]) -> dict:
+    """Combines the results of a batch into totals over the cleaned tables,
+    with the names of the tables that failed."""
+    summary = {
+        "tables": len(results),
+        "cleaned": [table for table, result in results.items() if result["error"] is None],
+        "failed": {table: result["error"] for table, result in results.items() if result["error"] is not None},
+        "rows_before": 0,
+        "rows_after": 0,
+        **init_batch_stats()
+    }
+
+    for table in summary["cleaned"]:
+        for key, value in results[table].items():
+            if key != "error":
+                summary[key] += value
+
+    return summary
@@ -0,0 +1,540 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame, Series
+
+from core.category_correction import autocorrect_column
+from core.configuration_enums import Configuration
+
+# Options that only remove rows, evaluated together as one boolean mask
+ROW_FILTERS = {
+    Configuration.INT_MIN,
+    Configuration.INT_MAX,
+    Configuration.FLOAT_MIN,
+    Configuration.FLOAT_MAX,
+    Configuration.DATE_MIN,
+    Configuration.DATE_MAX
+}
+
+# Options that rewrite the values of a single column
+COLUMN_REWRITES = {Configuration.DATA_TYPE, Configuration.STRING_MAX, Configuration.CATEGORIES}
+
+# Relative cost per row of each step, used to order row filters against column work
+_STEP_COSTS = {
+    Configuration.INT_MIN: 1,
+    Configuration.INT_MAX: 1,
+    Configuration.FLOAT_MIN: 1,
+    Configuration.FLOAT_MAX: 1,
+    Configuration.DATE_MIN: 1,
+    Configuration.DATE_MAX: 1,
+    Configuration.STRING_MAX: 5,
+    Configuration.CATEGORIES: 50,
+    Configuration.DELETE_DUPLICATES: 10,
+    Configuration.DROP_MISSING: 2,
+    Configuration.IMPUTE_MISSING_MEAN: 3,
+    Configuration.IMPUTE_MISSING_MEDIAN: 5
+}
+_DATA_TYPE_COSTS = {"datetime64[ns]": 30, "int64": 5, "float64": 5, "category": 10}
+
+# Surviving values a stage must convert or truncate before starting worker processes for it pays off
+PROCESS_POOL_MIN_VALUES = 5_000_000
+
+# Conversions whose result for a row does not depend on which other rows are present
+_ROW_INDEPENDENT_TYPES = {"float64", "string", "bool", "object"}
+
+_STEP_DESCRIPTIONS = {
+    Configuration.DATA_TYPE: "Changing data types...",
+    Configuration.INT_MIN: "Removing integer outliers...",
+    Configuration.INT_MAX: "Removing integer outliers...",
+    Configuration.FLOAT_MIN: "Removing floating point outliers...",
+    Configuration.FLOAT_MAX: "Removing floating point outliers...",
+    Configuration.STRING_MAX: "Trimming strings...",
+    Configuration.DATE_MIN: "Removing date outliers...",
+    Configuration.DATE_MAX: "Removing date outliers...",
+    Configuration.CATEGORIES: "Correcting categories...",
+    Configuration.DELETE_DUPLICATES: "Deleting duplicate records...",
+    Configuration.DROP_MISSING: "Dropping records with missing values...",
+    Configuration.IMPUTE_MISSING_MEAN: "Imputing missing values with mean...",
+    Configuration.IMPUTE_MISSING_MEDIAN: "Imputing missing values with median..."
+}
+
+
+def convert_data_type(series: Series, data_type: str) -> Series:
+    """Converts a column to the data type, coercing values that cannot be
+    converted to missing values. Integer columns with missing values use the
+    nullable Int64 type."""
+    if data_type == "int64":
+        series = pd.to_numeric(series, errors="coerce")
+        try:
+            return series.astype("int64")
+        except ValueError:
+            # Use nullable integer data type
+            return series.astype("Int64")
+    elif data_type == "float64":
+        return pd.to_numeric(series, errors="coerce").astype(data_type)
+    elif data_type == "datetime64[ns]":
+        return pd.to_datetime(series, errors="coerce")
+    else:
+        return series.astype(data_type)
+
+
+def truncate_series(series: Series, max_length: int) -> tuple[Series, int]:
+    """Truncates strings to the maximum length, returning the truncated
+    column and the number of values that changed."""
+    if not pd.api.types.is_string_dtype(series):
+        raise ValueError(f"The \"{series.name}\" column is not a string data type.")
+
+    truncated = series.str.slice(0, max_length)
+    changed = truncated[series != truncated].count()
+
+    return truncated, changed
+
+
+def get_range_mask(series: Series, minimum, maximum, numeric: bool = True) -> np.ndarray:
+    """Returns which rows fall within the inclusive range. Missing values are
+    never in range."""
+    if numeric and not pd.api.types.is_numeric_dtype(series):
+        raise ValueError(f"The \"{series.name}\" column is not numeric.")
+
+    in_range = (series >= minimum) & (series <= maximum)
+    return np.asarray(in_range.to_numpy(dtype=bool, na_value=False))
+
+
+def build_cleaning_plan(cleaning_config: dict) -> "CleaningPlan":
+    """Compiles a cleaning configuration into a plan. Steps keep the order
+    the configuration would run in one operation at a time."""
+    steps = []
+
+    for column, options in cleaning_config[Configuration.COLUMNS].items():
+        for key, value in options.items():
+            if key == Configuration.DATA_TYPE:
+                args = (value,)
+            elif key == Configuration.INT_MIN:
+                args = (int(value) if value != "" else float("-inf"), float("inf"))
+            elif key == Configuration.INT_MAX:
+                args = (float("-inf"), int(value) if value != "" else float("inf"))
+            elif key == Configuration.FLOAT_MIN:
+                args = (float(value) if value != "" else float("-inf"), float("inf"))
+            elif key == Configuration.FLOAT_MAX:
+                args = (float("-inf"), float(value) if value != "" else float("inf"))
+            elif key == Configuration.STRING_MAX:
+                args = (int(value) if value != "" else 1000000,)
+            elif key == Configuration.DATE_MIN:
+                args = (pd.to_datetime(value), pd.to_datetime("2100-01-01"))
+            elif key == Configuration.DATE_MAX:
+                args = (pd.to_datetime("1900-01-01"), pd.to_datetime(value))
+            elif key == Configuration.CATEGORIES and value != "":
+                args = (value.split(),)
+            else:
+                continue
+            steps.append({
+                "operation": key,
+                "column": column,
+                "args": args,
+                "description": _STEP_DESCRIPTIONS[key],
+                "position": len(steps)
+            })
+
+    general = [Configuration.DELETE_DUPLICATES]
+    if cleaning_config[Configuration.DROP_MISSING]:
+        general.append(Configuration.DROP_MISSING)
+    elif cleaning_config[Configuration.IMPUTE_MISSING_MEAN]:
+        general.append(Configuration.IMPUTE_MISSING_MEAN)
+    elif cleaning_config[Configuration.IMPUTE_MISSING_MEDIAN]:
+        general.append(Configuration.IMPUTE_MISSING_MEDIAN)
+
+    for key in general:
+        if cleaning_config[key]:
+            steps.append({
+                "operation": key,
+                "column": None,
+                "args": (),
+                "description": _STEP_DESCRIPTIONS[key],
+                "position": len(steps)
+            })
+
+    return CleaningPlan(steps)
+
+
+class CleaningPlan:
+    """Runs the steps of a cleaning configuration in a single pass over the
+    table. Row filters, duplicate removal and missing value removal only
+    narrow a shared mask of surviving rows, and the table is copied once at
+    the end (or once before imputation, which needs the final rows). Column
+    rewrites are computed on the surviving rows of that column alone, so
+    results match running each operation on the table in turn."""
+
+    def __init__(self, steps: list[dict], flags: list[str] = None, estimated_rows: list[int] = None):
+        self.steps = steps
+
+        # Filled in by optimize_cleaning_plan and select_cleaning_plan: notes on reordered semantics and row
+        # estimates per step
+        self.flags = flags or []
+        self.estimated_rows = estimated_rows
+
+    def __len__(self) -> int:
+        return len(self.steps)
+
+    def describe(self) -> list[str]:
+        descriptions = []
+        for step in self.steps:
+            target = f" \"{step['column']}\"" if step["column"] is not None else ""
+            args = ", ".join(str(arg) for arg in step["args"])
+            descriptions.append(f"{step['operation'].value}{target}" + (f" ({args})" if args else ""))
+        return descriptions
+
+    def execute(
+            self,
+            table: DataFrame,
+            category_corrector: Callable[[str, Series, list[str]], tuple[Series, int]] = None,
+            on_step: Callable[[dict, dict], None] = None,
+            workers: int = 1
+    ) -> DataFrame:
+        """Returns the cleaned table, leaving the given one untouched. After
+        each step, on_step receives the step and a result with the number of
+        values it changed or rows it removed, and the surviving row count.
+
+        Consecutive column rewrites form a stage: each column's rewrites run
+        in order, different columns run on `workers` threads or processes,
+        and the rewritten columns are merged back into the table together.
+        Row filters and whole-table steps act as barriers between stages.
+
+        Parsing strings into numbers or dates, building categories and
+        truncating strings hold the GIL for nearly all of their run time, so
+        threads give them no speedup. Columns with only those rewrites go to
+        worker processes once a stage has at least PROCESS_POOL_MIN_VALUES
+        of them, since starting the processes and copying the columns to them
+        costs more on smaller stages. Category correction calls back into
+        category_corrector and stays on threads, where the rapidfuzz scoring
+        runs without the GIL."""
+        if category_corrector is None:
+            category_corrector = lambda column, series, categories: autocorrect_column(series, categories)
+
+        table = table.copy(deep=False)
+        alive = np.ones(len(table), dtype=bool)
+
+        with _RewritePools(workers) as pools:
+            index = 0
+            while index < len(self.steps):
+                step = self.steps[index]
+                operation, column, args = step["operation"], step["column"], step["args"]
+
+                # Once every row is removed the empty table is cheap to copy, and rewrites need at least one row
+                if not alive.any():
+                    table, alive = self._materialize(table, alive)
+
+                if operation in COLUMN_REWRITES:
+                    stage = [step]
+                    while index + len(stage) < len(self.steps) \
+                            and self.steps[index + len(stage)]["operation"] in COLUMN_REWRITES:
+                        stage.append(self.steps[index + len(stage)])
+
+                    changes = self._rewrite_columns(table, stage, alive, category_corrector, pools)
+                    if on_step is not None:
+                        for stage_step, changed in zip(stage, changes):
+                            on_step(stage_step, {"changed": changed, "rows": int(alive.sum())})
+                    index += len(stage)
+                    continue
+
+                if operation in ROW_FILTERS:
+                    numeric = operation not in (Configuration.DATE_MIN, Configuration.DATE_MAX)
+                    keep = get_range_mask(table[column], *args, numeric=numeric)
+                    changed = int((alive & ~keep).sum())
+                    alive &= keep
+                elif operation == Configuration.DELETE_DUPLICATES:
+                    positions = np.flatnonzero(alive)
+                    alive_rows = table if len(positions) == len(table) else table.iloc[positions]
+                    duplicated = alive_rows.duplicated().to_numpy()
+                    changed = int(duplicated.sum())
+                    alive[positions[duplicated]] = False
+                elif operation == Configuration.DROP_MISSING:
+                    keep = table.notna().all(axis=1).to_numpy()
+                    changed = int((alive & ~keep).sum())
+                    alive &= keep
+                else:
+                    # Imputed values depend on the surviving rows, so they are materialized first
+                    table, alive = self._materialize(table, alive)
+                    before = table.isna().sum().sum()
+                    if operation == Configuration.IMPUTE_MISSING_MEAN:
+                        table = table.fillna(table.mean(numeric_only=True))
+                    else:
+                        table = table.fillna(table.median(numeric_only=True))
+                    changed = before - table.isna().sum().sum()
+
+                if on_step is not None:
+                    on_step(step, {"changed": changed, "rows": int(alive.sum())})
+                index += 1
+
+        table, _ = self._materialize(table, alive)
+        return table
+
+    @staticmethod
+    def _materialize(table: DataFrame, alive: np.ndarray) -> tuple[DataFrame, np.ndarray]:
+        if alive.all():
+            return table, alive
+        return table.iloc[np.flatnonzero(alive)], np.ones(int(alive.sum()), dtype=bool)
+
+    @staticmethod
+    def _rewrite_columns(
+            table: DataFrame,
+            stage: list[dict],
+            alive: np.ndarray,
+            category_corrector: Callable,
+            pools: "_RewritePools" = None
+    ) -> list[int]:
+        """Runs a stage of column rewrites on the surviving values of each
+        column, then stores every rewritten column at once. Removed rows are
+        filled with a surviving value so each column keeps its rewritten data
+        type; they are dropped before the table is returned. Returns the
+        changed count of each step in the stage."""
+        positions = None if alive.all() else np.flatnonzero(alive)
+
+        # Columns are sliced here rather than in the pools so each worker only ever touches its own series
+        chains = {}
+        for step in stage:
+            if step["column"] not in chains:
+                series = table[step["column"]]
+                chains[step["column"]] = (series if positions is None else series.iloc[positions], [])
+            chains[step["column"]][1].append(step)
+
+        if pools is None or not pools.parallel or len(chains) < 2:
+            results = {column: _run_rewrites(column, *chain, category_corrector) for column, chain in chains.items()}
+        else:
+            separable = {
+                column: chain for column, chain in chains.items()
+                if all(step["operation"] != Configuration.CATEGORIES for step in chain[1])
+            }
+            futures = {}
+            if len(separable) > 1 and sum(len(series) for series, _ in separable.values()) >= PROCESS_POOL_MIN_VALUES:
+                futures = {
+                    column: pools.processes().submit(_run_rewrites, column, *chain, None)
+                    for column, chain in separable.items()
+                }
+            futures.update({
+                column: pools.threads.submit(_run_rewrites, column, *chain, category_corrector)
+                for column, chain in chains.items() if column not in futures
+            })
+            results = {column: future.result() for column, future in futures.items()}
+
+        changes = {}
+        for column, (series, step_changes) in results.items():
+            changes.update(step_changes)
+            if series is chains[column][0]:
+                continue
+            if positions is not None:
+                series = series.iloc[np.maximum(np.cumsum(alive) - 1, 0)]
+                series.index = table.index
+            table[column] = series
+
+        return [changes[step["position"]] for step in stage]
+
+
+class _RewritePools:
+    """The thread pool of a plan run and its process pool, which is only
+    started when a stage is large enough to need it. Processes are spawned
+    rather than forked, since the calling application may be running other
+    threads."""
+
+    def __init__(self, workers: int):
+        self.parallel = workers > 1
+        self.threads = ThreadPoolExecutor(workers) if self.parallel else None
+        self._workers = workers
+        self._processes = None
+
+    def __enter__(self) -> "_RewritePools":
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.threads is not None:
+            self.threads.shutdown()
+        if self._processes is not None:
+            self._processes.shutdown()
+
+    def processes(self) -> ProcessPoolExecutor:
+        if self._processes is None:
+            self._processes = ProcessPoolExecutor(self._workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._processes
+
+
+def _run_rewrites(column: str, series: Series, steps: list[dict], category_corrector: Callable) -> tuple[Series, dict]:
+    """Applies one column's rewrites in order, returning the rewritten column
+    and the changed count of each step by position."""
+    changes = {}
+    for step in steps:
+        operation, args = step["operation"], step["args"]
+        if operation == Configuration.DATA_TYPE:
+            changed = 0
+            if series.dtype != args[0]:
+                series = convert_data_type(series, args[0])
+                changed = 1
+        elif operation == Configuration.STRING_MAX:
+            series, changed = truncate_series(series, args[0])
+        else:
+            series, changed = category_corrector(column, series, args[0])
+        changes[step["position"]] = changed
+    return series, changes
+
+
+def get_step_cost(step: dict) -> float:
+    """Returns the estimated relative cost per row of a step."""
+    if step["operation"] == Configuration.DATA_TYPE:
+        return _DATA_TYPE_COSTS.get(step["args"][0], 2)
+    return _STEP_COSTS[step["operation"]]
+
+
+def is_row_dependent(step: dict) -> bool:
+    """Returns whether a column rewrite can give different results depending
+    on which rows are present, such as the categories of a categorical
+    column or whether an integer column needs the nullable type."""
+    if step["operation"] == Configuration.CATEGORIES:
+        return True
+    return step["operation"] == Configuration.DATA_TYPE and step["args"][0] not in _ROW_INDEPENDENT_TYPES
+
+
+def _must_follow(earlier: dict, later: dict) -> bool:
+    """Returns whether a step has to stay after an earlier step of the
+    original plan. Row filters commute with each other, with duplicate and
+    missing value removal, and with rewrites of other columns; everything
+    else keeps its order."""
+    earlier_filter = earlier["operation"] in ROW_FILTERS
+    later_filter = later["operation"] in ROW_FILTERS
+
+    if not earlier_filter and not later_filter:
+        return True
+    if earlier["operation"] in (Configuration.IMPUTE_MISSING_MEAN, Configuration.IMPUTE_MISSING_MEDIAN):
+        return True
+    if later["operation"] in (Configuration.IMPUTE_MISSING_MEAN, Configuration.IMPUTE_MISSING_MEDIAN):
+        return True
+
+    same_column = earlier["column"] is not None and earlier["column"] == later["column"]
+    return same_column and (earlier["operation"] in COLUMN_REWRITES or later["operation"] in COLUMN_REWRITES)
+
+
+def _sample_table(table: DataFrame, sample_size: int) -> DataFrame:
+    if len(table) <= sample_size:
+        return table
+    positions = np.sort(np.random.default_rng(0).choice(len(table), sample_size, replace=False))
+    return table.iloc[positions]
+
+
+def _run_on_sample(plan: "CleaningPlan", sample: DataFrame) -> dict[int, tuple[int, int]]:
+    """Runs a plan on a sample, returning the rows before and after each step
+    by original position. Category correction is skipped since it never
+    removes rows."""
+    counts = {}
+    before = [len(sample)]
+
+    def record(step: dict, result: dict):
+        counts[step["position"]] = (before[0], result["rows"])
+        before[0] = result["rows"]
+
+    plan.execute(sample, lambda column, series, categories: (series, 0), record)
+    return counts
+
+
+def optimize_cleaning_plan(plan: CleaningPlan, table: DataFrame = None, sample_size: int = 10_000) -> CleaningPlan:
+    """Reorders a plan so cheap, selective row filters run before expensive
+    column work, which then only processes the surviving rows. Steps are
+    only moved where the dependency rules of _must_follow allow, so
+    imputation always sees the same rows. Rewrites whose results depend on
+    the rows present, and counts shifted between steps, are listed in the
+    plan's flags. With a table, selectivity and row counts are estimated
+    from a sample of it."""
+    steps = plan.steps
+    flags = []
+    selectivity = {}
+    sample = None
+
+    if table is not None and len(table):
+        sample = _sample_table(table, sample_size)
+        try:
+            for position, (rows_before, rows_after) in _run_on_sample(plan, sample).items():
+                selectivity[position] = rows_after / rows_before if rows_before else 1.0
+        except (ValueError, TypeError) as e:
+            flags.append(f"Steps were not reordered because the plan failed on a sample: {e}")
+            return CleaningPlan(steps, flags)
+
+    # Greedy list scheduling: the cheapest, most selective ready filter first, otherwise the next step in order
+    remaining = list(steps)
+    ordered = []
+    while remaining:
+        ready = [
+            step for step in remaining
+            if not any(_must_follow(other, step) for other in remaining if other["position"] < step["position"])
+        ]
+        filters = [step for step in ready if step["operation"] in ROW_FILTERS]
+        if filters:
+            chosen = min(filters, key=lambda step: (
+                get_step_cost(step) / max(1 - selectivity.get(step["position"], 0.5), 1e-6),
+                step["position"]
+            ))
+        else:
+            chosen = min(ready, key=lambda step: step["position"])
+        ordered.append(chosen)
+        remaining.remove(chosen)
+
+    flags.extend(_describe_reordering(steps, ordered))
+
+    optimized = CleaningPlan(ordered, flags)
+    if sample is not None:
+        scale = len(table) / len(sample)
+        counts = _run_on_sample(optimized, sample)
+        optimized.estimated_rows = [round(counts[step["position"]][1] * scale) for step in ordered]
+
+    return optimized
+
+
+def select_cleaning_plan(plan: CleaningPlan, table: DataFrame = None, sample_size: int = 10_000) -> CleaningPlan:
+    """Returns the optimized plan if reordering the steps changes neither the
+    cleaned table nor the statistics of any step, and otherwise the plan in
+    its configured order, with flags explaining why it was not reordered.
+    Running the returned plan gives the same result as running each option
+    in turn."""
+    optimized = optimize_cleaning_plan(plan, table, sample_size)
+    reordered = [step["position"] for step in optimized.steps] != [step["position"] for step in plan.steps]
+    if not optimized.flags or not reordered:
+        return optimized
+
+    kept = CleaningPlan(plan.steps, [
+        "The configured step order was kept, because running filters first would change the results:",
+        *optimized.flags
+    ])
+    if table is not None and len(table):
+        sample = _sample_table(table, sample_size)
+        scale = len(table) / len(sample)
+        counts = _run_on_sample(kept, sample)
+        kept.estimated_rows = [round(counts[step["position"]][1] * scale) for step in kept.steps]
+
+    return kept
+
+
+def _describe_reordering(original: list[dict], ordered: list[dict]) -> list[str]:
+    flags = []
+    new_positions = {step["position"]: index for index, step in enumerate(ordered)}
+
+    for step in original:
+        moved_before = [
+            other for other in original
+            if other["operation"] in ROW_FILTERS
+            and other["position"] > step["position"]
+            and new_positions[other["position"]] < new_positions[step["position"]]
+        ]
+        if not moved_before:
+            continue
+
+        columns = ", ".join(sorted({f"\"{other['column']}\"" for other in moved_before}))
+        if is_row_dependent(step):
+            flags.append(
+                f"{step['description'].rstrip('.')} on \"{step['column']}\" would run after the filters on "
+                f"{columns}, so inferred types and categories would only reflect the remaining rows."
+            )
+        elif step["operation"] in (Configuration.DELETE_DUPLICATES, Configuration.DROP_MISSING):
+            flags.append(
+                f"Rows removed by the filters on {columns} would no longer be counted by "
+                f"\"{step['description'].rstrip('.')}\", which would run after them."
+            )
+
+    return flags
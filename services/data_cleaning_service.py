@@ -1,20 +1,31 @@
+import ast
 import os
 import re
 import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
+from typing import Callable
 
 import pandas as pd
-from fuzzywuzzy import process
-from pandas import DataFrame
+from pandas import DataFrame, Series
 
-from model import DataModel
-from services import AbstractService
-from utils import Configuration
+from core.category_index import CategoryIndex
+from core.category_correction import INDEX_THRESHOLD, apply_correction_map, build_correction_map, get_used_categories
+from core.configuration_enums import Configuration
+from core.correction_store import CorrectionStore
+from core.string_similarity import DEFAULT_SCORER, extract_one
+from core.table_store import TableStore
+from services.abstract_service import AbstractService
+from services.batch_cleaning import add_step_stats, apply_config_template, init_batch_stats
+from services.cleaning_plan import CleaningPlan, build_cleaning_plan, convert_data_type, select_cleaning_plan, \
+    truncate_series
+from services.streaming_cleaner import StreamingCleaner
 
 
 class DataCleaningService(AbstractService):
     @property
-    def model(self) -> DataModel:
+    def model(self) -> TableStore:
         return self._model
 
     @property
@@ -29,13 +40,18 @@ class DataCleaningService(AbstractService):
     def table(self) -> DataFrame:
         return self._table
 
-    def __init__(self, model: DataModel):
+    def __init__(self, model: TableStore, correction_store: CorrectionStore = None):
         self._model = model
+        self._correction_store = correction_store
         self._cleaning_script = None
         self._loaded_script_content = None
         self._table_name = None
         self._table: DataFrame = pd.DataFrame()
 
+        # N-gram indexes over large vocabularies, keyed by the vocabulary they were built from
+        self._category_indexes: dict[tuple, CategoryIndex] = {}
+        self._category_index_lock = threading.Lock()
+
     def set_and_retrieve_table(self, table_name: str) -> dict:
         self._table_name = table_name
         self._table = self._model.get_table(table_name)
@@ -48,20 +64,7 @@ class DataCleaningService(AbstractService):
 
     def set_data_type(self, column: str, data_type: str) -> int:
         if self._table[column].dtype != data_type:
-            if data_type == "int64":
-                self._table[column] = pd.to_numeric(self._table[column], errors="coerce")
-                try:
-                    self._table[column] = self._table[column].astype("int64")
-                except ValueError:
-                    # Use nullable integer data type
-                    self._table[column] = self._table[column].astype("Int64")
-            elif data_type == "float64":
-                self._table[column] = pd.to_numeric(self._table[column], errors="coerce")
-                self._table[column] = self._table[column].astype(data_type)
-            elif data_type == "datetime64[ns]":
-                self._table[column] = pd.to_datetime(self._table[column], errors="coerce")
-            else:
-                self._table[column] = self._table[column].astype(data_type)
+            self._table[column] = convert_data_type(self._table[column], data_type)
             self._model.set_table(self._table_name, self._table)
 
             return 1
@@ -142,13 +145,32 @@ class DataCleaningService(AbstractService):
 
         return before - after
 
-    def get_categories(self, column: str):
+    def get_categories(self, column: str, like: str = None, limit: int = 20):
         if self._table[column].dtype == "category":
-            return self._table[column].cat.categories
+            categories = self._table[column].cat.categories
         else:
-            return self._table[column].unique()
-
-    def clean_categories(self, column: str, correction_map: dict) -> int:
+            categories = self._table[column].unique()
+
+        if like is None:
+            return categories
+
+        # Narrow large columns to the categories most similar to the given value
+        index = self.get_category_index(pd.Series(categories).dropna().astype(str).tolist())
+        return [match[0] for match in index.extract(like, limit=limit)]
+
+    def get_category_index(self, categories: list[str]) -> CategoryIndex:
+        """Returns an n-gram index over the categories, reusing the last
+        index built for the same vocabulary."""
+        key = tuple(categories)
+        with self._category_index_lock:
+            if key not in self._category_indexes:
+                # Only the most recent vocabularies are worth keeping
+                if len(self._category_indexes) >= 4:
+                    self._category_indexes.pop(next(iter(self._category_indexes)))
+                self._category_indexes[key] = CategoryIndex(categories)
+            return self._category_indexes[key]
+
+    def clean_categories(self, column: str, correction_map: dict, vocabulary: str = None) -> int:
         if not self._table[column].dtype == "category":
             raise ValueError(f"The \"{column}\" column is not categorical.")
 
@@ -160,23 +182,76 @@ class DataCleaningService(AbstractService):
         changed = (original != replaced).sum()
         self._model.set_table(self._table_name, self._table)
 
+        if self._correction_store is not None:
+            self._correction_store.record(vocabulary or column, correction_map)
+
         return changed
 
-    def autocorrect_categories(self, column: str, correct_categories: list[str]) -> int:
-        if not self._table[column].dtype == "category":
+    def autocorrect_categories(
+            self,
+            column: str,
+            correct_categories: list[str],
+            scorer: str = DEFAULT_SCORER,
+            vocabulary: str = None
+    ) -> int:
+        """Corrects the column's categories towards the correct ones. Values
+        with a remembered correction under the vocabulary (the column name by
+        default) are looked up directly, and only the remaining new values are
+        fuzzy matched. New matches are remembered for later runs."""
+        self._table[column], changed = self.correct_category_series(
+            column, self._table[column], correct_categories, scorer, vocabulary
+        )
+        self._model.set_table(self._table_name, self._table)
+
+        return changed
+
+    def correct_category_series(
+            self,
+            column: str,
+            series: Series,
+            correct_categories: list[str],
+            scorer: str = DEFAULT_SCORER,
+            vocabulary: str = None
+    ) -> tuple[Series, int]:
+        """Corrects a categorical column's values without storing it in the
+        table. Returns the corrected column and the number of rows changed."""
+        if not series.dtype == "category":
             raise ValueError(f"The \"{column}\" column is not categorical.")
 
-        original = self._table[column].astype(str).copy()
-        replaced = self._table[column].astype(str).apply(lambda row: correct_spelling(row, correct_categories))
+        key = vocabulary or column
+        correct = set(correct_categories)
+        known = self._correction_store.get_corrections(key) if self._correction_store is not None else {}
+
+        # Match each distinct category once, skipping values that are already correct or known
+        correction_map = {}
+        new_values = []
+        for value in get_used_categories(series):
+            if value in correct:
+                continue
+            if known.get(value) in correct:
+                correction_map[value] = known[value]
+            else:
+                new_values.append(value)
 
-        new_categories = replaced.astype("category")
+        index = self.get_category_index(correct_categories) if len(correct_categories) > INDEX_THRESHOLD else None
+        matched = build_correction_map(new_values, correct_categories, scorer=scorer, index=index)
+        correction_map.update(matched)
 
-        self._table[column] = new_categories
+        if self._correction_store is not None and matched:
+            self._correction_store.record(key, matched)
 
-        changed = (original != replaced).sum()
-        self._model.set_table(self._table_name, self._table)
+        # Rebuild the column from its codes
+        return apply_correction_map(series, correction_map)
 
-        return changed
+    def execute_cleaning_plan(self, plan: CleaningPlan, on_step: Callable[[dict, dict], None] = None, workers: int = 1):
+        """Runs a compiled cleaning plan over the current table in one pass and
+        stores the result once, rewriting independent columns on up to
+        `workers` threads. See CleaningPlan.execute for on_step."""
+        if not len(plan):
+            return
+
+        self._table = plan.execute(self._table, self.correct_category_series, on_step, workers)
+        self._model.set_table(self._table_name, self._table)
 
     def trim_strings(self, column: str) -> int:
         original = self._table[column].copy()
@@ -187,12 +262,7 @@ class DataCleaningService(AbstractService):
         return changed
 
     def truncate_strings(self, column: str, max_length: int) -> int:
-        if not pd.api.types.is_string_dtype(self._table[column]):
-            raise ValueError(f"The \"{column}\" column is not a string data type.")
-
-        original = self._table[column].copy()
-        self._table[column] = self._table[column].str.slice(0, max_length)
-        changed = self._table[column][original != self._table[column]].count()
+        self._table[column], changed = truncate_series(self._table[column], max_length)
         self._model.set_table(self._table_name, self._table)
 
         return changed
@@ -280,6 +350,83 @@ class DataCleaningService(AbstractService):
 
         return before - after
 
+    def replay_config(
+            self,
+            cleaning_config: dict,
+            workers: int = 1,
+            on_step: Callable[[dict, dict], None] = None
+    ) -> dict:
+        """Runs a saved cleaning configuration on the current table through the
+        cleaning plan, storing the result once. Options for columns the table
+        does not have are skipped. Returns the cleaning statistics."""
+        config = apply_config_template(cleaning_config, list(self._table.columns))
+        plan = select_cleaning_plan(build_cleaning_plan(config), self._table)
+        stats = init_batch_stats()
+
+        def record(step: dict, result: dict):
+            add_step_stats(stats, step, result)
+            if on_step is not None:
+                on_step(step, result)
+
+        self.execute_cleaning_plan(plan, record, workers)
+        return stats
+
+    def clean_tables(
+            self,
+            configs: dict[str, dict],
+            workers: int = 4,
+            on_progress: Callable[[str, int], None] = None,
+            on_table_finished: Callable[[str, dict], None] = None
+    ) -> dict[str, dict]:
+        """Cleans several tables of the model at once, each with its own
+        configuration, on a pool of `workers` threads. Every cleaned table is
+        stored in the model as soon as it finishes, from the calling thread.
+
+        on_progress receives a table name and its percentage of steps done,
+        and on_table_finished a table name and its result. Returns the result
+        of every table: its row counts and cleaning statistics, with the error
+        message if cleaning it failed (in which case the table is unchanged)."""
+        def clean_table(table_name: str, config: dict) -> tuple[DataFrame, dict]:
+            table = self._model.get_table(table_name)
+            plan = select_cleaning_plan(build_cleaning_plan(config), table)
+            stats = init_batch_stats()
+            done = [0]
+
+            def record(step: dict, result: dict):
+                add_step_stats(stats, step, result)
+                done[0] += 1
+                if on_progress is not None:
+                    on_progress(table_name, round(100 * done[0] / len(plan)))
+
+            cleaned = plan.execute(table, self.correct_category_series, record)
+            return cleaned, {"rows_before": len(table), "rows_after": len(cleaned), **stats, "error": None}
+
+        results = {}
+        with ThreadPoolExecutor(max(workers, 1)) as pool:
+            futures = {pool.submit(clean_table, table_name, config): table_name for table_name, config in configs.items()}
+            for future in as_completed(futures):
+                table_name = futures[future]
+                try:
+                    cleaned, result = future.result()
+                except Exception as e:
+                    result = {"error": str(e)}
+                else:
+                    self._model.set_table(table_name, cleaned)
+                    if table_name == self._table_name:
+                        self._table = cleaned
+
+                results[table_name] = result
+                if on_table_finished is not None:
+                    on_table_finished(table_name, result)
+
+        # Report tables in the order they were given rather than the order they finished
+        return {table_name: results[table_name] for table_name in configs}
+
+    def create_streaming_cleaner(self, config: dict, chunk_size: int = 100_000, csv_config: dict = None) -> StreamingCleaner:
+        """Returns a cleaner that applies the configuration to files chunk by
+        chunk, sharing this service's remembered category corrections."""
+        return StreamingCleaner(config, chunk_size, csv_config, self._correction_store)
+
     def set_cleaning_script(self, script: str):
         # Validate cleaning script before loading
         if "# CLEANING ASSISTANT SCRIPT FILE" in script:
@@ -290,14 +437,21 @@ class DataCleaningService(AbstractService):
         lines = [
             "import pandas as pd",
             "from pathlib import Path",
-            "from fuzzywuzzy import process",
+            "try:",
+            "\tfrom rapidfuzz import process",
+            "\tfrom rapidfuzz.utils import default_process as processor",
+            "except ImportError:",
+            "\tfrom fuzzywuzzy import process",
+            "\tfrom fuzzywuzzy.utils import full_process as processor",
             "def correct_spelling(row, categories: list):",
-            "\tmatch = process.extractOne(row, categories)",
-            "\tif match[1] >= 80:",
+            "\tif not isinstance(row, str):",
+            "\t\treturn row",
+            "\tmatch = process.extractOne(row, categories, processor=processor, score_cutoff=80)",
+            "\tif match:",
             "\t\treturn match[0]",
             "\telse:",
             "\t\treturn row",
-            f"df = pd.read_csv('{self._table_name}.csv')"
+            f"df = pd.read_csv({f'{self._table_name}.csv'!r})"
         ]
 
         # Column-specific cleaning
@@ -306,35 +460,36 @@ class DataCleaningService(AbstractService):
                 if key == Configuration.DATA_TYPE:
                     if self._table[column].dtype != value:
                         if value == "int64":
-                            lines.append(f"df[{column}] = pd.to_numeric(df[{column}], errors='coerce')")
+                            lines.append(f"df[{column!r}] = pd.to_numeric(df[{column!r}], errors='coerce')")
                             lines.append(f"try:")
-                            lines.append(f"\tdf[{column}] = df[{column}].astype({value})")
+                            lines.append(f"\tdf[{column!r}] = df[{column!r}].astype({value!r})")
                             lines.append(f"except ValueError:")
-                            lines.append(f"\tdf[{column}] = df[{column}].astype('Int64')")
+                            lines.append(f"\tdf[{column!r}] = df[{column!r}].astype('Int64')")
                         elif value == "float64":
-                            lines.append(f"df[{column}] = pd.to_numeric(df[{column}], errors='coerce')")
-                            lines.append(f"df[{column}] = df[{column}].astype('float64')")
+                            lines.append(f"df[{column!r}] = pd.to_numeric(df[{column!r}], errors='coerce')")
+                            lines.append(f"df[{column!r}] = df[{column!r}].astype('float64')")
                         elif value == "datetime64[ns]":
-                            lines.append(f"df[{column}] = pd.to_datetime(df[{column}], errors='coerce')")
+                            lines.append(f"df[{column!r}] = pd.to_datetime(df[{column!r}], errors='coerce')")
                         else:
-                            lines.append(f"df[{column}] = df[{column}].astype({value})")
-                elif key == Configuration.INT_MIN:
-                    lines.append(f"df[{column}] = df[df[{column}] >= {value}]")
-                elif key == Configuration.INT_MAX:
-                    lines.append(f"df[{column}] = df[df[{column}] <= {value}]")
-                elif key == Configuration.FLOAT_MIN:
-                    lines.append(f"df[{column}] = df[df[{column}] >= {value}]")
-                elif key == Configuration.FLOAT_MAX:
-                    lines.append(f"df[{column}] = df[df[{column}] <= {value}]")
+                            lines.append(f"df[{column!r}] = df[{column!r}].astype({value!r})")
+                elif value == "":
+                    # Unset limits and empty category lists do nothing
+                    continue
+                elif key in (Configuration.INT_MIN, Configuration.FLOAT_MIN):
+                    lines.append(f"df = df[df[{column!r}] >= {float(value)!r}]")
+                elif key in (Configuration.INT_MAX, Configuration.FLOAT_MAX):
+                    lines.append(f"df = df[df[{column!r}] <= {float(value)!r}]")
                 elif key == Configuration.STRING_MAX:
-                    lines.append(f"df[{column}] = df[{column}].str.slice(0, {value})")
+                    lines.append(f"df[{column!r}] = df[{column!r}].str.slice(0, {int(value)})")
                 elif key == Configuration.DATE_MIN:
-                    lines.append(f"df[{column}] = df[df[{column}] >= {value}]")
+                    lines.append(f"df = df[df[{column!r}] >= pd.to_datetime({value!r})]")
                 elif key == Configuration.DATE_MAX:
-                    lines.append(f"df[{column}] = df[df[{column}] <= {value}]")
+                    lines.append(f"df = df[df[{column!r}] <= pd.to_datetime({value!r})]")
                 elif key == Configuration.CATEGORIES:
-                    lines.append(f"df[{column}] = df[{column}].apply(lambda row: correct_spelling(row, {value}))")
-                    lines.append(f"df[{column}] = df[{column}].astype('category')")
+                    lines.append(
+                        f"df[{column!r}] = df[{column!r}].apply(lambda row: correct_spelling(row, {value.split()!r}))"
+                    )
+                    lines.append(f"df[{column!r}] = df[{column!r}].astype('category')")
 
         # General cleaning options
         if config[Configuration.DELETE_DUPLICATES]:
@@ -343,14 +498,12 @@ class DataCleaningService(AbstractService):
         if config[Configuration.DROP_MISSING]:
             lines.append(f"df = df.dropna()")
         elif config[Configuration.IMPUTE_MISSING_MEAN]:
-            for column in self._table.columns:
-                lines.append(f"df[{column}] = df[{column}].fillna(df[{column}].mean())")
+            lines.append(f"df = df.fillna(df.mean(numeric_only=True))")
         elif config[Configuration.IMPUTE_MISSING_MEDIAN]:
-            for column in self._table.columns:
-                lines.append(f"df[{column}] = df[{column}].fillna(df[{column}].median())")
+            lines.append(f"df = df.fillna(df.median(numeric_only=True))")
 
         lines.append(f"desktop = Path.home() / 'Desktop'")
-        lines.append(f"file_path = desktop / '{self._table_name}.csv'")
+        lines.append(f"file_path = desktop / {f'{self._table_name}.csv'!r}")
 
         lines.append(f"df.to_csv(file_path, index=False)")
         lines.append(f"print('Output saved to desktop.')")
@@ -368,26 +521,77 @@ class DataCleaningService(AbstractService):
         file_path = Path(f"{folder}/cleaning_script.py")
         file_path.write_text(self._cleaning_script)
 
-    def apply_cleaning_script(self, script_path: str) -> bool:
-        self._loaded_script_content = ""
-
+    def _read_cleaning_script(self, script_path: str) -> tuple[list[str], str] | None:
+        """Returns the lines of a generated cleaning script and the name of the
+        table it reads, or None if the file is not a cleaning script."""
         with open(script_path, "r") as file:
             self._loaded_script_content = file.read()
 
         lines = self._loaded_script_content.splitlines()
-        if not lines[-1].startswith("# CLEANING ASSISTANT SCRIPT FILE"):
-            return False
+        if not lines or not lines[-1].startswith("# CLEANING ASSISTANT SCRIPT FILE"):
+            return None
 
-        # Temporarily place CSV file in current directory
-        table_name = None
         for line in lines:
-            match = re.search(r'read_csv\(\s*[\'"]([\w_]+)\.csv[\'"]\s*\)', line)
+            match = re.match(r"df\s*=\s*pd\.read_csv\((.*)\)\s*$", line)
             if match:
-                table_name = match.group(1)
+                # Any table name can appear in the file name, so the argument is read as a string literal
+                try:
+                    file_name = ast.literal_eval(match.group(1))
+                except (ValueError, SyntaxError):
+                    return None
+                if isinstance(file_name, str) and file_name.endswith(".csv"):
+                    return lines, file_name.removesuffix(".csv")
+                return None
+
+        return None
+
+    def run_cleaning_script(self, script_path: str):
+        """Runs a cleaning script's transformations in this process on the
+        table it was generated for, and stores the resulting table. The script
+        runs in a separate namespace with the table bound to `df` in place of
+        reading the CSV file, and the lines writing the output are skipped.
+        The namespace keeps the full builtins and can import any module, so
+        this is not a sandbox: only run scripts from a trusted source. Raises
+        a ValueError describing why the script could not be run or failed."""
+        script = self._read_cleaning_script(script_path)
+        if script is None:
+            raise ValueError("The file is not a cleaning script generated by this application.")
+        lines, table_name = script
+
+        if table_name not in (self._model.get_database() or {}):
+            raise ValueError(f"The script cleans the \"{table_name}\" table, which is not loaded.")
+
+        # Keep the setup before the CSV is read and the transformations up to where the output is written
+        body = []
+        for line in lines:
+            if re.search(r"^df\s*=\s*pd\.read_csv\(", line):
+                continue
+            if line.startswith("desktop = ") or ".to_csv(" in line:
                 break
-
-        if not table_name:
-            return False
+            body.append(line)
+
+        namespace = {"__name__": "__cleaning_script__", "df": self._model.get_table(table_name).copy()}
+        try:
+            exec(compile("\n".join(body), script_path, "exec"), namespace)
+        except Exception as e:
+            raise ValueError(f"The script failed with {type(e).__name__}: {e}") from e
+
+        result = namespace.get("df")
+        if not isinstance(result, DataFrame):
+            raise ValueError("The script did not leave a table in \"df\".")
+
+        self._model.set_table(table_name, result)
+        if table_name == self._table_name:
+            self._table = result
+
+    def apply_cleaning_script(self, script_path: str):
+        """Runs a cleaning script as a separate Python process on a CSV export
+        of its table, leaving the script to write its own output. Raises a
+        ValueError with the script's error output if it fails."""
+        script = self._read_cleaning_script(script_path)
+        if script is None:
+            raise ValueError("The file is not a cleaning script generated by this application.")
+        _, table_name = script
 
         csv_path = f"{table_name}.csv"
 
@@ -404,17 +608,16 @@ class DataCleaningService(AbstractService):
             os.remove(csv_path)
 
         if result.returncode != 0:
-            return False
-
-        return True
+            error = result.stderr.strip().splitlines()
+            raise ValueError(f"The script failed: {error[-1] if error else f'exit code {result.returncode}'}")
 
-def correct_spelling(row, categories: list):
+def correct_spelling(row, categories: list, scorer: str = DEFAULT_SCORER):
     """Support function for correcting category spelling errors"""
     if pd.isna(row):
         return row
 
-    match = process.extractOne(row, categories)
-    if match[1] >= 80: # Similarity score threshold for replacement
+    match = extract_one(row, categories, scorer, score_cutoff=80) # Similarity score threshold for replacement
+    if match:
         return match[0]
     else:
         return row
@@ -3,7 +3,7 @@ from pathlib import Path
 import pandas as pd
 from pandas import Series, DataFrame
 
-from model import DataModel
+from core import TableStore
 from services import AbstractService
 
 
@@ -37,10 +37,10 @@ def get_dataframe_diff(table_name: str, old_row_df: DataFrame, new_row_df: DataF
 
 class DataEditorService(AbstractService):
     @property
-    def model(self) -> DataModel:
+    def model(self) -> TableStore:
         return self._model
 
-    def __init__(self, model: DataModel):
+    def __init__(self, model: TableStore):
         self._model = model
         self.current_table: DataFrame = pd.DataFrame()
         self.undo_stack: list[list[dict]] = []
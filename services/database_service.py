@@ -5,9 +5,9 @@ import pandas as pd
 from pandas import DataFrame
 from sqlalchemy import create_engine, text, URL
 
-from model import DataModel
-from services import AbstractService
-from services import DatabaseAccess
+from core.table_store import TableStore
+from services.abstract_service import AbstractService
+from services.database_access import DatabaseAccess
 
 
 class DatabaseService(AbstractService, DatabaseAccess):
@@ -16,10 +16,10 @@ class DatabaseService(AbstractService, DatabaseAccess):
         return self._data_files
 
     @property
-    def model(self) -> DataModel:
+    def model(self) -> TableStore:
         return self._model
 
-    def __init__(self, model: DataModel):
+    def __init__(self, model: TableStore):
         self.engine = None
         self._model = model
         self._db_connection_details: dict = {}
@@ -92,7 +92,11 @@ class DatabaseService(AbstractService, DatabaseAccess):
         self._set_engine()
 
         tables = self._load_tables_database()
-        self._model.set_database(tables)
+        sources = {
+            table_name: {"engine": self.engine, "schema": "public", "table": table_name}
+            for table_name in tables
+        }
+        self._model.set_database(tables, sources)
 
         return True
 
@@ -1,13 +1,62 @@
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from collections.abc import Iterator
+from pathlib import Path
+
+import pandas as pd
 from pandas import DataFrame
-from pandasql import sqldf
+from pandas.errors import DatabaseError
+from sqlalchemy.exc import SQLAlchemyError
 
-from model import DataModel
+from core import TableStore
 from services import AbstractService
 
+_SQL_TOKEN_PATTERN = re.compile(r"""
+    \s+
+    |--[^\n]*
+    |/\*.*?\*/
+    |'(?:[^']|'')*'
+    |"(?P<double>(?:[^"]|"")*)"
+    |`(?P<backtick>[^`]*)`
+    |\[(?P<bracket>[^\]]*)\]
+    |(?P<word>[A-Za-z_][A-Za-z0-9_$]*)
+    |(?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+    |(?P<symbol>[(),.;])
+    |\|\||<<|>>|<=|>=|==|!=|<>
+    |[^\s]
+""", re.VERBOSE | re.DOTALL)
+
+# Words that end a FROM clause
+_SQL_CLAUSE_END_WORDS = {
+    "WHERE", "GROUP", "ORDER", "HAVING", "LIMIT", "OFFSET", "UNION", "INTERSECT", "EXCEPT", "WINDOW",
+    "RETURNING", "SET", "VALUES", "SELECT"
+}
+
+# Words inside a FROM clause that are never table names
+_SQL_CLAUSE_WORDS = _SQL_CLAUSE_END_WORDS | {
+    "JOIN", "INNER", "LEFT", "RIGHT", "FULL", "OUTER", "CROSS", "NATURAL", "ON", "USING", "AS", "INDEXED",
+    "NOT", "FROM", "LATERAL"
+}
+
+# Scratch table holding edited rows while they are copied into a mirrored table,
+# with each row's position in the table as the mirror rowid
+_CHANGED_ROWS_TABLE = "query_mirror_changed_rows"
+_ROW_ID_COLUMN = "query_mirror_rowid"
+
+# Functions and keywords whose results change between runs of the same query
+_SQL_VOLATILE_WORDS = {
+    "RANDOM", "RANDOMBLOB", "CHANGES", "TOTAL_CHANGES", "LAST_INSERT_ROWID",
+    "CURRENT_DATE", "CURRENT_TIME", "CURRENT_TIMESTAMP"
+}
+
 
 class QueryService(AbstractService):
     @property
-    def model(self) -> DataModel:
+    def model(self) -> TableStore:
         return self._model
 
     @property
@@ -16,18 +65,997 @@ class QueryService(AbstractService):
 
     @property
     def last_query_result(self) -> DataFrame:
-        return self._last_query_result
+        return self.get_last_result()
 
-    def __init__(self, model: DataModel):
+    def __init__(self, model: TableStore, max_cache_bytes: int = 256 * 1024 ** 2, max_logged_queries: int = 500):
         self._model = model
         self._query = None
         self._last_query_result = None
+        self._last_query_blocks: list[DataFrame] | None = None
+
+        # Query results keyed by normalized query and referenced table versions
+        self._max_cache_bytes = max_cache_bytes
+        self._result_cache: OrderedDict[tuple, tuple[DataFrame, int]] = OrderedDict()
+        self._cache_bytes = 0
+        self._cache_lock = threading.RLock()
+
+        # Persistent in-memory SQL mirror of the model's tables, shared by
+        # one connection per running query. Only syncs write through
+        # self._connection; queries use read-only connections.
+        self._database_uri = f"file:query_mirror_{uuid.uuid4().hex}?mode=memory&cache=shared"
+        self._connection = sqlite3.connect(self._database_uri, uri=True, check_same_thread=False)
+        self._query_connection = self.open_connection()
+        self._synced_versions: dict[str, int] = {}
+
+        # Tables are only re-synced while no query is reading the mirror
+        self._condition = threading.Condition(threading.RLock())
+        self._active_queries = 0
+
+        # User-declared mirror indexes by table and index name, and which are built
+        self._indexes: dict[str, dict[str, list[str]]] = {}
+        self._built_indexes: set[str] = set()
+        self._dropped_indexes: set[str] = set()
+
+        # Cursors with open statements, which block changes to the mirror
+        self._open_cursors: set[QueryCursor] = set()
+        self._cursor_lock = threading.Lock()
+
+        # Queries on unmodified database tables can run on the source server.
+        # Remote connections are tracked per mirror connection for cancelling.
+        self._pushdown_enabled = True
+        self._remote_executions: dict[sqlite3.Connection, dict] = {}
+
+        # Profiles of the queries run this session, oldest first
+        self._query_log: deque[dict] = deque(maxlen=max_logged_queries)
 
     def set_query(self, query: str):
         self._query = query
 
-    def execute_query(self) -> DataFrame:
-        return sqldf(self._query, env=self._model.get_database())
+    def open_connection(self) -> sqlite3.Connection:
+        """Opens a read-only connection to the SQL mirror, so queries cannot
+        change the mirrored tables behind the model. Running queries can be
+        stopped from another thread with the connection's interrupt()."""
+        connection = sqlite3.connect(self._database_uri, uri=True, check_same_thread=False)
+        connection.execute("PRAGMA query_only = ON")
+        return connection
+
+    def set_pushdown_enabled(self, enabled: bool):
+        self._pushdown_enabled = enabled
+
+    def get_pushdown_source(self, query: str, table_names: list[str]) -> dict | None:
+        """Returns the source database for a query if pushdown is enabled, the
+        query is a single read-only SELECT statement, and every referenced
+        table was loaded from that database and has not been modified since.
+        Otherwise the query has to run on the local mirror."""
+        if not self._pushdown_enabled or not table_names or not is_select_query(query):
+            return None
+
+        sources = [self._model.get_table_source(table_name) for table_name in table_names]
+        if any(source is None for source in sources):
+            return None
+        if len({(id(source["engine"]), source["schema"]) for source in sources}) > 1:
+            return None
+
+        return sources[0]
+
+    def interrupt(self, connection: sqlite3.Connection):
+        """Stops the statement running on a mirror connection from another
+        thread, including a query pushed down to the source database on the
+        connection's behalf."""
+        try:
+            connection.interrupt()
+        except sqlite3.ProgrammingError:
+            # The connection was already closed by a finishing query
+            pass
+
+        with self._cursor_lock:
+            execution = self._remote_executions.get(connection)
+            if execution is None:
+                return
+            execution["cancelled"] = True
+            remote_connection = execution["connection"]
+
+        if remote_connection is not None:
+            cancel_remote_statement(remote_connection)
+
+    def execute_query(self, query: str = None, connection: sqlite3.Connection = None,
+                      explain: bool = False) -> DataFrame:
+        """Runs a query (the current one by default), on the source database if
+        possible and otherwise after syncing only the tables it references.
+        Queries on separate connections run concurrently. Results are cached
+        until a referenced table changes, so repeated queries return
+        immediately. Raises ValueError if the query is not a single SELECT
+        statement or names a table that is not loaded. The timings of the run are added to the query log, along with
+        the query plan if explain is set."""
+        query = query if query is not None else self._query
+        connection = connection or self._query_connection
+        profile = new_query_profile(query)
+        cache_key, cached_result, source = self._begin_execution(query, profile)
+        if cached_result is not None:
+            return cached_result.copy(deep=False)
+
+        result_rows = None
+        if source is not None:
+            try:
+                remote_connection, remote_result = self._execute_remote(source, query, profile, connection, explain)
+                try:
+                    start = time.perf_counter()
+                    columns = list(remote_result.keys())
+                    result_rows = [tuple(row) for row in remote_result.fetchall()]
+                    profile["execution_seconds"] += time.perf_counter() - start
+                finally:
+                    remote_connection.close()
+            except SQLAlchemyError as e:
+                self._fall_back_to_local(query, profile, e)
+
+        if result_rows is None:
+            try:
+                if explain:
+                    self._explain(connection, query, profile)
+
+                start = time.perf_counter()
+                sqlite_cursor = execute_statement(connection, query)
+                result_rows = sqlite_cursor.fetchall()
+                columns = [column[0] for column in sqlite_cursor.description or []]
+                profile["execution_seconds"] = time.perf_counter() - start
+            finally:
+                self._end_execution()
+
+        start = time.perf_counter()
+        result = DataFrame.from_records(result_rows, columns=columns, coerce_float=True)
+        profile["conversion_seconds"] = time.perf_counter() - start
+        profile["rows"] = len(result)
+
+        self.cache_result(cache_key, result)
+        self.set_last_result([result])
+
+        return result.copy(deep=False)
+
+    def open_cursor(self, query: str = None, connection: sqlite3.Connection = None,
+                    explain: bool = False, keep_result: bool = True) -> "QueryCursor":
+        """Runs a query and returns a cursor that fetches its rows in blocks
+        on demand instead of materializing the whole result. Queries are
+        pushed down to the source database where possible. The cursor takes
+        ownership of the given connection, or opens its own, and closes it
+        when the cursor is closed. The cursor's profile is kept in the query
+        log and updated as rows are fetched. Once the cursor is exhausted its
+        rows become the last query result, unless keep_result is unset."""
+        query = query if query is not None else self._query
+        connection = connection or self.open_connection()
+        profile = new_query_profile(query)
+
+        try:
+            cache_key, cached_result, source = self._begin_execution(query, profile)
+        except Exception:
+            connection.close()
+            raise
+
+        if cached_result is not None:
+            connection.close()
+            return QueryCursor(self, query, list(cached_result.columns), dataframe=cached_result, profile=profile,
+                               keep_result=keep_result)
+
+        if source is not None:
+            try:
+                remote_connection, remote_result = self._execute_remote(
+                    source, query, profile, connection, explain, stream=True
+                )
+                connection.close()
+                return QueryCursor(self, query, list(remote_result.keys()), result=remote_result,
+                                   connection=remote_connection, cache_key=cache_key, profile=profile,
+                                   keep_result=keep_result)
+            except SQLAlchemyError as e:
+                try:
+                    self._fall_back_to_local(query, profile, e)
+                except Exception:
+                    connection.close()
+                    raise
+
+        try:
+            if explain:
+                self._explain(connection, query, profile)
+
+            start = time.perf_counter()
+            sqlite_cursor = execute_statement(connection, query)
+            profile["execution_seconds"] = time.perf_counter() - start
+        except Exception:
+            connection.close()
+            raise
+        finally:
+            self._end_execution()
+
+        columns = [column[0] for column in sqlite_cursor.description or []]
+        cursor = QueryCursor(self, query, columns, result=sqlite_cursor, connection=connection,
+                             cache_key=cache_key, profile=profile, keep_result=keep_result)
+        with self._cursor_lock:
+            self._open_cursors.add(cursor)
+
+        return cursor
+
+    def explain_query(self, query: str = None) -> list[str]:
+        """Returns the SQLite query plan as indented lines without running the
+        query."""
+        query = query if query is not None else self._query
+        profile = new_query_profile(query)
+        self._begin_execution(query, profile, use_cache=False, log=False, pushdown=False)
+
+        try:
+            return self._explain(self._query_connection, query, profile)
+        finally:
+            self._end_execution()
+
+    def get_query_log(self) -> list[dict]:
+        return list(self._query_log)
+
+    def clear_query_log(self):
+        self._query_log.clear()
+
+    def _explain(self, connection: sqlite3.Connection, query: str, profile: dict) -> list[str]:
+        # Cached EXPLAIN statements are not re-prepared after schema changes,
+        # so the statement text includes the schema version
+        start = time.perf_counter()
+        schema_version = connection.execute("PRAGMA schema_version").fetchone()[0]
+        plan_rows = execute_statement(connection, f"EXPLAIN QUERY PLAN /* {schema_version} */ {query}").fetchall()
+        profile["planning_seconds"] = time.perf_counter() - start
+
+        # Rows are (id, parent, unused, detail); indent each step under its parent
+        depths = {0: -1}
+        plan = []
+        for step_id, parent_id, _, detail in plan_rows:
+            depths[step_id] = depths.get(parent_id, -1) + 1
+            plan.append("  " * depths[step_id] + detail)
+
+        profile["plan"] = plan
+        return plan
+
+    def count_rows(self, query: str = None, connection: sqlite3.Connection = None) -> int:
+        """Counts the rows a query returns without fetching them."""
+        query = query if query is not None else self._query
+        connection = connection or self._query_connection
+        profile = new_query_profile(query)
+        _, cached_result, source = self._begin_execution(query, profile, log=False)
+        if cached_result is not None:
+            return len(cached_result)
+
+        count_query = f"SELECT COUNT(*) FROM (\n{query.strip().rstrip(';')}\n) AS query_result"
+
+        if source is not None:
+            try:
+                remote_connection, remote_result = self._execute_remote(source, count_query, profile, connection)
+                try:
+                    return int(remote_result.scalar())
+                finally:
+                    remote_connection.close()
+            except SQLAlchemyError as e:
+                self._fall_back_to_local(query, profile, e)
+
+        try:
+            return int(execute_statement(connection, count_query).fetchone()[0])
+        finally:
+            self._end_execution()
+
+    def export_query(self, query: str, path: str, chunk_size: int = 50_000,
+                     connection: sqlite3.Connection = None) -> Iterator[int]:
+        """Writes the full result of a query to a CSV file, streaming it from a
+        cursor in chunks. Yields the number of rows written after each chunk;
+        if the export is stopped early the partial file is removed."""
+        cursor = self.open_cursor(query, connection, keep_result=False)
+        rows_written = 0
+        completed = False
+
+        try:
+            with open(path, "w", newline="", encoding="utf-8") as file:
+                while True:
+                    block = cursor.fetch(chunk_size)
+                    if block.empty and rows_written:
+                        break
+                    block.to_csv(file, header=rows_written == 0, index=False)
+                    rows_written += len(block)
+                    yield rows_written
+                    if cursor.exhausted:
+                        break
+            completed = not cursor.stale
+            if cursor.stale:
+                raise DatabaseError("The export stopped because a table in the query changed.")
+        finally:
+            cursor.close()
+            if not completed:
+                Path(path).unlink(missing_ok=True)
+
+    def _begin_execution(self, query: str, profile: dict = None, use_cache: bool = True, log: bool = True,
+                         pushdown: bool = True) -> tuple[tuple | None, DataFrame | None, dict | None]:
+        """Returns the cache key, any cached result and the source database to
+        push the query down to, if any. Raises ValueError for queries that are
+        not a single SELECT statement. Without either, the referenced tables
+        are synced and the query counts as running until _end_execution is
+        called. Sync timings go into the profile, which is added to the query
+        log."""
+        if not is_select_query(query):
+            raise ValueError("Only single SELECT queries can be run. Edit tables in the table view.")
+
+        profile = profile if profile is not None else new_query_profile(query)
+        if log:
+            self._query_log.append(profile)
+
+        database = self._model.get_database() or {}
+        table_names = get_referenced_tables(query, list(database))
+        cache_key = self.get_cache_key(query, table_names) if use_cache else None
+
+        cached_result = self.get_cached_result(cache_key)
+        if cached_result is not None:
+            self.set_last_result([cached_result])
+            profile["cached"] = True
+            profile["rows"] = len(cached_result)
+            return cache_key, cached_result, None
+
+        source = self.get_pushdown_source(query, table_names) if pushdown else None
+        if source is not None:
+            profile["route"] = "source database"
+            return cache_key, None, source
+
+        self._begin_local_execution(table_names, profile)
+        return cache_key, None, None
+
+    def _begin_local_execution(self, table_names: list[str], profile: dict):
+        start = time.perf_counter()
+        with self._condition:
+            profile["synced_tables"] = self.sync_tables(table_names)
+            self._active_queries += 1
+        profile["sync_seconds"] = time.perf_counter() - start
+
+    def _fall_back_to_local(self, query: str, profile: dict, error: Exception):
+        """Prepares a query that failed on the source database, for example
+        because of SQLite-only syntax, to run on the local mirror instead."""
+        profile["route"] = "local"
+        profile["pushdown_error"] = str(error).splitlines()[0]
+        database = self._model.get_database() or {}
+        self._begin_local_execution(get_referenced_tables(query, list(database)), profile)
+
+    def _execute_remote(self, source: dict, query: str, profile: dict, connection: sqlite3.Connection,
+                        explain: bool = False, stream: bool = False):
+        """Runs a query on the source database in a read-only transaction and
+        returns the open connection and result. The connection must be closed
+        by the caller. Raises DatabaseError rather than falling back if
+        interrupted."""
+        execution = {"connection": None, "cancelled": False}
+        with self._cursor_lock:
+            self._remote_executions[connection] = execution
+
+        remote_connection = None
+        try:
+            remote_connection = source["engine"].connect().execution_options(
+                postgresql_readonly=True, stream_results=stream
+            )
+            execution["connection"] = remote_connection
+
+            if source["schema"] != "public":
+                remote_connection.exec_driver_sql(f"SET LOCAL search_path TO {quote_identifier(source['schema'])}")
+
+            if explain:
+                start = time.perf_counter()
+                plan = remote_connection.exec_driver_sql(f"EXPLAIN {query}").fetchall()
+                profile["planning_seconds"] = time.perf_counter() - start
+                profile["plan"] = [str(row[0]) for row in plan]
+
+            if execution["cancelled"]:
+                raise DatabaseError("The query was cancelled.")
+
+            start = time.perf_counter()
+            result = remote_connection.exec_driver_sql(query)
+            profile["execution_seconds"] = time.perf_counter() - start
+
+            return remote_connection, result
+        except Exception as e:
+            if remote_connection is not None:
+                remote_connection.close()
+            if execution["cancelled"] and not isinstance(e, DatabaseError):
+                raise DatabaseError("The query was cancelled.") from e
+            raise
+        finally:
+            with self._cursor_lock:
+                self._remote_executions.pop(connection, None)
+
+    def _end_execution(self):
+        with self._condition:
+            self._active_queries -= 1
+            self._condition.notify_all()
+
+    def release_cursor(self, cursor: "QueryCursor"):
+        with self._cursor_lock:
+            self._open_cursors.discard(cursor)
+
+    def get_cache_key(self, query: str, table_names: list[str]) -> tuple | None:
+        """Returns the result cache key for a query, or None if the query is
+        not a read-only query with repeatable results."""
+        if not is_select_query(query):
+            return None
+        normalized_query = normalize_query(query)
+        if set(normalized_query.split()) & _SQL_VOLATILE_WORDS:
+            return None
+        if "'NOW'" in normalized_query.upper():
+            return None
+
+        versions = tuple((name, self._model.get_table_version(name)) for name in sorted(table_names))
+        return normalized_query, versions
+
+    def get_cached_result(self, cache_key: tuple | None) -> DataFrame | None:
+        with self._cache_lock:
+            if cache_key is None or cache_key not in self._result_cache:
+                return None
+            self._result_cache.move_to_end(cache_key)
+            return self._result_cache[cache_key][0]
+
+    def can_cache(self, size: int) -> bool:
+        return size <= self._max_cache_bytes
+
+    def cache_result(self, cache_key: tuple | None, result: DataFrame):
+        """Stores a result, dropping entries for outdated table versions and
+        then the least recently used entries until the cache fits its memory
+        cap. Results larger than the cap are not cached."""
+        if cache_key is None:
+            return
+
+        size = int(result.memory_usage(index=True, deep=True).sum())
+        if not self.can_cache(size):
+            return
+
+        with self._cache_lock:
+            for key in list(self._result_cache):
+                _, versions = key
+                if any(self._model.get_table_version(name) != version for name, version in versions):
+                    self._cache_bytes -= self._result_cache.pop(key)[1]
+
+            if cache_key in self._result_cache:
+                self._cache_bytes -= self._result_cache.pop(cache_key)[1]
+            self._result_cache[cache_key] = (result, size)
+            self._cache_bytes += size
+
+            while self._cache_bytes > self._max_cache_bytes:
+                _, (_, evicted_size) = self._result_cache.popitem(last=False)
+                self._cache_bytes -= evicted_size
+
+    def clear_cache(self):
+        with self._cache_lock:
+            self._result_cache.clear()
+            self._cache_bytes = 0
+
+    def set_last_result(self, blocks: list[DataFrame]):
+        """Records the result of the last query run to completion, as the
+        blocks of rows a cursor fetched. They are joined when first read, so
+        results streamed to the view are not copied unless asked for."""
+        with self._cache_lock:
+            self._last_query_result = None
+            self._last_query_blocks = blocks
 
     def get_last_result(self) -> DataFrame:
-        return self._last_query_result
+        with self._cache_lock:
+            if self._last_query_blocks is not None:
+                blocks = self._last_query_blocks
+                self._last_query_result = pd.concat(blocks) if len(blocks) > 1 else blocks[0]
+                self._last_query_blocks = None
+            return self._last_query_result
+
+    def create_index(self, table_name: str, columns: list[str], index_name: str = None) -> str:
+        """Declares an index on columns of a table in the SQL mirror and
+        returns its name. Indexes are built by the next query that reads the
+        table and rebuilt whenever the table is replaced; SQLite updates them
+        for rows edited in place. Raises ValueError for unknown tables or
+        columns."""
+        database = self._model.get_database() or {}
+        if table_name not in database:
+            raise ValueError(f"The \"{table_name}\" table does not exist.")
+        if not columns:
+            raise ValueError("Select at least one column to index.")
+        for column in columns:
+            if column not in database[table_name].columns:
+                raise ValueError(f"The \"{column}\" column does not exist.")
+
+        index_name = index_name or "idx_" + "_".join([table_name, *map(str, columns)])
+        with self._condition:
+            for indexes in self._indexes.values():
+                if index_name in indexes:
+                    raise ValueError(f"An index named \"{index_name}\" already exists.")
+
+            self._indexes.setdefault(table_name, {})[index_name] = list(columns)
+            self._dropped_indexes.discard(index_name)
+
+        return index_name
+
+    def drop_index(self, index_name: str):
+        """Removes a declared index. A built index is dropped from the mirror
+        by the next sync."""
+        with self._condition:
+            for indexes in self._indexes.values():
+                if indexes.pop(index_name, None) is not None:
+                    if index_name in self._built_indexes:
+                        self._dropped_indexes.add(index_name)
+                    return
+
+        raise ValueError(f"The \"{index_name}\" index does not exist.")
+
+    def get_indexes(self, table_name: str = None) -> list[dict]:
+        """Returns the declared indexes, optionally for one table, with whether
+        each is currently built in the mirror."""
+        with self._condition:
+            return [
+                {"name": index_name, "table": table, "columns": list(columns), "built": index_name in self._built_indexes}
+                for table, indexes in self._indexes.items() if table_name is None or table == table_name
+                for index_name, columns in indexes.items()
+            ]
+
+    def sync_tables(self, table_names: list[str] = None) -> list[str]:
+        """Copies tables into the SQL mirror, skipping tables whose version has
+        not changed since they were last registered, and builds their pending
+        indexes. Tables whose only changes are rows edited in place get just
+        those rows rewritten, keeping their indexes; replaced tables are
+        copied whole and their indexes rebuilt. Tables that no longer exist in the model are dropped from the
+        mirror. Waits for running queries to finish and closes open cursors,
+        marking them stale, before changing the mirror. Returns the names of
+        the tables copied."""
+        database = self._model.get_database() or {}
+        table_names = table_names if table_names is not None else list(database)
+
+        with self._condition:
+            versions = {table_name: self._model.get_table_version(table_name) for table_name in table_names}
+            stale_tables = [
+                table_name for table_name in table_names if self._synced_versions.get(table_name) != versions[table_name]
+            ]
+            removed_tables = set(self._synced_versions) - set(database)
+            pending_indexes = [
+                index_name for table_name in table_names for index_name in self._indexes.get(table_name, {})
+                if index_name not in self._built_indexes
+            ]
+            if not stale_tables and not removed_tables and not pending_indexes and not self._dropped_indexes:
+                return []
+
+            self._condition.wait_for(lambda: self._active_queries == 0)
+
+            # SQLite cannot change the schema while any statement is open
+            with self._cursor_lock:
+                open_cursors = list(self._open_cursors)
+            for cursor in open_cursors:
+                cursor.invalidate()
+
+            for table_name in stale_tables:
+                changed_rows = None
+                if table_name in self._synced_versions:
+                    changed_rows = self._model.get_changed_rows(table_name, self._synced_versions[table_name])
+
+                if changed_rows is None or not self._update_rows(table_name, database[table_name], changed_rows):
+                    # Replacing a table also drops its indexes
+                    self._built_indexes.difference_update(self._indexes.get(table_name, {}))
+                    self._register_table(table_name, database[table_name])
+                self._synced_versions[table_name] = versions[table_name]
+
+            for table_name in removed_tables:
+                self._built_indexes.difference_update(self._indexes.get(table_name, {}))
+                with self._connection:
+                    self._connection.execute(f"DROP TABLE IF EXISTS {quote_identifier(table_name)}")
+                del self._synced_versions[table_name]
+
+            for index_name in self._dropped_indexes:
+                with self._connection:
+                    self._connection.execute(f"DROP INDEX IF EXISTS {quote_identifier(index_name)}")
+                self._built_indexes.discard(index_name)
+            self._dropped_indexes.clear()
+
+            for table_name in table_names:
+                self._build_indexes(table_name)
+
+        return stale_tables
+
+    def _build_indexes(self, table_name: str):
+        for index_name, columns in list(self._indexes.get(table_name, {}).items()):
+            if index_name in self._built_indexes:
+                continue
+
+            column_list = ", ".join(quote_identifier(str(column)) for column in columns)
+            try:
+                with self._connection:
+                    self._connection.execute(
+                        f"CREATE INDEX IF NOT EXISTS {quote_identifier(index_name)} "
+                        f"ON {quote_identifier(table_name)} ({column_list})"
+                    )
+                self._built_indexes.add(index_name)
+            except sqlite3.OperationalError:
+                # The indexed columns no longer exist in the table
+                del self._indexes[table_name][index_name]
+
+    def _update_rows(self, table_name: str, table: DataFrame, labels: list) -> bool:
+        """Rewrites the rows of a mirrored table with the given index labels,
+        matching each to the mirror row at the same position. SQLite keeps the
+        table's indexes up to date. Returns False, changing nothing, if the
+        rows cannot be matched and the table has to be copied whole."""
+        if not table.index.is_unique:
+            return False
+        positions = table.index.get_indexer(labels)
+        if (positions < 0).any():
+            return False
+        if not len(positions):
+            return True
+
+        # Edited rows go through the same conversion as a full copy, into a scratch table
+        rows = table.iloc[positions].reset_index(drop=True)
+        rows.insert(0, _ROW_ID_COLUMN, positions + 1)
+        self._register_table(_CHANGED_ROWS_TABLE, rows)
+
+        columns = ", ".join(quote_identifier(str(column)) for column in table.columns)
+        target, changes = quote_identifier(table_name), quote_identifier(_CHANGED_ROWS_TABLE)
+        row_id = quote_identifier(_ROW_ID_COLUMN)
+        with self._connection:
+            self._connection.execute(
+                f"UPDATE {target} SET ({columns}) = "
+                f"(SELECT {columns} FROM {changes} WHERE {changes}.{row_id} = {target}.rowid) "
+                f"WHERE rowid IN (SELECT {row_id} FROM {changes})"
+            )
+            self._connection.execute(f"DROP TABLE {changes}")
+
+        return True
+
+    def _register_table(self, table_name: str, table: DataFrame):
+        try:
+            table.to_sql(table_name, self._connection, if_exists="replace", index=False)
+        except DatabaseError:
+            # Values SQLite cannot bind (lists, dicts, ...) are mirrored as text
+            object_columns = table.select_dtypes(include="object").columns
+            table = table.astype({column: str for column in object_columns})
+            table.to_sql(table_name, self._connection, if_exists="replace", index=False)
+
+
+class QueryCursor:
+    """Streams the rows of a query result in blocks. Cached results are served
+    from memory; otherwise the statement, on the SQL mirror or the source
+    database, stays open until the cursor is exhausted or closed. Mirror
+    statements are also closed, and the cursor made stale, by changes to the
+    mirrored tables. Fully fetched results are cached if small enough for
+    the result cache, and become the service's last query result unless
+    keep_result is unset, as for exports."""
+
+    def __init__(
+            self,
+            service: QueryService,
+            query: str,
+            columns: list[str],
+            result=None,
+            connection=None,
+            dataframe: DataFrame = None,
+            cache_key: tuple = None,
+            profile: dict = None,
+            keep_result: bool = True
+    ):
+        self.service = service
+        self.query = query
+        self.columns = columns
+        self.rows_fetched = 0
+        self.row_count = len(dataframe) if dataframe is not None else None
+        self.exhausted = False
+        self.stale = False
+        self.profile = profile if profile is not None else new_query_profile(query)
+
+        self._result = result
+        self._connection = connection
+        self._dataframe = dataframe
+        self._cache_key = cache_key
+        self._keep_result = keep_result
+        self._blocks: list[DataFrame] = []
+        self._cache_bytes = 0
+        self._lock = threading.RLock()
+
+    def fetch(self, size: int) -> DataFrame:
+        """Returns up to size further rows, indexed by their position in the
+        result. Returns an empty DataFrame once the cursor is exhausted."""
+        with self._lock:
+            if self.exhausted:
+                return DataFrame(columns=self.columns)
+
+            if self._dataframe is not None:
+                block = self._dataframe.iloc[self.rows_fetched:self.rows_fetched + size]
+                finished = self.rows_fetched + len(block) >= len(self._dataframe)
+            else:
+                start = time.perf_counter()
+                try:
+                    rows = self._result.fetchmany(size)
+                except (sqlite3.Error, SQLAlchemyError) as e:
+                    self.close()
+                    raise DatabaseError(f"Execution failed on sql '{self.query}': {e}") from e
+                if rows and not isinstance(rows[0], tuple):
+                    rows = [tuple(row) for row in rows]
+                self.profile["execution_seconds"] += time.perf_counter() - start
+
+                start = time.perf_counter()
+                block = DataFrame.from_records(rows, columns=self.columns, coerce_float=True)
+                block.index = pd.RangeIndex(self.rows_fetched, self.rows_fetched + len(block))
+                self.profile["conversion_seconds"] += time.perf_counter() - start
+                finished = len(rows) < size
+                self._keep_block(block)
+
+            self.rows_fetched += len(block)
+            if self._dataframe is None:
+                self.profile["rows"] = self.rows_fetched
+
+            if finished:
+                self.row_count = self.rows_fetched
+                if self._dataframe is None:
+                    self._finish_result()
+                self.close()
+
+            return block
+
+    def close(self):
+        with self._lock:
+            self.exhausted = True
+            self._blocks = []
+            if self._result is not None:
+                self._result.close()
+                self._connection.close()
+                self._result = None
+                self.service.release_cursor(self)
+
+    def interrupt(self):
+        """Stops a fetch running on another thread, which then raises
+        DatabaseError and closes the cursor. Does not wait for the fetch."""
+        connection = self._connection
+        if self._result is None or connection is None:
+            return
+
+        try:
+            if isinstance(connection, sqlite3.Connection):
+                connection.interrupt()
+            else:
+                cancel_remote_statement(connection)
+        except (sqlite3.ProgrammingError, SQLAlchemyError):
+            # The connection was closed by a finishing fetch
+            pass
+
+    def invalidate(self):
+        """Closes the cursor before all rows were fetched because the data it
+        reads is about to change."""
+        with self._lock:
+            if not self.exhausted:
+                self.stale = True
+                self.close()
+
+    def _keep_block(self, block: DataFrame):
+        if self._cache_key is not None:
+            self._cache_bytes += int(block.memory_usage(index=True, deep=True).sum())
+            if not self.service.can_cache(self._cache_bytes):
+                self._cache_key = None
+
+        # Blocks are shared with the caller, so keeping them costs no copy
+        if self._keep_result or self._cache_key is not None:
+            self._blocks.append(block)
+        else:
+            self._blocks.clear()
+
+    def _finish_result(self):
+        blocks = self._blocks
+        if self._cache_key is not None:
+            result = pd.concat(blocks) if len(blocks) > 1 else blocks[0]
+            self.service.cache_result(self._cache_key, result)
+            blocks = [result]
+        if self._keep_result:
+            self.service.set_last_result(blocks)
+
+
+def new_query_profile(query: str) -> dict:
+    """Returns an empty profile for one run of a query. Times are in seconds;
+    rows counts the rows fetched so far."""
+    return {
+        "query": query,
+        "started": time.time(),
+        "cached": False,
+        "synced_tables": [],
+        "sync_seconds": 0.0,
+        "planning_seconds": 0.0,
+        "execution_seconds": 0.0,
+        "conversion_seconds": 0.0,
+        "route": "local",
+        "pushdown_error": None,
+        "rows": 0,
+        "plan": []
+    }
+
+
+def execute_statement(connection: sqlite3.Connection, query: str) -> sqlite3.Cursor:
+    """Executes a statement, raising SQLite errors as pandas DatabaseError like
+    pandas.read_sql_query does."""
+    try:
+        return connection.execute(query)
+    except sqlite3.Error as e:
+        raise DatabaseError(f"Execution failed on sql '{query}': {e}") from e
+
+
+def cancel_remote_statement(remote_connection):
+    """Cancels the statement running on a SQLAlchemy connection from another
+    thread, if its driver supports it (psycopg's cancel, for example)."""
+    driver_connection = remote_connection.connection.driver_connection
+    cancel = getattr(driver_connection, "cancel", None) or getattr(driver_connection, "interrupt", None)
+    if cancel:
+        cancel()
+
+
+def quote_identifier(name: str) -> str:
+    """Quotes a table or column name for use in SQLite statements."""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def tokenize_sql(query: str) -> list[tuple[str, str]]:
+    """Splits a SQL query into (kind, text) tokens, dropping whitespace,
+    comments, string literals and operators. Kinds are "identifier" for
+    quoted names, "word" for bare words, "number" and "symbol"."""
+    tokens = []
+
+    for match in _SQL_TOKEN_PATTERN.finditer(query):
+        kind = match.lastgroup
+        if kind is None:
+            continue
+        text = match.group(kind)
+        if kind in ("double", "backtick", "bracket"):
+            tokens.append(("identifier", text.replace('""', '"') if kind == "double" else text))
+        else:
+            tokens.append((kind, text))
+
+    return tokens
+
+
+def is_select_query(query: str) -> bool:
+    """Returns whether a query is a single SELECT statement, optionally
+    starting with a WITH clause whose expressions are SELECT or VALUES
+    statements, so data-modifying WITH clauses are rejected. Only the
+    keywords that start statements are checked, so names such as a column
+    called copy are allowed. Further statements after a semicolon are not
+    allowed; trailing semicolons are."""
+    tokens = tokenize_sql(query)
+    while tokens and tokens[-1] == ("symbol", ";"):
+        tokens.pop()
+
+    if ("symbol", ";") in tokens:
+        return False
+    return _is_select_statement(tokens, 0, len(tokens), ("SELECT",))
+
+
+def _is_select_statement(tokens: list[tuple[str, str]], start: int, end: int, statement_words: tuple) -> bool:
+    """Returns whether tokens[start:end] is a statement starting with one of
+    statement_words, optionally after a WITH clause of SELECT or VALUES
+    expressions."""
+    def word(position: int) -> str | None:
+        if position < end and tokens[position][0] == "word":
+            return tokens[position][1].upper()
+        return None
+
+    position = start
+    if word(position) != "WITH":
+        return word(position) in statement_words
+
+    position += 1
+    if word(position) == "RECURSIVE":
+        position += 1
+
+    # Common table expressions: name [(columns)] AS [[NOT] MATERIALIZED] (statement), ...
+    while True:
+        if position >= end or tokens[position][0] not in ("word", "identifier"):
+            return False
+        position += 1
+        if position < end and tokens[position] == ("symbol", "("):
+            position = _skip_parentheses(tokens, position)
+        if word(position) != "AS":
+            return False
+        position += 1
+        if word(position) == "NOT":
+            position += 1
+        if word(position) == "MATERIALIZED":
+            position += 1
+        if position >= end or tokens[position] != ("symbol", "("):
+            return False
+
+        closing = _skip_parentheses(tokens, position)
+        if closing > end or not _is_select_statement(tokens, position + 1, closing - 1, ("SELECT", "VALUES")):
+            return False
+
+        position = closing
+        if position < end and tokens[position] == ("symbol", ","):
+            position += 1
+        else:
+            break
+
+    return word(position) in statement_words
+
+
+def normalize_query(query: str) -> str:
+    """Normalizes a query for comparison by dropping comments, collapsing
+    whitespace, upper-casing bare words and removing trailing semicolons.
+    String literals and quoted names are kept exactly."""
+    tokens = []
+
+    for match in _SQL_TOKEN_PATTERN.finditer(query):
+        text = match.group(0).strip()
+        if not text or text.startswith("--") or text.startswith("/*"):
+            continue
+        tokens.append(text.upper() if match.lastgroup == "word" else text)
+
+    while tokens and tokens[-1] == ";":
+        tokens.pop()
+
+    return " ".join(tokens)
+
+
+def get_referenced_tables(query: str, available_tables: list[str]) -> list[str]:
+    """Finds the tables a query reads in its FROM and JOIN clauses, including
+    those inside subqueries. Names defined by WITH clauses are excluded, and
+    matching against the available tables ignores case like SQLite does.
+    Raises ValueError for references to tables that do not exist."""
+    tokens = tokenize_sql(query)
+    words = [text.upper() if kind == "word" else None for kind, text in tokens]
+    lookup = {name.lower(): name for name in available_tables}
+
+    # Common table expressions: `name AS (` or `name (columns) AS (`
+    cte_names = set()
+    for i, (kind, text) in enumerate(tokens):
+        if kind not in ("word", "identifier"):
+            continue
+        j = i + 1
+        if j < len(tokens) and tokens[j] == ("symbol", "("):
+            j = _skip_parentheses(tokens, j)
+        if j + 1 < len(tokens) and words[j] == "AS" and tokens[j + 1] == ("symbol", "("):
+            cte_names.add(text.lower())
+
+    referenced = []
+
+    def add_reference(name: str):
+        key = name.lower()
+        if key in cte_names or key.startswith("sqlite_"):
+            return
+        if key not in lookup:
+            raise ValueError(f"The \"{name}\" table does not exist.")
+        if lookup[key] not in referenced:
+            referenced.append(lookup[key])
+
+    for i, word in enumerate(words):
+        if word != "FROM":
+            continue
+
+        # Walk the FROM clause; a table follows FROM, JOIN and top-level commas.
+        # Subqueries are skipped here and picked up by their own FROM.
+        expect_table = True
+        j = i + 1
+        while j < len(tokens):
+            kind, text = tokens[j]
+
+            if (kind, text) in (("symbol", ")"), ("symbol", ";")) or words[j] in _SQL_CLAUSE_END_WORDS:
+                break
+            if (kind, text) == ("symbol", "("):
+                j = _skip_parentheses(tokens, j)
+                expect_table = False
+            elif (kind, text) == ("symbol", ",") or words[j] == "JOIN":
+                expect_table = True
+                j += 1
+            elif expect_table and kind in ("word", "identifier") and words[j] not in _SQL_CLAUSE_WORDS:
+                name = text
+                j += 1
+                if j + 1 < len(tokens) and tokens[j] == ("symbol", "."):
+                    name = tokens[j + 1][1]
+                    j += 2
+                if j < len(tokens) and tokens[j] == ("symbol", "("):
+                    # Table-valued function such as json_each(...)
+                    j = _skip_parentheses(tokens, j)
+                else:
+                    add_reference(name)
+                expect_table = False
+            else:
+                j += 1
+
+    return referenced
+
+
+def _skip_parentheses(tokens: list[tuple[str, str]], start: int) -> int:
+    """Returns the position just past the parenthesis that closes the one at
+    start."""
+    depth = 0
+    for i in range(start, len(tokens)):
+        if tokens[i] == ("symbol", "("):
+            depth += 1
+        elif tokens[i] == ("symbol", ")"):
+            depth -= 1
+            if depth == 0:
+                return i + 1
+    return len(tokens)
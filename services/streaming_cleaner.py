@@ -0,0 +1,435 @@
+import os
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame, Series
+
+from core.category_correction import apply_correction_map, build_correction_map, get_used_categories
+from core.configuration_enums import Configuration
+from services.cleaning_plan import CleaningPlan, build_cleaning_plan, select_cleaning_plan, ROW_FILTERS
+
+_GLOBAL_STEPS = {
+    Configuration.DELETE_DUPLICATES,
+    Configuration.DROP_MISSING,
+    Configuration.IMPUTE_MISSING_MEAN,
+    Configuration.IMPUTE_MISSING_MEDIAN
+}
+
+
+def is_parquet_path(path: str) -> bool:
+    return os.path.splitext(path)[1].lower() in (".parquet", ".pq")
+
+
+def read_chunks(path: str, chunk_size: int, csv_config: dict = None) -> Iterator[DataFrame]:
+    """Reads a CSV or Parquet file in chunks of at most chunk_size rows."""
+    if is_parquet_path(path):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+        return
+
+    csv_config = csv_config or {}
+    with pd.read_csv(
+            path,
+            chunksize=chunk_size,
+            sep=csv_config.get("sep", ","),
+            escapechar=csv_config.get("escapechar"),
+            quotechar=csv_config.get("quotechar", '"'),
+            doublequote=csv_config.get("doublequote", True),
+            on_bad_lines="skip"
+    ) as reader:
+        yield from reader
+
+
+def read_columns(path: str, csv_config: dict = None) -> list[str]:
+    """Returns the column names of a CSV or Parquet file without reading its rows."""
+    if is_parquet_path(path):
+        import pyarrow.parquet as pq
+
+        return list(pq.ParquetFile(path).schema_arrow.names)
+
+    csv_config = csv_config or {}
+    return list(pd.read_csv(
+        path,
+        nrows=0,
+        sep=csv_config.get("sep", ","),
+        escapechar=csv_config.get("escapechar"),
+        quotechar=csv_config.get("quotechar", '"'),
+        doublequote=csv_config.get("doublequote", True)
+    ).columns)
+
+
+class RowHashSet:
+    """Remembers 64-bit hashes of the rows seen so far, in sorted runs that
+    are merged as they grow, so lookups stay logarithmic and memory stays at
+    eight bytes per distinct row."""
+
+    def __init__(self):
+        self._runs: list[np.ndarray] = []
+
+    def __len__(self) -> int:
+        return sum(len(run) for run in self._runs)
+
+    def add(self, hashes: np.ndarray) -> np.ndarray:
+        """Adds the hashes and returns which of them were not seen before,
+        counting only the first of any repeats within the batch as new."""
+        first = np.zeros(len(hashes), dtype=bool)
+        first[np.unique(hashes, return_index=True)[1]] = True
+
+        for run in self._runs:
+            positions = np.minimum(np.searchsorted(run, hashes), len(run) - 1)
+            first &= run[positions] != hashes
+
+        self._runs.append(np.sort(hashes[first]))
+        while len(self._runs) > 1 and len(self._runs[-2]) <= 2 * len(self._runs[-1]):
+            last = self._runs.pop()
+            self._runs[-1] = np.union1d(self._runs[-1], last)
+
+        return first
+
+
+class ColumnSketch:
+    """Statistics for one numeric column in bounded memory. The mean is
+    exact. Ranks come from a deterministic compactor sketch: values are kept
+    until a level holds capacity of them, then the level is sorted and every
+    other value moves up a level with twice the weight. A compaction at level
+    h moves the estimated rank of any value by at most 2**h, and rank_error
+    adds these up, so every estimated rank is within rank_error of the true
+    rank, which is about count / capacity * log2(count / capacity) values.
+
+    The sketch is exact until the column has more than capacity values.
+    Past that, median_bounds gives an interval certain to hold the median,
+    and MedianSelection finds the exact median from a second read."""
+
+    def __init__(self, capacity: int = 100_000):
+        self.count = 0
+        self.total = 0.0
+        self.rank_error = 0
+        self._capacity = max(capacity, 2)
+        self._levels: list[np.ndarray] = [np.empty(0, dtype=np.float64)]
+        self._max = -np.inf
+
+    @property
+    def exact(self) -> bool:
+        return self.rank_error == 0
+
+    def update(self, values: np.ndarray):
+        values = values[~np.isnan(values)].astype(np.float64)
+        if not len(values):
+            return
+
+        self.count += len(values)
+        self.total += float(values.sum())
+        self._max = max(self._max, float(values.max()))
+
+        for start in range(0, len(values), self._capacity):
+            self._levels[0] = np.concatenate([self._levels[0], values[start:start + self._capacity]])
+            self._compact()
+
+    def _compact(self):
+        height = 0
+        while height < len(self._levels) and len(self._levels[height]) >= self._capacity:
+            level = np.sort(self._levels[height])
+
+            # An odd value out stays on its level, and the kept half alternates between levels
+            paired = len(level) - len(level) % 2
+            if height + 1 == len(self._levels):
+                self._levels.append(np.empty(0, dtype=np.float64))
+            self._levels[height + 1] = np.concatenate([self._levels[height + 1], level[height % 2:paired:2]])
+            self._levels[height] = level[paired:]
+            self.rank_error += 2 ** height
+            height += 1
+
+    def _ranked(self) -> tuple[np.ndarray, np.ndarray]:
+        """Returns the kept values in order with the estimated number of
+        column values less than or equal to each."""
+        values = np.concatenate(self._levels)
+        weights = np.concatenate([np.full(len(level), 2 ** height) for height, level in enumerate(self._levels)])
+        order = np.argsort(values, kind="stable")
+        values, ranks = values[order], np.cumsum(weights[order])
+        return values, ranks[np.searchsorted(values, values, side="right") - 1]
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else np.nan
+
+    def median(self) -> float:
+        """Returns the exact median while the sketch is exact, and otherwise
+        an estimate whose rank is within rank_error of the middle."""
+        if not self.count:
+            return np.nan
+        if self.exact:
+            return float(np.median(self._levels[0]))
+
+        values, ranks = self._ranked()
+        return float(values[min(np.searchsorted(ranks, (self.count + 1) / 2), len(values) - 1)])
+
+    def median_bounds(self) -> tuple[float, float]:
+        """Returns low and high such that low < m <= high for both middle
+        values m of the column."""
+        values, ranks = self._ranked()
+        lower, upper = (self.count - 1) // 2, self.count // 2
+
+        # At most lower values are <= low, and at least upper + 1 values are <= high
+        below = values[ranks <= lower - self.rank_error]
+        above = values[ranks >= upper + 1 + self.rank_error]
+        return (
+            float(below[-1]) if len(below) else -np.inf,
+            float(above[0]) if len(above) else self._max
+        )
+
+
+class MedianSelection:
+    """Finds the exact median of a column from a second read of its values,
+    counting the values below the sketch's median bounds and keeping only
+    the ones between them."""
+
+    def __init__(self, sketch: ColumnSketch):
+        self._count = sketch.count
+        self._low, self._high = sketch.median_bounds()
+        self._below = 0
+        self._between: list[np.ndarray] = []
+
+    def update(self, values: np.ndarray):
+        values = values[~np.isnan(values)]
+        self._below += int((values <= self._low).sum())
+        self._between.append(values[(values > self._low) & (values <= self._high)])
+
+    def median(self) -> float:
+        between = np.sort(np.concatenate(self._between))
+        lower, upper = (self._count - 1) // 2 - self._below, self._count // 2 - self._below
+        return float((between[lower] + between[upper]) / 2)
+
+
+class StreamingCleaner:
+    """Applies a cleaning configuration to a CSV or Parquet file chunk by
+    chunk and streams the cleaned rows to an output file, so tables larger
+    than memory never pass through DataModel.
+
+    Column steps run on each chunk through the same cleaning plan as the
+    in-memory engine. Steps that need the whole table use global state:
+    duplicates are found through a set of row hashes, and imputation runs a
+    first pass to gather column statistics over the rows that survive the
+    other steps. Medians are exact: a column with more values than the
+    sketch holds is read once more to select its median. Row-dependent
+    choices are made per chunk, so integer columns always use the nullable
+    Int64 type and each distinct category is matched once and reused for
+    every chunk."""
+
+    def __init__(
+            self,
+            cleaning_config: dict,
+            chunk_size: int = 100_000,
+            csv_config: dict = None,
+            correction_store=None,
+            sketch_size: int = 100_000
+    ):
+        plan = select_cleaning_plan(build_cleaning_plan(cleaning_config))
+        self._chunk_plan = CleaningPlan([step for step in plan.steps if step["operation"] not in _GLOBAL_STEPS])
+        self._global_steps = [step["operation"] for step in plan.steps if step["operation"] in _GLOBAL_STEPS]
+        self._chunk_size = chunk_size
+        self._csv_config = csv_config
+        self._correction_store = correction_store
+        self._sketch_size = sketch_size
+
+        # Corrections found for each column, reused across chunks and passes
+        self._corrections: dict[str, dict[str, str]] = {}
+        self._converted_columns: set[str] = set()
+        self.stats: dict = {}
+
+    @property
+    def needs_statistics_pass(self) -> bool:
+        return any(
+            operation in (Configuration.IMPUTE_MISSING_MEAN, Configuration.IMPUTE_MISSING_MEDIAN)
+            for operation in self._global_steps
+        )
+
+    def clean_file(self, source: str, destination: str) -> Iterator[dict]:
+        """Cleans the source file into the destination, yielding progress
+        after every chunk as a dict with the pass number, rows read and rows
+        written. Reads that gather column statistics are pass 1, and the
+        read that writes the output is pass 2. The output is written to a temporary file and only moved into
+        place once complete; closing the generator early discards it."""
+        self.stats = {
+            "rows_read": 0,
+            "rows_written": 0,
+            "operations": 0,
+            "data_types": 0,
+            "duplicates": 0,
+            "outliers": 0,
+            "missing_dropped": 0,
+            "missing_imputed": 0
+        }
+        self._converted_columns = set()
+
+        fill_values = None
+        if self.needs_statistics_pass:
+            sketches: dict[str, ColumnSketch] = {}
+            for chunk, rows_read in self._read_cleaned_chunks(source):
+                for column, values in self._numeric_values(chunk):
+                    sketches.setdefault(column, ColumnSketch(self._sketch_size)).update(values)
+                yield {"pass": 1, "rows_read": rows_read, "rows_written": 0}
+
+            if Configuration.IMPUTE_MISSING_MEDIAN in self._global_steps:
+                fill_values = {column: sketch.median() for column, sketch in sketches.items()}
+
+                # Columns with more values than the sketch holds are read again to select their exact median
+                selections = {
+                    column: MedianSelection(sketch) for column, sketch in sketches.items() if not sketch.exact
+                }
+                if selections:
+                    for chunk, rows_read in self._read_cleaned_chunks(source):
+                        for column, values in self._numeric_values(chunk):
+                            if column in selections:
+                                selections[column].update(values)
+                        yield {"pass": 1, "rows_read": rows_read, "rows_written": 0}
+                    fill_values.update({column: selection.median() for column, selection in selections.items()})
+            else:
+                fill_values = {column: sketch.mean() for column, sketch in sketches.items()}
+
+        temp_path = f"{destination}.partial"
+        writer = _ChunkWriter(temp_path)
+        completed = False
+        try:
+            seen = RowHashSet()
+            for chunk in read_chunks(source, self._chunk_size, self._csv_config):
+                self.stats["rows_read"] += len(chunk)
+                chunk = self._clean_chunk(chunk, seen, fill_values, count=True)
+                writer.write(chunk)
+                self.stats["rows_written"] += len(chunk)
+                yield {"pass": 2, "rows_read": self.stats["rows_read"], "rows_written": self.stats["rows_written"]}
+
+            writer.close()
+            os.replace(temp_path, destination)
+            completed = True
+        finally:
+            if not completed:
+                writer.close()
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+
+    def _read_cleaned_chunks(self, source: str) -> Iterator[tuple[DataFrame, int]]:
+        """Reads and cleans the source without the imputation step, yielding
+        each cleaned chunk with the number of rows read so far."""
+        seen = RowHashSet()
+        rows_read = 0
+        for chunk in read_chunks(source, self._chunk_size, self._csv_config):
+            rows_read += len(chunk)
+            yield self._clean_chunk(chunk, seen), rows_read
+
+    @staticmethod
+    def _numeric_values(chunk: DataFrame) -> Iterator[tuple[str, np.ndarray]]:
+        for column in chunk.columns:
+            if pd.api.types.is_numeric_dtype(chunk[column]):
+                yield column, chunk[column].to_numpy(dtype="float64", na_value=np.nan)
+
+    def _clean_chunk(self, chunk: DataFrame, seen: RowHashSet, fill_values: dict = None, count: bool = False) -> DataFrame:
+        converted = set()
+
+        def record(step: dict, result: dict):
+            operation, changed = step["operation"], result["changed"]
+            if operation == Configuration.DATA_TYPE:
+                if changed:
+                    converted.add(step["column"])
+            elif operation in ROW_FILTERS:
+                self.stats["outliers"] += changed
+                self.stats["operations"] += changed
+            else:
+                self.stats["operations"] += changed
+
+        chunk = self._chunk_plan.execute(chunk, self._correct_categories, record if count else None)
+        chunk = self._normalize_types(chunk)
+
+        if count and converted - self._converted_columns:
+            # Conversions are counted once per column, as in a single in-memory run
+            self.stats["data_types"] += len(converted - self._converted_columns)
+            self._converted_columns |= converted
+
+        if Configuration.DELETE_DUPLICATES in self._global_steps:
+            new_rows = seen.add(pd.util.hash_pandas_object(chunk, index=False).to_numpy())
+            if count:
+                self.stats["duplicates"] += int((~new_rows).sum())
+                self.stats["operations"] += int((~new_rows).sum())
+            chunk = chunk[new_rows]
+
+        if Configuration.DROP_MISSING in self._global_steps:
+            before = len(chunk)
+            chunk = chunk.dropna()
+            if count:
+                self.stats["missing_dropped"] += before - len(chunk)
+                self.stats["operations"] += before - len(chunk)
+
+        if fill_values:
+            before = chunk.isna().sum().sum()
+            chunk = chunk.fillna({column: value for column, value in fill_values.items() if column in chunk.columns})
+            if count:
+                imputed = int(before - chunk.isna().sum().sum())
+                self.stats["missing_imputed"] += imputed
+                self.stats["operations"] += imputed
+
+        return chunk
+
+    def _correct_categories(self, column: str, series: Series, correct_categories: list[str]) -> tuple[Series, int]:
+        """Corrects a chunk of a categorical column, matching only values not
+        seen in earlier chunks."""
+        if not series.dtype == "category":
+            raise ValueError(f"The \"{column}\" column is not categorical.")
+
+        known = self._corrections.setdefault(column, {})
+        if not known and self._correction_store is not None:
+            known.update(self._correction_store.get_corrections(column))
+
+        new_values = [value for value in get_used_categories(series) if value not in known]
+        if new_values:
+            matched = build_correction_map(new_values, correct_categories)
+            known.update({value: matched.get(value, value) for value in new_values})
+            if self._correction_store is not None and matched:
+                self._correction_store.record(column, matched)
+
+        return apply_correction_map(series, known)
+
+    @staticmethod
+    def _normalize_types(chunk: DataFrame) -> DataFrame:
+        # Whether a chunk happens to have missing integers must not change the column type between chunks
+        for column in chunk.columns:
+            if chunk[column].dtype == "int64":
+                chunk[column] = chunk[column].astype("Int64")
+        return chunk
+
+
+class _ChunkWriter:
+    """Appends chunks to a CSV file, or to a Parquet file when the path has a
+    Parquet extension, keeping the schema of the first chunk."""
+
+    def __init__(self, path: str):
+        self._path = path
+        self._parquet = is_parquet_path(path.removesuffix(".partial"))
+        self._writer = None
+        self._schema = None
+        self._started = False
+
+    def write(self, chunk: DataFrame):
+        if self._parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            # Category lists differ between chunks, so categories are written as plain values
+            chunk = chunk.apply(lambda column: column.astype(object) if column.dtype == "category" else column)
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if self._writer is None:
+                self._schema = table.schema
+                self._writer = pq.ParquetWriter(self._path, self._schema)
+            self._writer.write_table(table.cast(self._schema))
+        else:
+            chunk.to_csv(self._path, mode="a" if self._started else "w", header=not self._started, index=False)
+        self._started = True
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        elif not self._started:
+            # A source without any rows still produces an output file
+            open(self._path, "w").close()
+            self._started = True
@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.category_correction import autocorrect_column, build_correction_map
+from services.data_cleaning_service import correct_spelling
+
+
+@pytest.fixture
+def series() -> pd.Series:
+    values = ["Aple", "Apple", "Banan", "banana", "Carot", "Zucchini", None] * 50
+    return pd.Series(values, dtype="category", name="produce")
+
+
+CHOICES = ["Apple", "Banana", "Carrot"]
+
+
+def test_correction_map_skips_exact_and_distant_values():
+    correction_map = build_correction_map(["Aple", "Apple", "Zucchini"], CHOICES)
+    assert correction_map == {"Aple": "Apple"}
+
+
+def test_autocorrect_matches_row_wise_correction(series):
+    corrected, changed = autocorrect_column(series, CHOICES)
+
+    expected = series.astype(object).map(lambda row: correct_spelling(row, CHOICES))
+    pd.testing.assert_series_equal(
+        corrected.astype(object), expected.astype(object), check_dtype=False
+    )
+    assert changed == int((series.astype(object) != expected).sum() - series.isna().sum())
+
+
+def test_autocorrect_keeps_missing_values_and_index(series):
+    series.index = np.arange(len(series)) * 2
+    corrected, _ = autocorrect_column(series, CHOICES)
+
+    assert corrected.isna().sum() == series.isna().sum()
+    assert corrected.index.equals(series.index)
+    assert set(corrected.cat.categories) == {"Apple", "Banana", "Carrot", "Zucchini"}
@@ -0,0 +1,40 @@
+import random
+import string
+
+import pytest
+
+from core.category_index import CategoryIndex
+from core.string_similarity import extract_one
+
+
+@pytest.fixture
+def vocabulary() -> list[str]:
+    rng = random.Random(1)
+    words = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(5, 12))) for _ in range(1500)]
+    return [f"{word.title()} {rng.choice(['Inc', 'Ltd', 'LLC', 'Group'])}" for word in words]
+
+
+def test_candidates_contain_the_misspelled_value(vocabulary):
+    index = CategoryIndex(vocabulary)
+    target = vocabulary[1234]
+    query = target[:3] + target[4:]
+
+    candidates = index.candidates(query, limit=10)
+    assert 1234 in candidates
+    assert len(candidates) <= 10
+
+
+def test_extract_one_matches_all_pairs_scoring(vocabulary):
+    index = CategoryIndex(vocabulary)
+    rng = random.Random(2)
+
+    for position in rng.sample(range(len(vocabulary)), 8):
+        query = vocabulary[position].upper().replace("A", "E", 1)
+        expected = extract_one(query, vocabulary, score_cutoff=80)
+        assert index.extract_one(query, score_cutoff=80)[0] == expected[0]
+
+
+def test_unknown_query_has_no_match(vocabulary):
+    index = CategoryIndex(vocabulary)
+    assert index.extract_one("0000", score_cutoff=80) is None
+    assert len(index.candidates("")) <= 25
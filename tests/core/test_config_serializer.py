@@ -0,0 +1,63 @@
+import json
+
+import pytest
+
+from core import Configuration, deserialize_configs, load_config_file, save_config_file, serialize_configs
+
+
+def make_configs() -> tuple[dict, dict]:
+    cleaning = {
+        Configuration.COLUMNS: {
+            "price": {Configuration.DATA_TYPE: "float64", Configuration.FLOAT_MIN: "0"},
+            "fruit": {Configuration.CATEGORIES: "Apple Banana"}
+        },
+        Configuration.DELETE_DUPLICATES: True,
+        Configuration.DROP_MISSING: False,
+        Configuration.IMPUTE_MISSING_MEAN: True,
+        Configuration.IMPUTE_MISSING_MEDIAN: False
+    }
+    analytics = {
+        Configuration.COLUMNS: {"price": {Configuration.ANALYZE_DISTRIBUTION: True}},
+        Configuration.ANALYZE_MISSINGNESS: True,
+        Configuration.ANALYZE_CATEGORIES: False,
+        Configuration.ANALYZE_OUTLIERS: True
+    }
+    return cleaning, analytics
+
+
+def test_config_file_round_trip(tmp_path):
+    cleaning, analytics = make_configs()
+    path = tmp_path / "config.json"
+
+    save_config_file(str(path), cleaning, analytics, "sales", ["price", "fruit"])
+    data = json.loads(path.read_text())
+
+    assert data["version"] == 1
+    assert data["cleaning"]["Columns"]["price"] == {"DataType": "float64", "FloatMin": "0"}
+    assert load_config_file(str(path)) == (cleaning, analytics)
+
+
+def test_unversioned_config_turns_missing_options_off():
+    cleaning, analytics = deserialize_configs({"cleaning": {"Columns": {"a": {"StringMax": "5"}}, "DropMissing": True}})
+
+    assert cleaning[Configuration.COLUMNS] == {"a": {Configuration.STRING_MAX: "5"}}
+    assert cleaning[Configuration.DROP_MISSING] and not cleaning[Configuration.DELETE_DUPLICATES]
+    assert analytics == {
+        Configuration.COLUMNS: {},
+        Configuration.ANALYZE_MISSINGNESS: False,
+        Configuration.ANALYZE_CATEGORIES: False,
+        Configuration.ANALYZE_OUTLIERS: False
+    }
+
+
+@pytest.mark.parametrize("change", [
+    {"version": 99},
+    {"format": "something_else"},
+    {"cleaning": {"Columns": {}, "AnalyzeOutliers": True}},
+    {"cleaning": {"Columns": {"a": {"NotAnOption": 1}}}},
+])
+def test_invalid_configs_raise(change):
+    data = {**serialize_configs(*make_configs()), **change}
+
+    with pytest.raises(ValueError):
+        deserialize_configs(data)
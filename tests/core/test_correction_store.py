@@ -0,0 +1,30 @@
+from core.correction_store import CorrectionStore
+
+
+def test_record_persists_between_instances(tmp_path):
+    path = str(tmp_path / "nested" / "corrections.json")
+    store = CorrectionStore(path)
+
+    assert store.record("city", {"Bostn": "Boston", "Boston": "Boston"}) == 1
+    assert store.record("city", {"Bostn": "Boston"}) == 0
+
+    reloaded = CorrectionStore(path)
+    assert reloaded.get_corrections("city") == {"Bostn": "Boston"}
+    assert reloaded.get_keys() == ["city"]
+
+
+def test_forget_values_and_keys(tmp_path):
+    store = CorrectionStore(str(tmp_path / "corrections.json"))
+    store.record("city", {"Bostn": "Boston", "Chicgo": "Chicago"})
+
+    store.forget("city", ["Bostn"])
+    assert store.get_corrections("city") == {"Chicgo": "Chicago"}
+
+    store.forget("city")
+    assert CorrectionStore(store.path).get_corrections("city") == {}
+
+
+def test_unreadable_store_starts_empty(tmp_path):
+    path = tmp_path / "corrections.json"
+    path.write_text("{not json")
+    assert CorrectionStore(str(path)).get_keys() == []
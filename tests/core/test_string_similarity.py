@@ -0,0 +1,114 @@
+import random
+
+import pytest
+from fuzzywuzzy import fuzz, process
+from rapidfuzz import fuzz as rapidfuzz_scorers
+
+import core.string_similarity as string_similarity
+from core.string_similarity import SCORERS, cdist, extract, extract_one, get_scorer, preprocess
+
+
+CHOICES = ["Apple", "Banana", "Carrot", "Durian"]
+
+
+@pytest.mark.parametrize("scorer", SCORERS)
+def test_cdist_shape_and_best_match(scorer):
+    scores = cdist(["Aple", "banan", "CARROT"], CHOICES, scorer=scorer)
+    assert scores.shape == (3, 4)
+    assert list(scores.argmax(axis=1)) == [0, 1, 2]
+
+
+def test_cdist_agrees_with_fuzzywuzzy():
+    queries = ["Aple", "Bananna", "carots", "Durain", "Zucchini"]
+    scores = cdist(queries, CHOICES)
+
+    for row, query in enumerate(queries):
+        best, score = process.extractOne(query, CHOICES)
+        assert CHOICES[scores[row].argmax()] == best
+        assert abs(scores[row].max() - score) <= 1
+
+
+def test_cdist_applies_score_cutoff():
+    scores = cdist(["Apple", "Zucchini"], CHOICES, scorer="ratio", score_cutoff=90)
+    assert scores[0, 0] == 100
+    assert (scores[1] == 0).all()
+    assert scores[0, 1:].max() == 0
+
+
+def test_extract_orders_matches_and_drops_low_scores():
+    matches = extract("Aple", CHOICES, scorer="ratio", score_cutoff=20)
+    assert matches[0][0] == "Apple"
+    assert matches[0][2] == 0
+    assert [score for _, score, _ in matches] == sorted([score for _, score, _ in matches], reverse=True)
+    assert all(score >= 20 for _, score, _ in matches)
+
+
+def test_extract_one_returns_none_below_cutoff():
+    assert extract_one("Zucchini", CHOICES, score_cutoff=80) is None
+    assert extract_one("Banan", CHOICES)[0] == "Banana"
+
+
+def test_unknown_scorer_raises():
+    with pytest.raises(ValueError):
+        cdist(["Apple"], CHOICES, scorer="jaro")
+
+
+PAIRS = [
+    ("new york mets", "new york meats"),
+    ("fuzzy was a bear", "fuzzy fuzzy was a bear"),
+    ("aple", "apple pie"),
+    ("san francisco", "san fran"),
+    ("carrots", "carrot cake and peas")
+]
+
+# Scores given by rapidfuzz 3 for PAIRS; both backends must reproduce them exactly
+RAPIDFUZZ_SCORES = {
+    "ratio": [96.2962962962963, 84.21052631578947, 61.53846153846154, 76.19047619047619, 51.85185185185186],
+    "partial_ratio": [92.3076923076923, 100.0, 75.0, 100.0, 92.3076923076923],
+    "token_sort_ratio": [96.2962962962963, 84.21052631578947, 61.53846153846154, 76.19047619047619, 51.85185185185186],
+    "token_set_ratio": [96.29629629629629, 100.0, 61.53846153846154, 76.19047619047619, 51.851851851851855],
+    "WRatio": [96.2962962962963, 95.0, 67.5, 90.0, 83.07692307692308]
+}
+
+
+@pytest.mark.parametrize("scorer", SCORERS)
+def test_scorers_match_rapidfuzz_exactly(scorer):
+    assert [get_scorer(scorer)(first, second) for first, second in PAIRS] == RAPIDFUZZ_SCORES[scorer]
+
+
+def test_rapidfuzz_backend_is_used():
+    assert string_similarity.BACKEND == "rapidfuzz"
+
+
+@pytest.mark.parametrize("scorer", SCORERS)
+def test_python_fallback_matches_rapidfuzz_on_random_strings(scorer):
+    rng = random.Random(scorer)
+
+    def random_string():
+        # Few distinct letters and words, so strings share characters and tokens; some exceed 64 characters
+        return preprocess("".join(rng.choices("abcdef  ", k=rng.choice([rng.randint(1, 12), rng.randint(60, 100)]))))
+
+    python_scorer = string_similarity._PYTHON_SCORERS[scorer]
+    compiled_scorer = getattr(rapidfuzz_scorers, scorer)
+    for _ in range(2000):
+        first, second = random_string(), random_string()
+        if first and second:
+            assert python_scorer(first, second) == compiled_scorer(first, second, processor=None), (first, second)
+
+
+@pytest.mark.parametrize("scorer", SCORERS)
+def test_backends_give_identical_scores(scorer, monkeypatch):
+    queries = ["Aple", "Bananna!", "carots", "", "Durian_2", "new  york", "a"]
+    choices = [*CHOICES, "New York Mets", "", "apple pie"]
+
+    compiled = cdist(queries, choices, scorer, score_cutoff=50)
+    monkeypatch.setattr(string_similarity, "BACKEND", "python")
+    pure = cdist(queries, choices, scorer, score_cutoff=50)
+
+    assert (compiled == pure).all()
+
+
+def test_strings_are_preprocessed_the_same_way_for_every_scorer():
+    assert preprocess("  Apple-Pie! ") == "apple pie"
+    for scorer in SCORERS:
+        assert cdist(["APPLE!!"], ["apple", "?!"], scorer=scorer).tolist() == [[100, 0]]
@@ -54,3 +54,38 @@ def test_update_row():
 
     updated_table = data_model.get_table("table_one")
     pd.testing.assert_series_equal(updated_table.iloc[row_index], updated_row)
+
+def test_table_version_increases_on_changes():
+    data_model = init_data_model()
+    data_model.set_database({"table_one": generate_random_dataframe()})
+    version = data_model.get_table_version("table_one")
+
+    data_model.set_table("table_one", generate_random_dataframe())
+    assert data_model.get_table_version("table_one") == version + 1
+
+    row_df = data_model.get_table("table_one").iloc[[0]].copy()
+    data_model.update_row("table_one", row_df)
+    assert data_model.get_table_version("table_one") == version + 2
+
+def test_changed_rows_are_tracked_until_the_table_is_replaced():
+    data_model = init_data_model()
+    data_model.set_database({"table_one": generate_random_dataframe()})
+    version = data_model.get_table_version("table_one")
+    table = data_model.get_table("table_one")
+
+    data_model.update_row("table_one", table.iloc[[3]].copy())
+    data_model.update_row("table_one", table.iloc[[5, 3]].copy())
+    assert data_model.get_changed_rows("table_one", version) == [table.index[3], table.index[5]]
+    assert data_model.get_changed_rows("table_one", version + 1) == [table.index[5], table.index[3]]
+
+    data_model.set_table("table_one", generate_random_dataframe())
+    assert data_model.get_changed_rows("table_one", version) is None
+    assert data_model.get_changed_rows("table_one", version + 3) == []
+
+def test_table_source_is_cleared_when_table_changes():
+    data_model = DataModel()
+    data_model.set_database({"users": generate_random_dataframe()}, {"users": {"engine": None, "schema": "public"}})
+    assert data_model.get_table_source("users")["schema"] == "public"
+
+    data_model.set_table("users", generate_random_dataframe())
+    assert data_model.get_table_source("users") is None
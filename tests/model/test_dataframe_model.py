@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+from PyQt6.QtCore import Qt
+
+from model import DataFrameModel
+from model.dataframe_model import format_display_strings
+from tests.helper_functions import generate_random_dataframe
+
+
+@pytest.fixture
+def dataframe():
+    return generate_random_dataframe(n_rows=600, seed=1)
+
+@pytest.fixture
+def model(dataframe):
+    return DataFrameModel(dataframe, block_size=100, max_cached_blocks=4)
+
+def test_format_display_strings_float_precision():
+    series = pd.Series([1.23456789, np.nan, 2.0])
+    strings = format_display_strings(series, float_precision=2, na_rep="")
+    assert list(strings) == ["1.23", "", "2.0"]
+
+def test_format_display_strings_datetime_format():
+    series = pd.Series(pd.to_datetime(["2024-01-02 03:04:05", None]))
+    strings = format_display_strings(series, datetime_format="%d/%m/%Y", na_rep="-")
+    assert list(strings) == ["02/01/2024", "-"]
+
+def test_format_display_strings_na_rendering(dataframe):
+    for column in dataframe.columns:
+        strings = format_display_strings(dataframe[column], na_rep="<missing>")
+        missing = dataframe[column].isna().to_numpy(dtype=bool)
+        assert (strings[missing] == "<missing>").all()
+        assert len(strings) == len(dataframe)
+
+def test_data_matches_cell_values(model, dataframe):
+    index = model.index(250, dataframe.columns.get_loc("string_col"))
+    value = dataframe["string_col"].iloc[250]
+    expected = "<NA>" if pd.isna(value) else str(value)
+    assert model.data(index) == expected
+
+def test_display_cache_is_bounded(model):
+    for row in range(0, 600, 100):
+        model.data(model.index(row, 0))
+    assert len(model._display_cache) == 4
+
+def test_set_data_invalidates_cached_block(model, dataframe):
+    model.update_editing(True)
+    column = dataframe.columns.get_loc("string_col")
+    index = model.index(10, column)
+    model.data(index)
+
+    assert model.setData(index, "edited", Qt.ItemDataRole.EditRole)
+    assert model.data(index) == "edited"
+
+def test_row_order_maps_rows_and_edits_to_source(model, dataframe):
+    row_order = np.arange(len(dataframe))[::-1]
+    model.set_row_order(row_order)
+    model.update_editing(True)
+    column = dataframe.columns.get_loc("string_col")
+
+    edited = []
+    model.row_edited.connect(edited.append)
+    model.setData(model.index(0, column), "last row", Qt.ItemDataRole.EditRole)
+
+    assert edited == [len(dataframe) - 1]
+    assert dataframe["string_col"].iloc[-1] == "last row"
+    assert model.headerData(0, Qt.Orientation.Vertical) == str(dataframe.index[-1])
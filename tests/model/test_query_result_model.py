@@ -0,0 +1,63 @@
+import pandas as pd
+from PyQt6.QtCore import Qt
+from unittest.mock import MagicMock
+
+from model import QueryResultModel
+from services import QueryService
+
+
+def open_result_model(table: pd.DataFrame, fetch_size: int, block_size: int) -> QueryResultModel:
+    """Opens a result model on a cursor whose blocks are fetched as soon as
+    the model requests them, as the query worker does on its thread."""
+    model = MagicMock()
+    model.get_table_source.return_value = None
+    model.get_database.return_value = {"users": table}
+    cursor = QueryService(model).open_cursor("SELECT id FROM users")
+
+    result_model = QueryResultModel(cursor, cursor.fetch(fetch_size), fetch_size=fetch_size, block_size=block_size)
+    result_model.fetch_requested.connect(lambda size: result_model.append_block(cursor.fetch(size)))
+    return result_model
+
+
+def test_fetch_more_streams_rows_from_cursor():
+    result_model = open_result_model(pd.DataFrame({"id": range(25)}), fetch_size=10, block_size=4)
+    assert result_model.rowCount() == 10
+    assert result_model.canFetchMore()
+
+    result_model.data(result_model.index(9, 0))
+    result_model.fetchMore()
+    result_model.fetchMore()
+
+    assert result_model.rowCount() == 25
+    assert not result_model.canFetchMore()
+    assert result_model.data(result_model.index(10, 0)) == "10"
+    assert result_model.headerData(24, Qt.Orientation.Vertical) == "24"
+
+def test_rows_are_read_across_fetched_blocks():
+    result_model = open_result_model(pd.DataFrame({"id": range(25)}), fetch_size=7, block_size=5)
+    while result_model.canFetchMore():
+        result_model.fetchMore()
+
+    assert [result_model.data(result_model.index(row, 0)) for row in range(25)] == [str(row) for row in range(25)]
+    assert result_model.get_dataframe()["id"].tolist() == list(range(25))
+
+def test_loading_row_is_shown_while_a_fetch_is_pending():
+    cursor = MagicMock(exhausted=False)
+    result_model = QueryResultModel(cursor, pd.DataFrame({"id": range(3)}), fetch_size=3)
+    requests = []
+    result_model.fetch_requested.connect(requests.append)
+
+    result_model.fetchMore()
+    assert not result_model.canFetchMore()
+    result_model.fetchMore()
+    assert requests == [3]
+
+    # A placeholder row stands in for the block until it arrives
+    assert result_model.rowCount() == 4
+    assert result_model.data(result_model.index(3, 0)) == "Loading..."
+    assert result_model.headerData(3, Qt.Orientation.Vertical) == ""
+
+    result_model.append_block(pd.DataFrame({"id": range(3, 6)}, index=range(3, 6)))
+    assert result_model.rowCount() == 6
+    assert result_model.data(result_model.index(3, 0)) == "3"
+    assert result_model.canFetchMore()
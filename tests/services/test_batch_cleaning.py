@@ -0,0 +1,74 @@
+import random
+
+import pandas as pd
+
+from core import Configuration
+from model import DataModel
+from services import DataCleaningService, apply_config_template, build_cleaning_plan, select_cleaning_plan, \
+    summarize_batch
+from tests.helper_functions import generate_random_dataframe
+
+
+def make_template() -> dict:
+    return {
+        Configuration.COLUMNS: {
+            "Float Col": {Configuration.FLOAT_MIN: "30"},
+            "int_col": {Configuration.DATA_TYPE: "float64"},
+            "missing_col": {Configuration.STRING_MAX: "2"}
+        },
+        Configuration.DELETE_DUPLICATES: True,
+        Configuration.DROP_MISSING: True,
+        Configuration.IMPUTE_MISSING_MEAN: False,
+        Configuration.IMPUTE_MISSING_MEDIAN: False
+    }
+
+
+def make_service() -> DataCleaningService:
+    random.seed(0)
+    database = {
+        f"table_{index}": generate_random_dataframe(n_rows=200, seed=index).drop(columns=["object_col"])
+        for index in range(5)
+    }
+    model = DataModel()
+    model.set_database(database)
+    return DataCleaningService(model)
+
+
+def test_apply_config_template_matches_column_names():
+    config = apply_config_template(make_template(), ["float_col", "int_col", "string_col"])
+
+    assert config[Configuration.COLUMNS] == {
+        "int_col": {Configuration.DATA_TYPE: "float64"},
+        "float_col": {Configuration.FLOAT_MIN: "30"}
+    }
+    assert config[Configuration.DROP_MISSING]
+
+
+def test_clean_tables_matches_single_table_runs():
+    service = make_service()
+    database = dict(service.model.get_database())
+    configs = {name: apply_config_template(make_template(), list(table.columns)) for name, table in database.items()}
+
+    # One table fails without affecting the others
+    configs["table_4"][Configuration.COLUMNS]["float_col"] = {Configuration.STRING_MAX: "2"}
+
+    finished = []
+    results = service.clean_tables(configs, workers=3, on_table_finished=lambda name, result: finished.append(name))
+
+    assert list(results) == list(configs)
+    assert sorted(finished) == sorted(configs)
+    assert results["table_4"]["error"] is not None
+    pd.testing.assert_frame_equal(service.model.get_table("table_4"), database["table_4"])
+
+    for name in ["table_0", "table_1", "table_2", "table_3"]:
+        plan = select_cleaning_plan(build_cleaning_plan(configs[name]), database[name])
+        expected = plan.execute(database[name])
+        pd.testing.assert_frame_equal(service.model.get_table(name), expected)
+        assert results[name]["rows_after"] == len(expected)
+
+    summary = summarize_batch(results)
+    assert summary["cleaned"] == ["table_0", "table_1", "table_2", "table_3"]
+    assert list(summary["failed"]) == ["table_4"]
+    assert summary["rows_after"] == sum(results[name]["rows_after"] for name in summary["cleaned"])
+    assert summary["duplicates"] + summary["outliers"] + summary["missing_dropped"] \
+        == summary["rows_before"] - summary["rows_after"]
@@ -0,0 +1,232 @@
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core import Configuration
+from model import DataModel
+from services import DataCleaningService, build_cleaning_plan, optimize_cleaning_plan, select_cleaning_plan
+from services import cleaning_plan
+from services.cleaning_plan import ROW_FILTERS
+from tests.helper_functions import generate_random_dataframe
+
+
+def run_sequentially(service: DataCleaningService, config: dict) -> list[int]:
+    """Runs each configured option as a separate service call, the way the
+    cleaning worker did before plans were compiled."""
+    counts = []
+    for column, options in config[Configuration.COLUMNS].items():
+        for key, value in options.items():
+            if key == Configuration.DATA_TYPE:
+                counts.append(service.set_data_type(column, value))
+            elif key == Configuration.INT_MIN:
+                counts.append(service.drop_outliers(column, int(value), float("inf")))
+            elif key == Configuration.INT_MAX:
+                counts.append(service.drop_outliers(column, float("-inf"), int(value)))
+            elif key == Configuration.FLOAT_MIN:
+                counts.append(service.drop_outliers(column, float(value), float("inf")))
+            elif key == Configuration.FLOAT_MAX:
+                counts.append(service.drop_outliers(column, float("-inf"), float(value)))
+            elif key == Configuration.STRING_MAX:
+                counts.append(service.truncate_strings(column, int(value)))
+            elif key == Configuration.DATE_MIN:
+                counts.append(service.drop_date_outliers(column, pd.to_datetime(value), pd.to_datetime("2100-01-01")))
+            elif key == Configuration.DATE_MAX:
+                counts.append(service.drop_date_outliers(column, pd.to_datetime("1900-01-01"), pd.to_datetime(value)))
+            elif key == Configuration.CATEGORIES:
+                counts.append(service.autocorrect_categories(column, value.split()))
+
+    if config[Configuration.DELETE_DUPLICATES]:
+        counts.append(service.drop_duplicates())
+    if config[Configuration.DROP_MISSING]:
+        counts.append(service.drop_missing_all())
+    elif config[Configuration.IMPUTE_MISSING_MEAN]:
+        counts.append(service.impute_missing_mean_all())
+    elif config[Configuration.IMPUTE_MISSING_MEDIAN]:
+        counts.append(service.impute_missing_median_all())
+    return counts
+
+
+def make_service(seed: int) -> DataCleaningService:
+    random.seed(seed)
+    df = generate_random_dataframe(n_rows=400, seed=seed).drop(columns=["object_col"])
+    df = pd.concat([df, df.iloc[:40]], ignore_index=True)
+    df["text_col"] = df["string_col"].astype(object).where(df["string_col"].notna(), None)
+    df["int_col"] = df["int_col"].astype(object)
+
+    model = DataModel()
+    model.set_database({"test_table": df})
+    service = DataCleaningService(model)
+    service.set_and_retrieve_table("test_table")
+    return service
+
+
+def make_config(drop_missing: bool) -> dict:
+    return {
+        Configuration.COLUMNS: {
+            "float_col": {Configuration.FLOAT_MIN: "20", Configuration.FLOAT_MAX: "80"},
+            "int_col": {Configuration.DATA_TYPE: "int64", Configuration.INT_MIN: "5", Configuration.INT_MAX: "90"},
+            "text_col": {Configuration.DATA_TYPE: "string", Configuration.STRING_MAX: "3"},
+            "datetime_col": {Configuration.DATE_MIN: "2021-01-01"},
+            "category_col": {Configuration.CATEGORIES: "Aple Bananna Carot"},
+            "bool_col": {Configuration.DATA_TYPE: "category"},
+        },
+        Configuration.DELETE_DUPLICATES: True,
+        Configuration.DROP_MISSING: drop_missing,
+        Configuration.IMPUTE_MISSING_MEAN: not drop_missing,
+        Configuration.IMPUTE_MISSING_MEDIAN: False
+    }
+
+
+@pytest.mark.parametrize("seed, drop_missing", [(1, False), (2, True), (3, False)])
+def test_plan_matches_sequential_operations(seed, drop_missing):
+    config = make_config(drop_missing)
+
+    sequential = make_service(seed)
+    expected_counts = run_sequentially(sequential, config)
+
+    fused = make_service(seed)
+    results = []
+    fused.execute_cleaning_plan(build_cleaning_plan(config), lambda step, result: results.append(result["changed"]))
+
+    pd.testing.assert_frame_equal(fused.table, sequential.table)
+    assert results == expected_counts
+
+
+def test_plan_leaves_original_table_untouched():
+    service = make_service(4)
+    original = service.table.copy()
+    plan = build_cleaning_plan(make_config(True))
+
+    cleaned = plan.execute(service.table)
+
+    pd.testing.assert_frame_equal(service.table, original)
+    assert len(cleaned) < len(original)
+
+
+def test_plan_removing_every_row():
+    service = make_service(5)
+    config = make_config(True)
+    config[Configuration.COLUMNS]["float_col"] = {Configuration.FLOAT_MIN: "1000"}
+
+    service.execute_cleaning_plan(build_cleaning_plan(config))
+
+    assert service.table.empty
+    assert str(service.table["text_col"].dtype) == "string"
+
+
+def test_optimizer_moves_selective_filters_before_column_work():
+    service = make_service(6)
+    config = make_config(False)
+    columns = config[Configuration.COLUMNS]
+    config[Configuration.COLUMNS] = {"category_col": columns.pop("category_col"), **columns}
+
+    plan = build_cleaning_plan(config)
+    optimized = optimize_cleaning_plan(plan, service.table)
+    operations = [step["operation"] for step in optimized.steps]
+    positions = {step["position"]: index for index, step in enumerate(optimized.steps)}
+
+    # Filters lead, a filter never precedes the rewrite of its own column, and imputation stays last
+    assert operations[0] in ROW_FILTERS
+    assert operations.index(Configuration.CATEGORIES) > operations.index(Configuration.DATE_MIN)
+    int_steps = [index for index, step in enumerate(optimized.steps) if step["column"] == "int_col"]
+    assert optimized.steps[int_steps[0]]["operation"] == Configuration.DATA_TYPE
+    assert operations[-1] == Configuration.IMPUTE_MISSING_MEAN
+    assert sorted(positions) == list(range(len(plan)))
+
+    assert any("category_col" in flag for flag in optimized.flags)
+    assert len(optimized.estimated_rows) == len(optimized.steps)
+    assert optimized.estimated_rows == sorted(optimized.estimated_rows, reverse=True)
+
+
+def test_optimized_plan_gives_same_rows():
+    config = make_config(True)
+    config[Configuration.COLUMNS]["bool_col"] = {Configuration.DATA_TYPE: "string"}
+    config[Configuration.COLUMNS]["int_col"][Configuration.DATA_TYPE] = "float64"
+
+    service = make_service(7)
+    plan = build_cleaning_plan(config)
+    optimized = optimize_cleaning_plan(plan, service.table)
+
+    expected = plan.execute(service.table)
+    actual = optimized.execute(service.table)
+
+    assert [step["position"] for step in optimized.steps] != list(range(len(plan)))
+    pd.testing.assert_frame_equal(actual, expected, check_categorical=False)
+
+
+def test_selected_plan_keeps_configured_order_when_reordering_changes_results():
+    service = make_service(6)
+    config = make_config(False)
+    columns = config[Configuration.COLUMNS]
+    config[Configuration.COLUMNS] = {"category_col": columns.pop("category_col"), **columns}
+
+    plan = build_cleaning_plan(config)
+    assert optimize_cleaning_plan(plan, service.table).flags
+    selected = select_cleaning_plan(plan, service.table)
+
+    assert [step["position"] for step in selected.steps] == list(range(len(plan)))
+    assert selected.flags[0].startswith("The configured step order was kept")
+    assert len(selected.estimated_rows) == len(plan)
+
+    expected, actual = [], []
+    plan.execute(service.table, on_step=lambda step, result: expected.append(result))
+    selected.execute(service.table, on_step=lambda step, result: actual.append(result))
+    assert actual == expected
+
+
+@pytest.mark.parametrize("drop_missing", [False, True])
+def test_parallel_plan_matches_single_thread(drop_missing):
+    config = make_config(drop_missing)
+    columns = config[Configuration.COLUMNS]
+    # Group the rewrites of several columns into one stage between the filters
+    config[Configuration.COLUMNS] = {
+        "text_col": columns.pop("text_col"),
+        "category_col": columns.pop("category_col"),
+        "bool_col": columns.pop("bool_col"),
+        **columns
+    }
+    plan = build_cleaning_plan(config)
+
+    single, parallel = make_service(8), make_service(8)
+    single_results, parallel_results = [], []
+    single.execute_cleaning_plan(plan, lambda step, result: single_results.append((step["position"], result)))
+    parallel.execute_cleaning_plan(plan, lambda step, result: parallel_results.append((step["position"], result)), 4)
+
+    pd.testing.assert_frame_equal(parallel.table, single.table)
+    assert parallel_results == single_results
+
+
+def test_conversions_run_in_worker_processes(monkeypatch):
+    monkeypatch.setattr(cleaning_plan, "PROCESS_POOL_MIN_VALUES", 0)
+    submitted = []
+    submit = ProcessPoolExecutor.submit
+    monkeypatch.setattr(
+        ProcessPoolExecutor,
+        "submit",
+        lambda pool, function, column, *args: submitted.append(column) or submit(pool, function, column, *args)
+    )
+    test_parallel_plan_matches_single_thread(False)
+
+    # Category correction stays on threads, so only the other columns of the stage were sent to processes
+    assert sorted(submitted) == ["bool_col", "text_col"]
+
+
+def test_small_stages_stay_on_threads():
+    values = np.arange(1000).astype(str)
+    table = pd.DataFrame({"a": values, "b": values}, dtype=object)
+    plan = build_cleaning_plan({
+        Configuration.COLUMNS: {"a": {Configuration.DATA_TYPE: "int64"}, "b": {Configuration.DATA_TYPE: "float64"}},
+        Configuration.DELETE_DUPLICATES: False,
+        Configuration.DROP_MISSING: False,
+        Configuration.IMPUTE_MISSING_MEAN: False,
+        Configuration.IMPUTE_MISSING_MEDIAN: False
+    })
+
+    with cleaning_plan._RewritePools(2) as pools:
+        changes = plan._rewrite_columns(table, plan.steps, np.ones(len(table), dtype=bool), None, pools)
+        assert pools._processes is None
+    assert changes == [1, 1]
+    assert table.dtypes.tolist() == ["int64", "float64"]
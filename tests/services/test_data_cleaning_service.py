@@ -1,12 +1,13 @@
 import random
 import string
+from unittest.mock import patch
 
 import pytest
 import pandas as pd
+from core import Configuration, CorrectionStore
 from model import DataModel
 from services.data_cleaning_service import DataCleaningService
 from tests.helper_functions import generate_random_dataframe
-from utils import Configuration
 
 
 @pytest.fixture
@@ -206,8 +207,7 @@ def test_apply_cleaning_script(tmp_path, service):
     # Save the CSV so subprocess can read it
     service._model.get_table(service.table_name).to_csv(f"{service.table_name}.csv", index=False)
 
-    result = service.apply_cleaning_script(str(script_file))
-    assert result is True
+    service.apply_cleaning_script(str(script_file))
 
     # Cleanup CSV created by apply_cleaning_script
     import os
@@ -216,3 +216,130 @@ def test_apply_cleaning_script(tmp_path, service):
 
     if os.path.exists(f"{file_path}/{service.table_name}.csv"):
         os.remove(f"{file_path}/{service.table_name}.csv")
+
+def test_get_categories_like(service):
+    service._table["category_col"] = service._table["category_col"].cat.add_categories(["Bananas"])
+
+    similar = service.get_categories("category_col", like="banan", limit=2)
+    assert similar[0] in ("Banana", "Bananas")
+    assert set(similar) == {"Banana", "Bananas"}
+
+def test_autocorrect_categories_remembers_corrections(tmp_path):
+    model = DataModel()
+    model.set_database({"fruit_table": pd.DataFrame({"category_col": pd.Series(["Aple", "Banan", "Apple", "Zzzz"] * 10, dtype="category")})})
+    store = CorrectionStore(str(tmp_path / "corrections.json"))
+    svc = DataCleaningService(model, store)
+    svc.set_and_retrieve_table("fruit_table")
+
+    changed = svc.autocorrect_categories("category_col", ["Apple", "Banana"], vocabulary="fruit")
+    assert changed == 20
+    assert CorrectionStore(store.path).get_corrections("fruit") == {"Aple": "Apple", "Banan": "Banana"}
+
+    # Known values are looked up without matching, so even a correction the matcher would reject is applied
+    store.record("fruit", {"Zzzz": "Banana"})
+    svc._table = pd.DataFrame({"category_col": pd.Series(["Zzzz", "Aple"], dtype="category")})
+    with patch("services.data_cleaning_service.build_correction_map", return_value={}) as matcher:
+        changed = svc.autocorrect_categories("category_col", ["Apple", "Banana"], vocabulary="fruit")
+
+    assert changed == 2
+    assert matcher.call_args.args[0] == []
+    assert list(svc._table["category_col"]) == ["Banana", "Apple"]
+
+def test_replay_config_skips_missing_columns(service):
+    config = {
+        Configuration.COLUMNS: {
+            "float_col": {Configuration.FLOAT_MIN: "40"},
+            "no_such_col": {Configuration.DATA_TYPE: "int64"}
+        },
+        Configuration.DELETE_DUPLICATES: False,
+        Configuration.DROP_MISSING: True,
+        Configuration.IMPUTE_MISSING_MEAN: False,
+        Configuration.IMPUTE_MISSING_MEDIAN: False
+    }
+    rows = service.get_table_length()
+
+    stats = service.replay_config(config)
+
+    assert service.table["float_col"].min() >= 40
+    assert not service.table.isna().any().any()
+    assert stats["outliers"] + stats["missing_dropped"] == rows - service.get_table_length()
+    assert service.model.get_table("test_table") is service.table
+
+def test_run_cleaning_script_in_process(tmp_path, service):
+    config = {
+        Configuration.COLUMNS: {
+            "int_col": {Configuration.DATA_TYPE: "float64", Configuration.INT_MIN: "10"},
+            "float_col": {Configuration.FLOAT_MAX: "70"},
+            "string_col": {Configuration.STRING_MAX: "4"},
+            "datetime_col": {Configuration.DATE_MIN: "2021-06-01"}
+        },
+        Configuration.DELETE_DUPLICATES: True,
+        Configuration.DROP_MISSING: True,
+        Configuration.IMPUTE_MISSING_MEAN: False,
+        Configuration.IMPUTE_MISSING_MEDIAN: False
+    }
+    # Lists in the object column cannot be compared for duplicates
+    service.model.set_table("test_table", service.table.drop(columns="object_col"))
+    service.set_and_retrieve_table("test_table")
+    service.generate_cleaning_script(config)
+    service.save_cleaning_script(str(tmp_path))
+    expected = service.table.copy()
+    expected_service = DataCleaningService(DataModel())
+    expected_service.model.set_database({"test_table": expected})
+    expected_service.set_and_retrieve_table("test_table")
+    expected_service.replay_config(config)
+
+    service.run_cleaning_script(str(tmp_path / "cleaning_script.py"))
+
+    # The result replaces the table in memory, without writing any CSV file
+    assert service.model.get_table("test_table") is service.table
+    assert not (tmp_path / "test_table.csv").exists()
+    pd.testing.assert_frame_equal(service.table, expected_service.table)
+
+def test_run_cleaning_script_rejects_other_files(tmp_path, service):
+    script_file = tmp_path / "script.py"
+    script_file.write_text("df = None\n")
+    original = service.table
+
+    with pytest.raises(ValueError, match="not a cleaning script"):
+        service.run_cleaning_script(str(script_file))
+    assert service.table is original
+
+@pytest.mark.parametrize("table_name", ["order items", "order-items", "order's items"])
+def test_run_cleaning_script_reads_any_table_name(tmp_path, table_name):
+    model = DataModel()
+    model.set_database({table_name: pd.DataFrame({"value": [3, 1, 3, None]})})
+    svc = DataCleaningService(model)
+    svc.set_and_retrieve_table(table_name)
+    svc.generate_cleaning_script({
+        Configuration.COLUMNS: {},
+        Configuration.DELETE_DUPLICATES: True,
+        Configuration.DROP_MISSING: True,
+        Configuration.IMPUTE_MISSING_MEAN: False,
+        Configuration.IMPUTE_MISSING_MEDIAN: False
+    })
+    svc.save_cleaning_script(str(tmp_path))
+
+    svc.run_cleaning_script(str(tmp_path / "cleaning_script.py"))
+
+    assert model.get_table(table_name)["value"].tolist() == [3, 1]
+
+def test_run_cleaning_script_reports_why_it_failed(tmp_path, service):
+    script_file = tmp_path / "cleaning_script.py"
+    lines = [
+        "import pandas as pd",
+        "df = pd.read_csv('test_table.csv')",
+        "df = df['no_such_col']",
+        "df.to_csv('test_table.csv', index=False)",
+        "# CLEANING ASSISTANT SCRIPT FILE"
+    ]
+    script_file.write_text("\n".join(lines))
+    original = service.table
+
+    with pytest.raises(ValueError, match="KeyError: 'no_such_col'"):
+        service.run_cleaning_script(str(script_file))
+    assert service.table is original
+
+    script_file.write_text("\n".join(lines).replace("test_table", "other_table"))
+    with pytest.raises(ValueError, match="\"other_table\" table, which is not loaded"):
+        service.run_cleaning_script(str(script_file))
@@ -1,12 +1,22 @@
+import threading
+
 import pandas as pd
 import pytest
+from pandas.errors import DatabaseError
 from unittest.mock import MagicMock, patch
+from sqlalchemy import create_engine
+
+from model import DataModel
 from services import QueryService
+from services.query_service import execute_statement, get_referenced_tables, is_select_query, normalize_query
 
 
 @pytest.fixture
 def mock_model():
-    return MagicMock()
+    model = MagicMock()
+    model.get_table_source.return_value = None
+    model.get_changed_rows.return_value = None
+    return model
 
 @pytest.fixture
 def service(mock_model):
@@ -17,18 +27,41 @@ def test_set_query_sets_internal_value(service):
     service.set_query(query)
     assert service.query == query
 
-@patch("services.query_service.sqldf")
-def test_execute_query_calls_sqldf_with_correct_env(mock_sqldf, service, mock_model):
-    query = "SELECT * FROM users"
-    mock_df = pd.DataFrame([{"id": 1, "name": "Alice"}])
-    mock_sqldf.return_value = mock_df
-    mock_model.get_database.return_value = {"users": mock_df}
+def test_execute_query_registers_tables_once(service, mock_model):
+    df = pd.DataFrame([{"id": 1, "name": "Alice"}])
+    mock_model.get_database.return_value = {"users": df}
+    mock_model.get_table_version.return_value = 1
 
-    service.set_query(query)
-    result = service.execute_query()
+    service.set_query("SELECT * FROM users")
+    with patch.object(service, "_register_table", wraps=service._register_table) as register:
+        first = service.execute_query()
+        second = service.execute_query()
+
+    register.assert_called_once()
+    assert first.equals(df)
+    assert second.equals(df)
+
+def test_execute_query_resyncs_changed_tables(service, mock_model):
+    mock_model.get_database.return_value = {"users": pd.DataFrame({"id": [1]})}
+    mock_model.get_table_version.return_value = 1
+    service.set_query("SELECT COUNT(*) AS n FROM users")
+    assert service.execute_query()["n"].iloc[0] == 1
+
+    mock_model.get_database.return_value = {"users": pd.DataFrame({"id": [1, 2, 3]})}
+    mock_model.get_table_version.return_value = 2
+    assert service.execute_query()["n"].iloc[0] == 3
+
+def test_sync_tables_drops_removed_tables(service, mock_model):
+    mock_model.get_database.return_value = {"users": pd.DataFrame({"id": [1]})}
+    mock_model.get_table_version.return_value = 1
+    service.sync_tables()
+
+    mock_model.get_database.return_value = {}
+    service.sync_tables()
+    service.set_query("SELECT * FROM users")
 
-    mock_sqldf.assert_called_once_with(query, env={"users": mock_df})
-    assert result.equals(mock_df)
+    with pytest.raises(DatabaseError):
+        pd.read_sql_query(service.query, service._connection)
 
 def test_get_last_result_returns_stored_value(service):
     df = pd.DataFrame([{"x": 1}])
@@ -47,3 +80,304 @@ def test_execute_query_with_real_dataframe(service, mock_model):
     result = service.execute_query()
 
     assert list(result["name"]) == ["Alice"]
+
+def test_get_referenced_tables_handles_joins_and_subqueries():
+    query = """
+        SELECT u.name FROM users u
+        JOIN (SELECT * FROM "Orders" WHERE total > 5) o ON o.user_id = u.id, regions AS r
+        WHERE u.id IN (SELECT user_id FROM refunds)
+    """
+    tables = get_referenced_tables(query, ["users", "Orders", "regions", "refunds", "facts"])
+    assert sorted(tables) == ["Orders", "refunds", "regions", "users"]
+
+def test_get_referenced_tables_excludes_ctes_and_ignores_case():
+    query = "WITH recent (id) AS (SELECT id FROM Users) SELECT * FROM recent -- FROM facts"
+    assert get_referenced_tables(query, ["users", "facts"]) == ["users"]
+
+def test_get_referenced_tables_rejects_unknown_tables():
+    with pytest.raises(ValueError, match="missing"):
+        get_referenced_tables("SELECT * FROM users JOIN missing ON 1", ["users"])
+
+def test_execute_query_syncs_only_referenced_tables(service, mock_model):
+    mock_model.get_database.return_value = {
+        "lookup": pd.DataFrame({"id": [1]}),
+        "facts": pd.DataFrame({"id": [1, 2]})
+    }
+    service.set_query("SELECT * FROM lookup")
+
+    with patch.object(service, "_register_table", wraps=service._register_table) as register:
+        service.execute_query()
+
+    assert [call.args[0] for call in register.call_args_list] == ["lookup"]
+
+def test_execute_query_can_be_interrupted_from_another_thread(service, mock_model):
+    mock_model.get_database.return_value = {"users": pd.DataFrame({"id": [1]})}
+    connection = service.open_connection()
+    query = (
+        "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < 1000000000) "
+        "SELECT COUNT(*) FROM c, users"
+    )
+
+    timer = threading.Timer(0.2, connection.interrupt)
+    timer.start()
+    with pytest.raises(DatabaseError, match="interrupted"):
+        service.execute_query(query, connection)
+    timer.join()
+
+    # Other connections and later queries are unaffected
+    assert service.execute_query("SELECT COUNT(*) AS n FROM users", service.open_connection())["n"].iloc[0] == 1
+
+def test_normalize_query_ignores_layout_but_not_literals():
+    assert normalize_query("select *\n  from users -- all\n where name = 'A  b';") == \
+        "SELECT * FROM USERS WHERE NAME = 'A  b'"
+    assert normalize_query("SELECT 'a'") != normalize_query("SELECT 'A'")
+
+def test_execute_query_returns_cached_result_until_table_changes(service, mock_model):
+    mock_model.get_database.return_value = {"users": pd.DataFrame({"id": [1, 2]})}
+    mock_model.get_table_version.return_value = 1
+
+    first = service.execute_query("SELECT * FROM users")
+    with patch("services.query_service.execute_statement") as execute_statement:
+        cached = service.execute_query("select *  from USERS;")
+        execute_statement.assert_not_called()
+
+    assert cached.equals(first)
+    assert service.get_last_result().equals(first)
+
+    mock_model.get_database.return_value = {"users": pd.DataFrame({"id": [1, 2, 3]})}
+    mock_model.get_table_version.return_value = 2
+    assert len(service.execute_query("SELECT * FROM users")) == 3
+
+def test_volatile_queries_are_not_cached(service, mock_model):
+    mock_model.get_database.return_value = {"users": pd.DataFrame({"id": [1]})}
+    service.execute_query("SELECT id, RANDOM() AS r FROM users")
+    assert not service._result_cache
+
+def test_result_cache_evicts_least_recently_used(mock_model):
+    service = QueryService(mock_model, max_cache_bytes=1500)
+    mock_model.get_database.return_value = {"users": pd.DataFrame({"id": range(100)})}
+    mock_model.get_table_version.return_value = 1
+
+    service.execute_query("SELECT id FROM users WHERE id < 50")
+    service.execute_query("SELECT id FROM users WHERE id >= 50")
+    service.execute_query("SELECT id FROM users WHERE id < 50")
+    service.execute_query("SELECT id FROM users WHERE id < 90")
+
+    cached_queries = [key[0] for key in service._result_cache]
+    assert cached_queries == ["SELECT ID FROM USERS WHERE ID < 50", "SELECT ID FROM USERS WHERE ID < 90"]
+    assert service._cache_bytes <= 1500
+
+def test_open_cursor_fetches_blocks_on_demand(service, mock_model):
+    mock_model.get_database.return_value = {"users": pd.DataFrame({"id": range(250)})}
+
+    cursor = service.open_cursor("SELECT id FROM users ORDER BY id")
+    first = cursor.fetch(100)
+    second = cursor.fetch(100)
+
+    assert list(first["id"]) == list(range(100))
+    assert list(second.index) == list(range(100, 200))
+    assert cursor.row_count is None and not cursor.exhausted
+
+    assert len(cursor.fetch(100)) == 50
+    assert cursor.exhausted and cursor.row_count == 250
+    assert service.count_rows("SELECT id FROM users ORDER BY id;") == 250
+
+def test_open_cursor_is_closed_as_stale_when_a_table_is_resynced(service, mock_model):
+    mock_model.get_database.return_value = {"users": pd.DataFrame({"id": range(250)})}
+    mock_model.get_table_version.return_value = 1
+    cursor = service.open_cursor("SELECT id FROM users")
+    cursor.fetch(10)
+
+    mock_model.get_database.return_value = {"users": pd.DataFrame({"id": range(5)})}
+    mock_model.get_table_version.return_value = 2
+    assert len(service.execute_query("SELECT id FROM users")) == 5
+
+    assert cursor.stale and cursor.exhausted
+    assert cursor.fetch(10).empty
+
+def test_exhausted_cursor_becomes_last_query_result(mock_model):
+    service = QueryService(mock_model, max_cache_bytes=100)
+    mock_model.get_database.return_value = {"users": pd.DataFrame({"id": range(250)})}
+
+    stopped = service.open_cursor("SELECT id FROM users WHERE id < 200")
+    stopped.fetch(100)
+    stopped.close()
+    assert service.last_query_result is None
+
+    # Too large for the cache, so the fetched blocks are kept as they are
+    cursor = service.open_cursor("SELECT id FROM users")
+    blocks = [cursor.fetch(100) for _ in range(3)]
+    assert cursor.exhausted and not service._result_cache
+    assert service.last_query_result["id"].tolist() == list(range(250))
+    assert service.last_query_result.index.tolist() == list(range(250))
+    assert blocks[2].index[0] == 200
+
+def test_export_query_writes_full_result_in_chunks(service, mock_model, tmp_path):
+    mock_model.get_database.return_value = {"users": pd.DataFrame({"id": range(250), "name": "x"})}
+    path = tmp_path / "result.csv"
+
+    progress = list(service.export_query("SELECT * FROM users", str(path), chunk_size=100))
+
+    assert progress == [100, 200, 250]
+    assert pd.read_csv(path).equals(pd.DataFrame({"id": range(250), "name": "x"}))
+
+def test_export_query_removes_partial_file_when_stopped(service, mock_model, tmp_path):
+    mock_model.get_database.return_value = {"users": pd.DataFrame({"id": range(250)})}
+    path = tmp_path / "result.csv"
+
+    export = service.export_query("SELECT * FROM users", str(path), chunk_size=100)
+    next(export)
+    export.close()
+
+    assert not path.exists()
+
+def test_execute_query_records_profile_in_query_log(service, mock_model):
+    mock_model.get_database.return_value = {"users": pd.DataFrame({"id": range(10)})}
+    mock_model.get_table_version.return_value = 1
+
+    service.execute_query("SELECT * FROM users WHERE id > 4", explain=True)
+    service.execute_query("SELECT * FROM users WHERE id > 4")
+
+    first, second = service.get_query_log()
+    assert first["synced_tables"] == ["users"] and not first["cached"]
+    assert first["rows"] == 5 and first["plan"] and "users" in first["plan"][0]
+    assert min(first[key] for key in ("sync_seconds", "planning_seconds", "execution_seconds")) > 0
+    assert second["cached"] and second["synced_tables"] == [] and second["rows"] == 5
+
+def test_explain_query_returns_indented_plan(service, mock_model):
+    mock_model.get_database.return_value = {"users": pd.DataFrame({"id": range(10)})}
+
+    plan = service.explain_query("SELECT * FROM users WHERE id IN (SELECT id FROM users)")
+
+    assert any(line.startswith("  ") for line in plan)
+    assert service.get_query_log() == []
+
+@pytest.fixture
+def source_model(tmp_path):
+    # A file-backed SQLite engine stands in for the source Postgres server
+    engine = create_engine(f"sqlite:///{tmp_path / 'source.db'}")
+    pd.DataFrame({"id": [1, 2, 3]}).to_sql("users", engine, index=False)
+
+    model = DataModel()
+    model.set_database(
+        {"users": pd.DataFrame({"id": [1, 2], "name": ["a", "b"]}), "notes": pd.DataFrame({"id": [1]})},
+        {"users": {"engine": engine, "schema": "public", "table": "users"}}
+    )
+    return model
+
+def test_queries_on_unmodified_database_tables_are_pushed_down(source_model):
+    service = QueryService(source_model)
+
+    result = service.execute_query("SELECT COUNT(*) AS n FROM users")
+
+    assert result["n"].iloc[0] == 3
+    assert service.get_query_log()[-1]["route"] == "source database"
+    assert service.get_query_log()[-1]["synced_tables"] == []
+
+def test_modified_and_file_tables_run_locally(source_model):
+    service = QueryService(source_model)
+    assert service.execute_query("SELECT COUNT(*) AS n FROM users JOIN notes USING (id)")["n"].iloc[0] == 1
+
+    source_model.set_table("users", pd.DataFrame({"id": [1, 2, 3, 4]}))
+    cursor = service.open_cursor("SELECT * FROM users")
+
+    assert len(cursor.fetch(10)) == 4
+    assert cursor.profile["route"] == "local"
+
+@pytest.mark.parametrize("query", [
+    "DELETE FROM users",
+    "SELECT * FROM users; DELETE FROM users",
+    "WITH gone AS (DELETE FROM users RETURNING id) SELECT * FROM gone"
+])
+def test_statements_that_change_data_are_never_pushed_down(source_model, query):
+    service = QueryService(source_model)
+    engine = source_model.get_table_source("users")["engine"]
+
+    with patch.object(engine, "connect", wraps=engine.connect) as connect:
+        with pytest.raises(ValueError, match="SELECT"):
+            service.execute_query(query)
+
+    connect.assert_not_called()
+    assert len(pd.read_sql_query("SELECT * FROM users", engine)) == 3
+
+def test_queries_cannot_change_the_mirror(service, mock_model):
+    mock_model.get_database.return_value = {"users": pd.DataFrame({"id": [1, 2, 3]})}
+    mock_model.get_table_version.return_value = 1
+
+    assert service.execute_query("SELECT COUNT(*) AS n FROM users")["n"].iloc[0] == 3
+
+    with pytest.raises(ValueError, match="SELECT"):
+        service.execute_query("DELETE FROM users")
+    with pytest.raises(DatabaseError, match="readonly"):
+        execute_statement(service.open_connection(), "DELETE FROM users")
+
+    assert service.execute_query("SELECT COUNT(*) AS n FROM users WHERE id > 0")["n"].iloc[0] == 3
+
+def test_is_select_query_accepts_only_single_select_statements():
+    assert is_select_query("select * from users;")
+    assert is_select_query("WITH t AS (SELECT 1) SELECT * FROM t -- ; DROP TABLE users")
+    assert is_select_query("SELECT ';' AS s FROM users")
+    assert not is_select_query("SELECT 1; COMMIT")
+    assert not is_select_query("UPDATE users SET id = 1")
+    assert not is_select_query("")
+
+def test_is_select_query_checks_only_statement_keywords():
+    assert is_select_query("SELECT copy, merge AS \"grant\", u.delete FROM users u")
+    assert is_select_query("WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n) SELECT * FROM n")
+    assert is_select_query("WITH a AS MATERIALIZED (VALUES (1)), b AS (WITH c AS (SELECT 1) SELECT * FROM c) "
+                           "SELECT * FROM a, b")
+    assert not is_select_query("WITH a AS (SELECT 1) DELETE FROM users")
+    assert not is_select_query("WITH a AS (SELECT 1), b AS (UPDATE users SET id = 1 RETURNING id) SELECT * FROM b")
+    assert not is_select_query("WITH a AS (SELECT 1")
+
+def test_failed_pushdown_falls_back_to_local_execution(source_model):
+    service = QueryService(source_model)
+
+    # The source table has no name column, so the query only works locally
+    result = service.execute_query("SELECT name FROM users")
+
+    profile = service.get_query_log()[-1]
+    assert profile["route"] == "local" and profile["pushdown_error"]
+    assert list(result["name"]) == ["a", "b"]
+
+def test_declared_indexes_are_built_and_rebuilt_on_resync(service, mock_model):
+    mock_model.get_database.return_value = {"users": pd.DataFrame({"id": range(100), "name": "x"})}
+    mock_model.get_table_version.return_value = 1
+
+    index_name = service.create_index("users", ["id"])
+    assert service.get_indexes("users") == [{"name": index_name, "table": "users", "columns": ["id"], "built": False}]
+
+    service.execute_query("SELECT * FROM users WHERE id = 5")
+    assert service.get_indexes()[0]["built"]
+    assert any("USING" in line and index_name in line for line in service.explain_query("SELECT * FROM users WHERE id = 5"))
+
+    mock_model.get_table_version.return_value = 2
+    service.sync_tables(["users"])
+    assert any(index_name in line for line in service.explain_query("SELECT * FROM users WHERE id = 5"))
+
+    service.drop_index(index_name)
+    assert not any(index_name in line for line in service.explain_query("SELECT * FROM users WHERE id = 5"))
+
+def test_edited_rows_are_updated_in_place_with_their_indexes():
+    model = DataModel()
+    model.set_database({"users": pd.DataFrame({"id": range(100), "name": "x"}, index=range(100, 200))})
+    service = QueryService(model)
+    index_name = service.create_index("users", ["name"])
+    service.execute_query("SELECT COUNT(*) AS n FROM users")
+
+    model.update_row("users", pd.DataFrame({"name": ["y"]}, index=[142]))
+    with patch.object(service, "_register_table", wraps=service._register_table) as register_table:
+        result = service.execute_query("SELECT id FROM users WHERE name = 'y'")
+
+    assert list(result["id"]) == [42]
+    assert "users" not in [call.args[0] for call in register_table.call_args_list]
+    assert service.get_indexes()[0]["built"]
+    assert any(index_name in line for line in service.explain_query("SELECT id FROM users WHERE name = 'y'"))
+
+    model.set_table("users", pd.DataFrame({"id": [1], "name": ["y"]}))
+    assert list(service.execute_query("SELECT id FROM users WHERE name = 'y'")["id"]) == [1]
+
+def test_create_index_rejects_unknown_columns(service, mock_model):
+    mock_model.get_database.return_value = {"users": pd.DataFrame({"id": [1]})}
+    with pytest.raises(ValueError, match="missing"):
+        service.create_index("users", ["missing"])
@@ -0,0 +1,139 @@
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core import Configuration
+from model import DataModel
+from services import DataCleaningService, build_cleaning_plan
+from services.streaming_cleaner import ColumnSketch, MedianSelection, RowHashSet, StreamingCleaner
+from tests.helper_functions import generate_random_dataframe
+
+
+@pytest.fixture
+def source(tmp_path) -> str:
+    random.seed(3)
+    df = generate_random_dataframe(n_rows=600, seed=3).drop(columns=["object_col", "bool_col"])
+    df = pd.concat([df, df.iloc[:50], df.iloc[300:320]], ignore_index=True)
+    path = tmp_path / "source.csv"
+    df.to_csv(path, index=False)
+    return str(path)
+
+
+def make_config(general: dict = None) -> dict:
+    config = {
+        Configuration.COLUMNS: {
+            "int_col": {Configuration.DATA_TYPE: "int64", Configuration.INT_MIN: "10"},
+            "float_col": {Configuration.DATA_TYPE: "float64", Configuration.FLOAT_MAX: "70"},
+            "category_col": {Configuration.DATA_TYPE: "category", Configuration.CATEGORIES: "Aple Bananna Carot"},
+            "string_col": {Configuration.DATA_TYPE: "string", Configuration.STRING_MAX: "4"}
+        },
+        Configuration.DELETE_DUPLICATES: True,
+        Configuration.DROP_MISSING: False,
+        Configuration.IMPUTE_MISSING_MEAN: False,
+        Configuration.IMPUTE_MISSING_MEDIAN: False
+    }
+    config.update(general or {})
+    return config
+
+
+def clean_in_memory(source: str, config: dict) -> pd.DataFrame:
+    model = DataModel()
+    model.set_database({"source": pd.read_csv(source)})
+    service = DataCleaningService(model)
+    service.set_and_retrieve_table("source")
+    service.execute_cleaning_plan(build_cleaning_plan(config))
+    return service.table.reset_index(drop=True)
+
+
+@pytest.mark.parametrize("general", [
+    {},
+    {Configuration.DROP_MISSING: True},
+    {Configuration.IMPUTE_MISSING_MEAN: True},
+    {Configuration.IMPUTE_MISSING_MEDIAN: True},
+])
+def test_streaming_matches_in_memory_cleaning(tmp_path, source, general):
+    config = make_config(general)
+    destination = str(tmp_path / "cleaned.csv")
+
+    cleaner = StreamingCleaner(config, chunk_size=97)
+    progress = list(cleaner.clean_file(source, destination))
+
+    expected = clean_in_memory(source, config)
+    expected.to_csv(tmp_path / "expected.csv", index=False)
+
+    actual = pd.read_csv(destination)
+    pd.testing.assert_frame_equal(actual, pd.read_csv(tmp_path / "expected.csv"), check_exact=False)
+    assert cleaner.stats["rows_written"] == len(expected)
+    assert progress[-1]["rows_written"] == len(expected)
+    assert cleaner.stats["duplicates"] > 0
+
+
+def test_closing_early_discards_partial_output(tmp_path, source):
+    destination = tmp_path / "cleaned.csv"
+    progress = StreamingCleaner(make_config(), chunk_size=50).clean_file(source, str(destination))
+    next(progress)
+    progress.close()
+
+    assert not destination.exists()
+    assert not list(tmp_path.glob("*.partial"))
+
+
+def test_row_hash_set_finds_repeats_across_batches():
+    seen = RowHashSet()
+    assert list(seen.add(np.array([5, 3, 5], dtype=np.uint64))) == [True, True, False]
+    for start in range(0, 100, 10):
+        seen.add(np.arange(start, start + 10, dtype=np.uint64))
+    assert list(seen.add(np.array([3, 99, 1000], dtype=np.uint64))) == [False, False, True]
+    assert len(seen) == 101
+
+
+def test_column_sketch_statistics():
+    values = np.random.default_rng(0).normal(10, 2, 50_000)
+    exact, sketched = ColumnSketch(capacity=100_000), ColumnSketch(capacity=1_000)
+    for chunk in np.array_split(values, 7):
+        exact.update(chunk)
+        sketched.update(chunk)
+
+    assert exact.exact
+    assert exact.mean() == pytest.approx(values.mean())
+    assert exact.median() == np.median(values)
+
+    # Estimated ranks stay within the tracked error, and the bounds hold the median
+    assert not sketched.exact
+    assert 0 < sketched.rank_error < len(values) // 20
+    true_rank = np.searchsorted(np.sort(values), sketched.median(), side="right")
+    assert abs(true_rank - (len(values) + 1) / 2) <= sketched.rank_error + 1
+    low, high = sketched.median_bounds()
+    assert low < np.median(values) <= high
+
+
+@pytest.mark.parametrize("size", [49_999, 50_000])
+def test_median_selection_is_exact_beyond_the_sketch(size):
+    values = np.random.default_rng(1).exponential(5, size).round(1)
+    values[::13] = np.nan
+    sketch = ColumnSketch(capacity=500)
+    for chunk in np.array_split(values, 9):
+        sketch.update(chunk)
+
+    selection = MedianSelection(sketch)
+    for chunk in np.array_split(values, 4):
+        selection.update(chunk)
+
+    assert not sketch.exact
+    assert selection.median() == np.nanmedian(values)
+
+
+def test_streaming_median_matches_in_memory_with_small_sketch(tmp_path, source):
+    config = make_config({Configuration.IMPUTE_MISSING_MEDIAN: True})
+    destination = str(tmp_path / "cleaned.csv")
+
+    cleaner = StreamingCleaner(config, chunk_size=97, sketch_size=40)
+    progress = list(cleaner.clean_file(source, destination))
+
+    expected = clean_in_memory(source, config)
+    expected.to_csv(tmp_path / "expected.csv", index=False)
+
+    pd.testing.assert_frame_equal(pd.read_csv(destination), pd.read_csv(tmp_path / "expected.csv"), check_exact=False)
+    assert sum(1 for step in progress if step["pass"] == 1) == 2 * sum(1 for step in progress if step["pass"] == 2)
@@ -0,0 +1,102 @@
+import json
+import os
+import random
+import subprocess
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+import cli
+from tests.helper_functions import generate_random_dataframe
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def write_sources(folder: Path) -> list[str]:
+    random.seed(0)
+    paths = []
+    for index in range(2):
+        path = folder / f"table_{index}.csv"
+        generate_random_dataframe(n_rows=200, seed=index).drop(columns=["object_col"]).to_csv(path, index=False)
+        paths.append(str(path))
+
+    config = {
+        "cleaning": {
+            "Columns": {"Float Col": {"FloatMin": "30"}, "int_col": {"DataType": "float64"}},
+            "DeleteDuplicates": True,
+            "DropMissing": True
+        },
+        "analytics": {"AnalyzeMissingness": True, "AnalyzeOutliers": True}
+    }
+    (folder / "config.json").write_text(json.dumps(config))
+    return paths
+
+
+def test_cli_cleans_files_and_writes_report(tmp_path):
+    sources = write_sources(tmp_path)
+    output_dir, report_path = tmp_path / "cleaned", tmp_path / "report.json"
+
+    code = cli.main([
+        *sources,
+        "--config", str(tmp_path / "config.json"),
+        "--output-dir", str(output_dir),
+        "--report", str(report_path),
+        "--no-corrections"
+    ])
+
+    report = json.loads(report_path.read_text())
+    assert code == 0
+    assert report["summary"]["cleaned"] == ["table_0", "table_1"]
+    for name in ("table_0", "table_1"):
+        cleaned = pd.read_csv(output_dir / f"{name}.csv")
+        assert len(cleaned) == report["tables"][name]["cleaning"]["rows_after"]
+        assert cleaned["float_col"].min() >= 30
+        assert not cleaned.isna().any().any()
+        assert set(report["tables"][name]["analytics"]) == {"missingness", "outliers"}
+
+
+def test_cli_streaming_matches_in_memory(tmp_path):
+    sources = write_sources(tmp_path)
+    arguments = ["--config", str(tmp_path / "config.json"), "--no-corrections"]
+
+    cli.main([sources[0], "--output-dir", str(tmp_path / "memory"), *arguments])
+    cli.main([sources[0], "--output-dir", str(tmp_path / "stream"), "--stream", "--chunk-size", "50", *arguments])
+
+    pd.testing.assert_frame_equal(
+        pd.read_csv(tmp_path / "stream" / "table_0.csv"),
+        pd.read_csv(tmp_path / "memory" / "table_0.csv")
+    )
+
+
+def test_cli_runs_without_a_display(tmp_path):
+    sources = write_sources(tmp_path)
+    script = (
+        "import sys, cli; "
+        f"cli.main({[*sources, '--config', str(tmp_path / 'config.json'), '--output-dir', str(tmp_path / 'out'), '--no-corrections']!r}); "
+        "widgets = sys.modules.get('PyQt6.QtWidgets'); "
+        "print(widgets is None or widgets.QApplication.instance() is None)"
+    )
+    environment = {
+        key: value for key, value in os.environ.items() if key not in ("DISPLAY", "WAYLAND_DISPLAY", "QT_QPA_PLATFORM")
+    }
+
+    result = subprocess.run(
+        [sys.executable, "-c", script], cwd=ROOT, env=environment, capture_output=True, text=True, check=True
+    )
+
+    assert result.stdout.strip().splitlines()[-1] == "True"
+    assert (tmp_path / "out" / "table_0.csv").exists()
+
+
+def test_cli_does_not_import_qt(tmp_path):
+    sources = write_sources(tmp_path)
+    script = (
+        "import sys, cli; "
+        f"code = cli.run(cli.parse_args({[*sources, '--config', str(tmp_path / 'config.json'), '--output-dir', str(tmp_path / 'out'), '--no-corrections']!r})); "
+        "print(code, sorted({name.split('.')[0] for name in sys.modules} & {'PyQt6', 'matplotlib'}))"
+    )
+
+    result = subprocess.run([sys.executable, "-c", script], cwd=ROOT, capture_output=True, text=True, check=True)
+
+    assert result.stdout.strip().splitlines()[-1] == "0 []"
@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import TableFilter
+from utils.table_filter import parse_filter
+
+
+@pytest.fixture
+def table():
+    return pd.DataFrame({
+        "age": pd.Series([15, 22, 37, None, 64], dtype="Int64"),
+        "city": pd.Series(["Paris", "Rome", "New York", "Rome", None], dtype="category"),
+        "name": ["Ann Smith", "bob", "Carl", "Dana Smith", "Eve"],
+        "joined": pd.to_datetime(["2020-01-01", "2021-06-01", "2022-03-15", None, "2024-12-31"])
+    })
+
+@pytest.mark.parametrize("expression, expected", [
+    ("age >= 22", [1, 2, 4]),
+    ("age >= 20 AND age < 40", [1, 2]),
+    ("city IN (Paris, 'New York')", [0, 2]),
+    ("city NOT IN (Rome)", [0, 2]),
+    ("name CONTAINS smith", [0, 3]),
+    ("name MATCHES '^[A-C]'", [0, 2]),
+    ("age IS NULL OR city IS NULL", [3, 4]),
+    ("joined > 2021-01-01 AND (city = Rome OR age > 60)", [1, 4]),
+    ("\"name\" != bob", [0, 2, 3, 4]),
+    ("", [0, 1, 2, 3, 4]),
+])
+def test_expressions_select_expected_rows(table, expression, expected):
+    assert list(TableFilter().get_rows(table, expression)) == expected
+
+def test_rows_follow_given_row_order(table):
+    permutation = np.array([4, 3, 2, 1, 0])
+    rows = TableFilter().get_rows(table, "age > 20", row_order=permutation)
+    assert list(rows) == [4, 2, 1]
+
+def test_masks_are_cached_per_version(table):
+    table_filter = TableFilter()
+    mask = table_filter.get_mask(table, "age > 20", version=1)
+    assert table_filter.get_mask(table, "age > 20", version=1) is mask
+    assert table_filter.get_mask(table, "age > 20", version=2) is not mask
+
+@pytest.mark.parametrize("expression", [
+    "age >",
+    "age >= 20 AND",
+    "(age > 1",
+    "age BETWEEN 1",
+    "missing = 1",
+    "age = abc",
+    "name MATCHES '('",
+])
+def test_invalid_expressions_raise_value_error(table, expression):
+    with pytest.raises(ValueError):
+        TableFilter().get_mask(table, expression)
+
+def test_and_binds_tighter_than_or():
+    node = parse_filter("a = 1 OR b = 2 AND c = 3")
+    assert node[0] == "OR"
+    assert node[1][1][0] == "AND"
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.table_search import iter_table_matches
+
+
+@pytest.fixture
+def table():
+    return pd.DataFrame({
+        "name": ["alpha", "Beta", None, "gamma", "alphabet"],
+        "code": ["x1", "alpha", "x3", "x4", "x5"],
+        "value": [1, 22, 3, 122, 5]
+    })
+
+def collect(chunks):
+    rows, columns = [], []
+    for chunk_rows, chunk_columns, _ in chunks:
+        rows.extend(chunk_rows)
+        columns.extend(chunk_columns)
+    return list(zip(rows, columns))
+
+def test_hits_are_ordered_by_row_then_column(table):
+    hits = collect(iter_table_matches(table, "ALPHA", chunk_size=2))
+    assert hits == [(0, 0), (1, 1), (4, 0)]
+
+def test_search_limited_to_columns(table):
+    hits = collect(iter_table_matches(table, "22", columns=["value"]))
+    assert hits == [(1, 2), (3, 2)]
+
+def test_regex_search_and_missing_values(table):
+    hits = collect(iter_table_matches(table, r"^x\d$", columns=["code"], regex=True))
+    assert hits == [(0, 1), (2, 1), (3, 1), (4, 1)]
+    assert collect(iter_table_matches(table, "None")) == []
+
+def test_chunks_report_rows_scanned(table):
+    scanned = [scanned for _, _, scanned in iter_table_matches(table, "a", chunk_size=2)]
+    assert scanned == [2, 4, 5]
+
+def test_invalid_regex_raises_value_error(table):
+    with pytest.raises(ValueError):
+        next(iter_table_matches(table, "(", regex=True))
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import TableSorter
+
+
+@pytest.fixture
+def table():
+    return pd.DataFrame({
+        "group": ["b", "a", "b", "a", None],
+        "value": [3, 1, 2, 1, 5],
+        "label": ["first", "second", "third", "fourth", "fifth"]
+    })
+
+def test_permutation_sorts_without_mutating_table(table):
+    original = table.copy()
+    permutation = TableSorter().get_permutation(table, [("value", True)], version=1)
+
+    assert list(table.iloc[permutation]["value"]) == [1, 1, 2, 3, 5]
+    pd.testing.assert_frame_equal(table, original)
+
+def test_ties_keep_original_order(table):
+    permutation = TableSorter().get_permutation(table, [("value", True)])
+    assert list(table.iloc[permutation]["label"][:2]) == ["second", "fourth"]
+
+def test_multi_column_sort_with_missing_values_last(table):
+    permutation = TableSorter().get_permutation(table, [("group", True), ("value", False)])
+    assert list(table.iloc[permutation]["label"]) == ["second", "fourth", "first", "third", "fifth"]
+
+def test_permutation_is_cached_per_version(table):
+    sorter = TableSorter()
+    first = sorter.get_permutation(table, [("value", False)], version=1)
+    assert sorter.get_permutation(table, [("value", False)], version=1) is first
+    assert sorter.get_permutation(table, [("value", False)], version=2) is not first
+
+def test_incomparable_values_raise_type_error():
+    table = pd.DataFrame({"mixed": ["a", 1, [2]]})
+    with pytest.raises(TypeError):
+        TableSorter().get_permutation(table, [("mixed", True)])
@@ -0,0 +1,62 @@
+import threading
+from unittest.mock import MagicMock, patch
+
+import pandas as pd
+import pytest
+from PyQt6.QtCore import QCoreApplication, QEventLoop, QTimer
+
+from services import QueryService
+from services.query_service import QueryCursor
+from viewmodel import DataViewerViewModel
+
+
+@pytest.fixture
+def view_model():
+    app = QCoreApplication.instance() or QCoreApplication([])
+    model = MagicMock()
+    model.get_table_source.return_value = None
+    model.get_changed_rows.return_value = None
+    model.get_database.return_value = {"users": pd.DataFrame({"id": range(2500)})}
+    view_model = DataViewerViewModel(MagicMock(), QueryService(model))
+    yield view_model
+
+    # Let every query thread stop before the next test
+    for query_id in list(view_model._query_workers):
+        view_model.close_query_result(query_id)
+    wait_for(view_model, lambda: not view_model._query_workers)
+    app.processEvents()
+
+
+def wait_for(view_model: DataViewerViewModel, condition, timeout: int = 5000):
+    loop = QEventLoop()
+    timer = QTimer()
+    timer.timeout.connect(lambda: loop.quit() if condition() else None)
+    timer.start(10)
+    QTimer.singleShot(timeout, loop.quit)
+    loop.exec()
+    timer.stop()
+    assert condition()
+
+
+def test_query_rows_are_fetched_off_the_gui_thread(view_model):
+    fetch_threads = []
+    fetch = QueryCursor.fetch
+
+    def record_thread(cursor, size):
+        fetch_threads.append(threading.get_ident())
+        return fetch(cursor, size)
+
+    results, blocks = [], []
+    view_model.query_result_changed.connect(lambda query_id, cursor, block: results.append(block))
+    view_model.query_rows_fetched.connect(lambda query_id, block: blocks.append(block))
+
+    with patch.object(QueryCursor, "fetch", record_thread):
+        query_id = view_model.execute_query("SELECT id FROM users ORDER BY id DESC")
+        wait_for(view_model, lambda: results)
+        view_model.fetch_query_rows(query_id, 1000)
+        wait_for(view_model, lambda: blocks)
+
+    assert results[0]["id"].tolist() == list(range(2499, 1499, -1))
+    assert blocks[0]["id"].tolist() == list(range(1499, 499, -1))
+    assert len(fetch_threads) == 2
+    assert threading.get_ident() not in fetch_threads
@@ -1,7 +1,8 @@
 from .analytics_notifier import AnalyticsNotifier
-from .configuration_enums import Configuration
 from .mpl_canvas import MplCanvas
 from .operation import Operation
 from .security import encrypt_data, decrypt_data, generate_and_store_key, load_key, load_encrypted_db_credentials, \
     delete_saved_db_credentials, save_encrypted_db_credentials
+from .table_filter import TableFilter
+from .table_sorter import TableSorter
 from .transformations import resize_table_view
@@ -0,0 +1,289 @@
+import re
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame, Series
+
+_TOKEN_PATTERN = re.compile(r"""
+    \s*(?:
+        (?P<op>>=|<=|!=|=|>|<)
+        |(?P<paren>[(),])
+        |'(?P<string>(?:[^']|'')*)'
+        |"(?P<identifier>(?:[^"]|"")*)"
+        |(?P<word>[^\s,()=<>!'"]+)
+    )""", re.VERBOSE)
+
+_KEYWORDS = {"AND", "OR", "NOT", "IN", "IS", "NULL", "CONTAINS", "MATCHES"}
+
+
+class FilterPredicate:
+    """A single condition on one column, evaluated to a boolean mask. Missing
+    values never match any predicate other than IS NULL."""
+
+    def __init__(self, column: str, operator: str, value=None):
+        self.column = column
+        self.operator = operator
+        self.value = value
+
+    @property
+    def key(self) -> tuple:
+        value = tuple(self.value) if isinstance(self.value, list) else self.value
+        return self.column, self.operator, value
+
+    def evaluate(self, table: DataFrame) -> np.ndarray:
+        if self.column not in table.columns:
+            raise ValueError(f"The \"{self.column}\" column does not exist.")
+
+        series = table[self.column]
+
+        if self.operator == "IS NULL":
+            return series.isna().to_numpy(dtype=bool)
+        if self.operator == "IS NOT NULL":
+            return series.notna().to_numpy(dtype=bool)
+
+        if self.operator in ("CONTAINS", "MATCHES"):
+            try:
+                result = series.astype(str).str.contains(
+                    self.value,
+                    case=self.operator == "MATCHES",
+                    regex=self.operator == "MATCHES"
+                )
+            except re.error as e:
+                raise ValueError(f"Invalid regular expression \"{self.value}\": {e}")
+            return result.to_numpy(dtype=bool, na_value=False) & series.notna().to_numpy(dtype=bool)
+
+        is_list = self.operator in ("IN", "NOT IN")
+        series, values = coerce_filter_values(series, self.value if is_list else [self.value])
+
+        if self.operator == "IN":
+            result = series.isin(values)
+        elif self.operator == "NOT IN":
+            result = ~series.isin(values)
+        elif self.operator == "=":
+            result = series == values[0]
+        elif self.operator == "!=":
+            result = series != values[0]
+        elif self.operator == ">":
+            result = series > values[0]
+        elif self.operator == ">=":
+            result = series >= values[0]
+        elif self.operator == "<":
+            result = series < values[0]
+        elif self.operator == "<=":
+            result = series <= values[0]
+        else:
+            raise ValueError(f"Unsupported filter operator \"{self.operator}\".")
+
+        return result.to_numpy(dtype=bool, na_value=False) & series.notna().to_numpy(dtype=bool)
+
+
+def coerce_filter_values(series: Series, values: list[str]) -> tuple[Series, list]:
+    """Converts filter literals to the column's type so comparisons are
+    numeric, chronological or boolean where appropriate. Other columns are
+    compared as strings."""
+    try:
+        if pd.api.types.is_bool_dtype(series):
+            return series, [value.lower() == "true" for value in values]
+        if pd.api.types.is_numeric_dtype(series):
+            return series, [float(value) for value in values]
+        if pd.api.types.is_datetime64_any_dtype(series):
+            return series, [pd.Timestamp(value) for value in values]
+    except ValueError:
+        raise ValueError(f"Invalid value for the \"{series.name}\" column: {', '.join(values)}")
+
+    return series.astype(str).where(series.notna()), values
+
+
+def tokenize_filter(expression: str) -> list[tuple[str, str]]:
+    tokens = []
+    position = 0
+    expression = expression.strip()
+
+    while position < len(expression):
+        match = _TOKEN_PATTERN.match(expression, position)
+        if not match or match.end() == position:
+            raise ValueError(f"Invalid filter expression near \"{expression[position:]}\".")
+        position = match.end()
+
+        kind = match.lastgroup
+        text = match.group(kind)
+        if kind == "string":
+            text = text.replace("''", "'")
+        elif kind == "identifier":
+            text = text.replace('""', '"')
+        elif kind == "word" and text.upper() in _KEYWORDS:
+            kind, text = "keyword", text.upper()
+        tokens.append((kind, text))
+
+    return tokens
+
+
+class _FilterParser:
+    """Recursive descent parser for filter expressions. AND binds tighter than
+    OR, and parentheses group conditions."""
+
+    def __init__(self, expression: str):
+        self._tokens = tokenize_filter(expression)
+        self._position = 0
+
+    def parse(self):
+        if not self._tokens:
+            return None
+
+        node = self._parse_or()
+        if self._position < len(self._tokens):
+            raise ValueError(f"Unexpected \"{self._tokens[self._position][1]}\" in filter expression.")
+        return node
+
+    def _peek(self):
+        if self._position < len(self._tokens):
+            return self._tokens[self._position]
+        return None, None
+
+    def _next(self):
+        token = self._peek()
+        if token[0] is None:
+            raise ValueError("Unexpected end of filter expression.")
+        self._position += 1
+        return token
+
+    def _accept(self, kind: str, text: str = None) -> bool:
+        token_kind, token_text = self._peek()
+        if token_kind == kind and (text is None or token_text == text):
+            self._position += 1
+            return True
+        return False
+
+    def _parse_or(self):
+        nodes = [self._parse_and()]
+        while self._accept("keyword", "OR"):
+            nodes.append(self._parse_and())
+        return nodes[0] if len(nodes) == 1 else ("OR", nodes)
+
+    def _parse_and(self):
+        nodes = [self._parse_condition()]
+        while self._accept("keyword", "AND"):
+            nodes.append(self._parse_condition())
+        return nodes[0] if len(nodes) == 1 else ("AND", nodes)
+
+    def _parse_condition(self):
+        if self._accept("paren", "("):
+            node = self._parse_or()
+            if not self._accept("paren", ")"):
+                raise ValueError("Missing closing parenthesis in filter expression.")
+            return node
+
+        kind, column = self._next()
+        if kind not in ("word", "identifier"):
+            raise ValueError(f"Expected a column name but found \"{column}\".")
+
+        kind, operator = self._next()
+        if kind == "op":
+            return FilterPredicate(column, operator, self._parse_value())
+        if operator == "IS":
+            negated = self._accept("keyword", "NOT")
+            if not self._accept("keyword", "NULL"):
+                raise ValueError("Expected NULL after IS in filter expression.")
+            return FilterPredicate(column, "IS NOT NULL" if negated else "IS NULL")
+        if operator == "NOT" and self._accept("keyword", "IN"):
+            return FilterPredicate(column, "NOT IN", self._parse_value_list())
+        if operator == "IN":
+            return FilterPredicate(column, "IN", self._parse_value_list())
+        if operator in ("CONTAINS", "MATCHES"):
+            return FilterPredicate(column, operator, self._parse_value())
+
+        raise ValueError(f"Unknown filter operator \"{operator}\".")
+
+    def _parse_value(self) -> str:
+        kind, value = self._next()
+        if kind not in ("word", "string", "identifier"):
+            raise ValueError(f"Expected a value but found \"{value}\".")
+        return value
+
+    def _parse_value_list(self) -> list[str]:
+        if not self._accept("paren", "("):
+            raise ValueError("Expected a parenthesized list after IN.")
+
+        values = [self._parse_value()]
+        while self._accept("paren", ","):
+            values.append(self._parse_value())
+
+        if not self._accept("paren", ")"):
+            raise ValueError("Missing closing parenthesis after IN list.")
+        return values
+
+
+def parse_filter(expression: str):
+    """Parses a filter expression such as
+    `age >= 18 AND (city IN (Paris, 'New York') OR name CONTAINS smith)`.
+    Supported conditions are =, !=, <, <=, >, >=, IN, NOT IN, CONTAINS
+    (case-insensitive substring), MATCHES (regular expression), IS NULL and
+    IS NOT NULL. Raises
+    ValueError for malformed expressions."""
+    return _FilterParser(expression).parse()
+
+
+class TableFilter:
+    """Evaluates filter expressions to boolean masks. Masks for individual
+    predicates and whole expressions are cached per table version, so
+    re-applying or recombining filters does not rescan the table."""
+
+    def __init__(self, max_cached: int = 64):
+        self._max_cached = max_cached
+        self._cache: OrderedDict[tuple, np.ndarray] = OrderedDict()
+
+    def get_mask(self, table: DataFrame, expression: str, version=None) -> np.ndarray:
+        key = (version, "expression", expression.strip())
+        mask = self._get_cached(key, version)
+
+        if mask is None:
+            node = parse_filter(expression)
+            if node is None:
+                mask = np.ones(table.shape[0], dtype=bool)
+            else:
+                mask = self._evaluate(node, table, version)
+            self._store(key, mask, version)
+
+        return mask
+
+    def get_rows(self, table: DataFrame, expression: str, version=None, row_order: np.ndarray = None) -> np.ndarray:
+        """Returns the positions of matching rows. When a row order such as a
+        sort permutation is given, the positions follow that order."""
+        mask = self.get_mask(table, expression, version)
+
+        if row_order is None:
+            return np.flatnonzero(mask)
+        return row_order[mask[row_order]]
+
+    def clear(self):
+        self._cache.clear()
+
+    def _evaluate(self, node, table: DataFrame, version) -> np.ndarray:
+        if isinstance(node, FilterPredicate):
+            key = (version, "predicate", node.key)
+            mask = self._get_cached(key, version)
+            if mask is None:
+                mask = node.evaluate(table)
+                self._store(key, mask, version)
+            return mask
+
+        operator, children = node
+        masks = [self._evaluate(child, table, version) for child in children]
+
+        if operator == "AND":
+            return np.logical_and.reduce(masks)
+        return np.logical_or.reduce(masks)
+
+    def _get_cached(self, key: tuple, version):
+        if version is None or key not in self._cache:
+            return None
+        self._cache.move_to_end(key)
+        return self._cache[key]
+
+    def _store(self, key: tuple, mask: np.ndarray, version):
+        if version is None:
+            return
+        self._cache[key] = mask
+        if len(self._cache) > self._max_cached:
+            self._cache.popitem(last=False)
@@ -0,0 +1,47 @@
+import re
+from collections.abc import Iterator
+
+import numpy as np
+from pandas import DataFrame
+
+
+def iter_table_matches(
+        table: DataFrame,
+        pattern: str,
+        columns: list[str] = None,
+        regex: bool = False,
+        case_sensitive: bool = False,
+        chunk_size: int = 100_000
+) -> Iterator[tuple[np.ndarray, np.ndarray, int]]:
+    """Scans the table in row chunks for cells whose text contains the
+    pattern. Yields (row positions, column positions, rows scanned) for each
+    chunk, with hits ordered by row and then column. Missing values never
+    match. Raises ValueError for an invalid regular expression."""
+    if regex:
+        try:
+            re.compile(pattern)
+        except re.error as e:
+            raise ValueError(f"Invalid regular expression \"{pattern}\": {e}")
+
+    column_positions = [
+        table.columns.get_loc(column) for column in (columns if columns else table.columns)
+    ]
+
+    for start in range(0, table.shape[0], chunk_size):
+        chunk = table.iloc[start:start + chunk_size]
+        hit_rows = []
+        hit_columns = []
+
+        for position in column_positions:
+            series = chunk.iloc[:, position]
+            matches = series.astype(str).str.contains(pattern, case=case_sensitive, regex=regex)
+            matches = matches.to_numpy(dtype=bool, na_value=False) & series.notna().to_numpy(dtype=bool)
+            rows = np.flatnonzero(matches) + start
+            hit_rows.append(rows)
+            hit_columns.append(np.full(len(rows), position))
+
+        rows = np.concatenate(hit_rows) if hit_rows else np.array([], dtype=int)
+        cols = np.concatenate(hit_columns) if hit_columns else np.array([], dtype=int)
+        order = np.lexsort((cols, rows))
+
+        yield rows[order], cols[order], min(start + chunk_size, table.shape[0])
@@ -0,0 +1,53 @@
+from collections import OrderedDict
+
+import numpy as np
+from pandas import DataFrame
+
+
+class TableSorter:
+    """Computes row permutations that present a table in sorted order without
+    reordering the table itself. Permutations are cached per table version
+    and sort key, so switching back to a previous sort is instant."""
+
+    def __init__(self, max_cached: int = 16):
+        self._max_cached = max_cached
+        self._cache: OrderedDict[tuple, np.ndarray] = OrderedDict()
+
+    def get_permutation(
+            self,
+            table: DataFrame,
+            sort_keys: list[tuple[str, bool]],
+            version=None
+    ) -> np.ndarray:
+        """Returns the positional row order for the table sorted by the given
+        (column, ascending) keys. Ties keep their original relative order and
+        missing values are placed last. Raises TypeError for columns whose
+        values cannot be compared."""
+        key = (version, tuple(sort_keys), table.shape[0])
+
+        if version is not None and key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        columns = [column for column, _ in sort_keys]
+        ascending = [direction for _, direction in sort_keys]
+
+        # Only the key columns are copied, with positions as the index
+        keys = table[columns].reset_index(drop=True)
+        keys.columns = range(len(columns))
+        permutation = keys.sort_values(
+            list(keys.columns),
+            ascending=ascending,
+            kind="stable",
+            na_position="last"
+        ).index.to_numpy()
+
+        if version is not None:
+            self._cache[key] = permutation
+            if len(self._cache) > self._max_cached:
+                self._cache.popitem(last=False)
+
+        return permutation
+
+    def clear(self):
+        self._cache.clear()
@@ -4,9 +4,12 @@ from PyQt6.QtGui import QPixmap, QTransform, QIcon
 from PyQt6.QtWidgets import QTableView, QSizePolicy, QHeaderView
 
 
-def resize_table_view(table_view: QTableView):
+def resize_table_view(table_view: QTableView, fit_height: bool = True):
     # Set size policy and scroll mode
-    table_view.setSizePolicy(QSizePolicy.Policy.Minimum, QSizePolicy.Policy.Fixed)
+    if fit_height:
+        table_view.setSizePolicy(QSizePolicy.Policy.Minimum, QSizePolicy.Policy.Fixed)
+    else:
+        table_view.setSizePolicy(QSizePolicy.Policy.Minimum, QSizePolicy.Policy.Expanding)
     table_view.setHorizontalScrollMode(QTableView.ScrollMode.ScrollPerPixel)
 
     default_column_width = 200
@@ -23,6 +26,10 @@ def resize_table_view(table_view: QTableView):
 
     table_view.setMaximumWidth(total_width)
 
+    # Large tables scroll inside the view instead of growing to fit every row
+    if not fit_height:
+        return
+
     # Fit height to show all rows in preview
     def update_height():
         row_height = table_view.verticalHeader().defaultSectionSize()
@@ -4,11 +4,11 @@ from PyQt6.QtCore import Qt, QDate
 from PyQt6.QtGui import QFont, QIntValidator, QDoubleValidator
 from PyQt6.QtWidgets import QLabel, QWidget, QVBoxLayout, QScrollArea, QSizePolicy, QComboBox, QHBoxLayout, \
     QButtonGroup, QRadioButton, QCheckBox, QPushButton, QProgressBar, QSplitter, QFrame, QStackedWidget, QLineEdit, \
-    QDateEdit, QMessageBox, QFileDialog
+    QDateEdit, QMessageBox, QFileDialog, QDialog, QTableWidget, QTableWidgetItem, QHeaderView
 from pandas import DataFrame
 
+from core import Configuration
 from navigation import NavigationController
-from utils import Configuration
 from view import AbstractView
 from viewmodel import AutoCleanViewModel
 
@@ -48,6 +48,22 @@ class AutoCleanView(AbstractView):
         self.run_button.setFont(QFont(self.font, 12))
         self.run_button.setEnabled(False)
         self.run_button.clicked.connect(self._view_model.run_current_config)
+        self.plan_button = QPushButton("Show Cleaning Plan")
+        self.plan_button.setFont(QFont(self.font, 10))
+        self.plan_button.setEnabled(False)
+        self.plan_button.clicked.connect(self._view_model.preview_cleaning_plan)
+        self.clean_file_button = QPushButton("Clean File...")
+        self.clean_file_button.setFont(QFont(self.font, 10))
+        self.clean_file_button.setEnabled(False)
+        self.clean_file_button.clicked.connect(self.on_clean_file)
+        self.batch_button = QPushButton("Clean All Tables")
+        self.batch_button.setFont(QFont(self.font, 10))
+        self.batch_button.setEnabled(False)
+        self.batch_button.clicked.connect(lambda: self._view_model.run_batch())
+        self.batch_dialog = None
+        self.batch_table = None
+        self.batch_summary_label = None
+        self._batch_rows: dict[str, int] = {}
         self.progress_bar_label = QLabel("Waiting to run...")
         self.progress_bar_label.setFont(QFont(self.font, 10))
         self.progress_bar = QProgressBar()
@@ -60,6 +76,9 @@ class AutoCleanView(AbstractView):
         self.run_container.setLayout(QVBoxLayout())
         self.run_container.layout().addWidget(configuration_scroll_area)
         self.run_container.layout().addWidget(self.run_button)
+        self.run_container.layout().addWidget(self.plan_button)
+        self.run_container.layout().addWidget(self.clean_file_button)
+        self.run_container.layout().addWidget(self.batch_button)
         self.run_container.layout().addWidget(self.progress_bar_label)
         self.run_container.layout().addWidget(self.progress_bar)
 
@@ -119,6 +138,10 @@ class AutoCleanView(AbstractView):
         self.load_script_button = QPushButton("Load Cleaning Script")
         self.load_script_button.setFont(QFont(self.font, 14))
         self.load_script_button.clicked.connect(self.on_load_script)
+        self.replay_config_button = QPushButton("Replay Saved Configuration")
+        self.replay_config_button.setFont(QFont(self.font, 14))
+        self.replay_config_button.setEnabled(False)
+        self.replay_config_button.clicked.connect(self.on_replay_config)
 
         self.header_group = QWidget()
         self.header_group.setLayout(QHBoxLayout())
@@ -126,6 +149,7 @@ class AutoCleanView(AbstractView):
         self.header_group.layout().addStretch()
         self.header_group.layout().addWidget(self.script_export_button)
         self.header_group.layout().addWidget(self.load_script_button)
+        self.header_group.layout().addWidget(self.replay_config_button)
 
         # Table selection
         self.table_select_label = QLabel("Select a table for auto-cleaning: ")
@@ -344,6 +368,14 @@ class AutoCleanView(AbstractView):
         self._view_model.current_step_changed.connect(self.update_step)
         self._view_model.cleaning_stats_updated.connect(self.update_stats)
         self._view_model.script_finished.connect(self.update_script_message_box)
+        self._view_model.script_error.connect(self.show_script_error)
+        self._view_model.cleaning_plan_changed.connect(self.show_cleaning_plan_dialog)
+        self._view_model.file_cleaning_progress.connect(self.update_file_cleaning_progress)
+        self._view_model.file_cleaning_finished.connect(self.on_file_cleaning_finished)
+        self._view_model.batch_started.connect(self.show_batch_dialog)
+        self._view_model.batch_table_progress.connect(self.update_batch_progress)
+        self._view_model.batch_table_finished.connect(self.update_batch_table)
+        self._view_model.batch_finished.connect(self.show_batch_summary)
 
         # Connect navigation controller to UI
         self._nav_controller.nav_destination_changed.connect(self.update_nav_bar)
@@ -358,8 +390,16 @@ class AutoCleanView(AbstractView):
         if tables:
             self.table_select.addItems(tables.keys())
             self.run_button.setEnabled(True)
+            self.plan_button.setEnabled(True)
+            self.clean_file_button.setEnabled(True)
+            self.batch_button.setEnabled(True)
+            self.replay_config_button.setEnabled(True)
         else:
             self.run_button.setEnabled(False)
+            self.plan_button.setEnabled(False)
+            self.clean_file_button.setEnabled(False)
+            self.batch_button.setEnabled(False)
+            self.replay_config_button.setEnabled(False)
 
         self.table_select.updateGeometry()
 
@@ -603,11 +643,48 @@ class AutoCleanView(AbstractView):
             self.show_script_message_box()
             self._view_model.run_script_from_file(script[0])
 
+    def on_clean_file(self):
+        """Asks for a CSV or Parquet file and where to save it, then cleans it
+        with the current configuration without loading it into the database."""
+        file_filter = "Data Files (*.csv *.parquet *.pq)"
+        source = QFileDialog.getOpenFileName(self, "Select File to Clean", ".", file_filter)[0]
+        if not source:
+            return
+
+        destination = QFileDialog.getSaveFileName(self, "Save Cleaned File", source, file_filter)[0]
+        if destination:
+            self._view_model.clean_file(source, destination)
+
+    def update_file_cleaning_progress(self, cleaning_pass: int, rows_read: int):
+        if cleaning_pass == 1:
+            self.progress_bar_label.setText(f"Gathering column statistics: {rows_read:,} rows read")
+        else:
+            self.progress_bar_label.setText(f"Cleaning file: {rows_read:,} rows read")
+
+    def on_file_cleaning_finished(self, success: bool, stats: dict):
+        self.progress_bar_label.setText("Waiting to run...")
+        if success and stats:
+            self.update_stats(stats)
+            QMessageBox.information(
+                self,
+                "File Cleaned",
+                f"Wrote {stats['rows_written']:,} of {stats['rows_read']:,} rows to the cleaned file."
+            )
+
+    def on_replay_config(self):
+        config_path = QFileDialog.getOpenFileName(self, "Select Configuration File", ".", "Configuration (*.json)")[0]
+
+        if config_path:
+            self._view_model.replay_config_file(config_path)
+
     def update_running(self, running: bool):
         if running:
             self.reset_stats()
         self.cleaning_running = running
         self.run_button.setEnabled(not running)
+        self.clean_file_button.setEnabled(not running)
+        self.batch_button.setEnabled(not running)
+        self.replay_config_button.setEnabled(not running)
 
     def update_progress(self, progress: float):
         self.progress_bar.setValue(progress)
@@ -639,6 +716,110 @@ class AutoCleanView(AbstractView):
         error_dialog.setIcon(QMessageBox.Icon.Warning)
         error_dialog.exec()
 
+    def show_cleaning_plan_dialog(self, plan: dict):
+        """Shows the order the cleaning steps will run in, with the estimated
+        number of rows left after each one and any notes on the reordering."""
+        dialog = QDialog(self)
+        dialog.setWindowTitle("Cleaning Plan")
+        dialog.setLayout(QVBoxLayout())
+        dialog.setMinimumWidth(700)
+
+        summary = QLabel(f"{len(plan['steps'])} steps on {plan['table_rows']} rows, in execution order:")
+        summary.setFont(QFont(self.font, 10))
+        dialog.layout().addWidget(summary)
+
+        estimates = plan["estimated_rows"] or [None] * len(plan["steps"])
+        steps_table = QTableWidget(len(plan["steps"]), 3)
+        steps_table.setHorizontalHeaderLabels(["Step", "Configured Position", "Estimated Rows After"])
+        steps_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        for row, (step, position, rows) in enumerate(zip(plan["steps"], plan["positions"], estimates)):
+            steps_table.setItem(row, 0, QTableWidgetItem(step))
+            steps_table.setItem(row, 1, QTableWidgetItem(str(position)))
+            steps_table.setItem(row, 2, QTableWidgetItem(f"{rows:,}" if rows is not None else "-"))
+        steps_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        dialog.layout().addWidget(steps_table)
+
+        for flag in plan["flags"]:
+            flag_label = QLabel(flag)
+            flag_label.setWordWrap(True)
+            flag_label.setFont(QFont(self.font, 10))
+            dialog.layout().addWidget(flag_label)
+
+        close_button = QPushButton("Close")
+        close_button.clicked.connect(dialog.accept)
+        dialog.layout().addWidget(close_button)
+        dialog.exec()
+
+    def show_batch_dialog(self, table_names: list):
+        """Shows a window with the progress of each table in a batch run,
+        filled in as the tables are cleaned."""
+        self.batch_dialog = QDialog(self)
+        self.batch_dialog.setWindowTitle("Cleaning All Tables")
+        self.batch_dialog.setLayout(QVBoxLayout())
+        self.batch_dialog.setMinimumWidth(700)
+
+        self.batch_table = QTableWidget(len(table_names), 4)
+        self.batch_table.setHorizontalHeaderLabels(["Table", "Progress", "Rows", "Status"])
+        self.batch_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self._batch_rows = {}
+        for row, table_name in enumerate(table_names):
+            self._batch_rows[table_name] = row
+            self.batch_table.setItem(row, 0, QTableWidgetItem(table_name))
+            progress_bar = QProgressBar()
+            progress_bar.setRange(0, 100)
+            progress_bar.setValue(0)
+            self.batch_table.setCellWidget(row, 1, progress_bar)
+            self.batch_table.setItem(row, 2, QTableWidgetItem("-"))
+            self.batch_table.setItem(row, 3, QTableWidgetItem("Waiting..."))
+        self.batch_table.horizontalHeader().setSectionResizeMode(3, QHeaderView.ResizeMode.Stretch)
+        self.batch_dialog.layout().addWidget(self.batch_table)
+
+        self.batch_summary_label = QLabel("Cleaning tables...")
+        self.batch_summary_label.setWordWrap(True)
+        self.batch_summary_label.setFont(QFont(self.font, 10))
+        self.batch_dialog.layout().addWidget(self.batch_summary_label)
+
+        close_button = QPushButton("Close")
+        close_button.clicked.connect(self.batch_dialog.accept)
+        self.batch_dialog.layout().addWidget(close_button)
+        self.batch_dialog.show()
+
+    def update_batch_progress(self, table_name: str, progress: int):
+        if self.batch_table is None or table_name not in self._batch_rows:
+            return
+        row = self._batch_rows[table_name]
+        self.batch_table.cellWidget(row, 1).setValue(progress)
+        self.batch_table.item(row, 3).setText("Cleaning...")
+
+    def update_batch_table(self, table_name: str, result: dict):
+        if self.batch_table is None or table_name not in self._batch_rows:
+            return
+        row = self._batch_rows[table_name]
+        if result["error"] is None:
+            self.batch_table.cellWidget(row, 1).setValue(100)
+            self.batch_table.item(row, 2).setText(f"{result['rows_before']:,} -> {result['rows_after']:,}")
+            self.batch_table.item(row, 3).setText(f"Done, {result['operations']:,} modifications")
+        else:
+            self.batch_table.item(row, 3).setText(f"Failed: {result['error']}")
+
+    def show_batch_summary(self, summary: dict):
+        if summary:
+            self.update_stats(summary)
+        if self.batch_summary_label is None:
+            return
+        if not summary:
+            self.batch_summary_label.setText("Batch cleaning did not complete.")
+            return
+
+        text = (
+            f"Cleaned {len(summary['cleaned'])} of {summary['tables']} tables: "
+            f"{summary['rows_before']:,} rows reduced to {summary['rows_after']:,}, "
+            f"{summary['operations']:,} modifications in total."
+        )
+        if summary["failed"]:
+            text += f" Failed: {', '.join(summary['failed'])}."
+        self.batch_summary_label.setText(text)
+
     def show_script_message_box(self):
         """Show a message box for script running."""
         self.script_message_box = QMessageBox()
@@ -654,13 +835,18 @@ class AutoCleanView(AbstractView):
         if self.script_message_box:
             if success:
                 self.script_message_box.setText("Script execution successful.")
-                self.script_message_box.setInformativeText("Output saved to desktop.")
+                self.script_message_box.setInformativeText("The cleaned table has been updated.")
             else:
+                # The reason is shown by show_script_error, which runs first
                 self.script_message_box.setIcon(QMessageBox.Icon.Critical)
                 self.script_message_box.setText("Script execution failed.")
-                self.script_message_box.setInformativeText("Ensure you are loading a script file generated by this application.")
             self.script_message_box.button(QMessageBox.StandardButton.Ok).setEnabled(True)
 
+    def show_script_error(self, error: str):
+        """Show why the script could not be run in the script message box."""
+        if self.script_message_box:
+            self.script_message_box.setInformativeText(error)
+
     def append_constraints_widget(self, container: QWidget, label_text: str, validator = None) -> QLineEdit:
         """Creates and appends a cleaning constraints label and input selector
         to the provided container. Returns the input widget for code access to
@@ -1,14 +1,18 @@
+import re
+
+import numpy as np
 import pandas as pd
 from PyQt6 import QtCore, QtGui
-from PyQt6.QtCore import QModelIndex, QSize, QTimer, Qt
+from PyQt6.QtCore import QSize, QTimer, Qt
 from PyQt6.QtGui import QFont
 from PyQt6.QtWidgets import QVBoxLayout, QWidget, QSizePolicy, QLabel, QComboBox, QHBoxLayout, QTableView, QScrollArea, \
-    QSplitter, QTextEdit, QPushButton, QLineEdit, QDialog, QMessageBox
+    QSplitter, QTextEdit, QPushButton, QLineEdit, QDialog, QMessageBox, QHeaderView, QAbstractItemView, QApplication, \
+    QCheckBox, QFileDialog, QListWidget, QListWidgetItem
 from pandas import DataFrame
 
-from model import DataFrameModel
+from model import DataFrameModel, QueryResultModel
 from navigation import NavigationController
-from utils import resize_table_view
+from utils import resize_table_view, TableSorter, TableFilter
 from utils.transformations import load_flipped_inverted_icon
 from view import AbstractView
 from viewmodel import DataViewerViewModel
@@ -20,6 +24,25 @@ def update_button_enabled(button: QPushButton, enabled: bool):
     button.update()
     QTimer.singleShot(0, lambda: button.setEnabled(enabled))
 
+def format_query_profile(profile: dict) -> str:
+    if profile["cached"]:
+        return "Served from the result cache"
+
+    if profile["route"] == "source database":
+        route = "Ran on the source database  |  "
+    elif profile["pushdown_error"]:
+        route = f"Ran locally after the source database failed: {profile['pushdown_error']}\n"
+    else:
+        route = ""
+
+    synced = ", ".join(profile["synced_tables"]) or "none"
+    return route + (
+        f"Sync: {profile['sync_seconds']:.3f} s (tables copied: {synced})  |  "
+        f"Planning: {profile['planning_seconds']:.3f} s  |  "
+        f"Execution: {profile['execution_seconds']:.3f} s  |  "
+        f"Conversion: {profile['conversion_seconds']:.3f} s"
+    )
+
 class DataTableView(AbstractView):
     @property
     def view_model(self):
@@ -41,16 +64,23 @@ class DataTableView(AbstractView):
         self._nav_button_group = None
         self.table_name = None
         self.table: DataFrame = pd.DataFrame()
-        self.table_page: DataFrame = pd.DataFrame()
+        self.table_version = None
         self.table_view = None
         self.table_model = None
-        self.table_filtered: DataFrame = pd.DataFrame()
-        self.filtered = False
+        self.filter_expression: str = ""
+        self.table_filter = TableFilter()
+        self.sorter = TableSorter()
+        self.sort_keys: list[tuple[str, bool]] = []
+        self.find_hit_chunks: list[tuple[np.ndarray, np.ndarray]] = []
+        self.find_hits = None
+        self.find_position: int = -1
 
         self.page: int = 1
         self.page_size: int = 50
         self.editing: bool = False
-        self.query_result: DataFrame = pd.DataFrame()
+        self.query_result = None
+        self.running_queries: dict[int, tuple[QWidget, QLabel, str]] = {}
+        self.result_dialogs: dict[int, tuple[QDialog, QLabel, QueryResultModel, QLabel]] = {}
 
         # Set up scroll area for table view with container
         self.table_container = QWidget()
@@ -126,16 +156,66 @@ class DataTableView(AbstractView):
         self.filter_label = QLabel("Filter by:")
         self.filter_dropdown = QComboBox()
         self.filter_dropdown.currentIndexChanged.connect(lambda: self.filter_results(*self.get_filter()))
+        self.filter_expression_edit = QLineEdit()
+        self.filter_expression_edit.setPlaceholderText("e.g. age >= 18 AND city IN (Paris, Rome)")
+        self.filter_expression_edit.setMinimumWidth(300)
+        self.filter_expression_edit.returnPressed.connect(
+            lambda: self.apply_filter(self.filter_expression_edit.text())
+        )
         self.filter_box.addWidget(self.filter_label)
         self.filter_box.addWidget(self.filter_dropdown)
+        self.filter_box.addWidget(self.filter_expression_edit)
 
-        for widget in [self.sort_label, self.sort_dropdown, self.filter_label, self.filter_dropdown]:
+        for widget in [
+            self.sort_label,
+            self.sort_dropdown,
+            self.filter_label,
+            self.filter_dropdown,
+            self.filter_expression_edit
+        ]:
             widget.setSizePolicy(QSizePolicy.Policy.Preferred, QSizePolicy.Policy.Fixed)
             widget.setFont(QFont(self.font, 10))
 
         self.button_row.addLayout(self.sort_box)
         self.button_row.addLayout(self.filter_box)
 
+        # Find bar
+        self.find_row = QHBoxLayout()
+        self.find_label = QLabel("Find:")
+        self.find_edit = QLineEdit()
+        self.find_edit.setPlaceholderText("Text or regular expression")
+        self.find_edit.returnPressed.connect(self.on_find_clicked)
+        self.find_column_select = QComboBox()
+        self.find_column_select.addItem("All columns")
+        self.find_regex_checkbox = QCheckBox("Regex")
+        self.find_button = QPushButton("Find")
+        self.find_button.clicked.connect(self.on_find_clicked)
+        self.find_prev_button = QPushButton("Previous")
+        self.find_prev_button.clicked.connect(lambda: self.goto_find_hit(-1))
+        self.find_next_button = QPushButton("Next")
+        self.find_next_button.clicked.connect(lambda: self.goto_find_hit(1))
+        self.find_stop_button = QPushButton("Stop")
+        self.find_stop_button.setEnabled(False)
+        self.find_stop_button.clicked.connect(self._view_model.cancel_find)
+        self.find_status_label = QLabel("")
+
+        for widget in [
+            self.find_label,
+            self.find_edit,
+            self.find_column_select,
+            self.find_regex_checkbox,
+            self.find_button,
+            self.find_prev_button,
+            self.find_next_button,
+            self.find_stop_button,
+            self.find_status_label
+        ]:
+            widget.setSizePolicy(QSizePolicy.Policy.Preferred, QSizePolicy.Policy.Fixed)
+            widget.setFont(QFont(self.font, 10))
+            self.find_row.addWidget(widget)
+
+        self.find_row.addStretch()
+
         # Set up stats and query section
         self.stats_box = QWidget()
         self.stats_box.setLayout(QVBoxLayout())
@@ -150,9 +230,33 @@ class DataTableView(AbstractView):
         self.query_window.setSizePolicy(QSizePolicy.Policy.Preferred, QSizePolicy.Policy.Fixed)
         self.query_text_edit = QTextEdit()
         self.execute_button = QPushButton("Execute Query")
-        self.execute_button.clicked.connect(lambda: self._view_model.execute_query(self.query_text_edit.toPlainText()))
+        self.execute_button.clicked.connect(
+            lambda: self._view_model.execute_query(self.query_text_edit.toPlainText(), self.explain_checkbox.isChecked())
+        )
+        self.explain_checkbox = QCheckBox("Explain plan")
+        self.pushdown_checkbox = QCheckBox("Use source database")
+        self.pushdown_checkbox.setToolTip(
+            "Run queries on unmodified tables loaded from a database on the database server"
+        )
+        self.pushdown_checkbox.setChecked(True)
+        self.pushdown_checkbox.toggled.connect(self._view_model.set_pushdown_enabled)
+        self.query_log_button = QPushButton("Query Log")
+        self.query_log_button.clicked.connect(self.show_query_log_dialog)
+        self.indexes_button = QPushButton("Indexes")
+        self.indexes_button.clicked.connect(self.show_indexes_dialog)
+        self.indexes_dialog = None
+        query_button_row = QHBoxLayout()
+        query_button_row.addWidget(self.execute_button, stretch=1)
+        query_button_row.addWidget(self.explain_checkbox)
+        query_button_row.addWidget(self.pushdown_checkbox)
+        query_button_row.addWidget(self.query_log_button)
+        query_button_row.addWidget(self.indexes_button)
+        self.running_queries_box = QWidget()
+        self.running_queries_box.setLayout(QVBoxLayout())
+        self.running_queries_box.layout().setContentsMargins(0, 0, 0, 0)
         self.query_window.layout().addWidget(self.query_text_edit)
-        self.query_window.layout().addWidget(self.execute_button)
+        self.query_window.layout().addLayout(query_button_row)
+        self.query_window.layout().addWidget(self.running_queries_box)
 
         right_panel = QSplitter(QtCore.Qt.Orientation.Vertical)
         right_panel.addWidget(self.query_window)
@@ -178,6 +282,7 @@ class DataTableView(AbstractView):
         self.data_table_layout = QVBoxLayout()
         self.data_table_layout.addWidget(self._nav_bar)
         self.data_table_layout.addLayout(self.button_row)
+        self.data_table_layout.addLayout(self.find_row)
         self.data_table_layout.addWidget(self.horizontal_splitter)
 
         # ----------------------------------------------------------------------
@@ -192,18 +297,44 @@ class DataTableView(AbstractView):
         self._view_model.data_changed.connect(self.update_table)
         self._view_model.data_changed.connect(self.populate_stats)
         self._view_model.is_editing_changed.connect(self.update_editing)
+        self._view_model.query_started.connect(self.add_running_query)
+        self._view_model.query_elapsed_changed.connect(self.update_query_elapsed)
+        self._view_model.query_finished.connect(self.remove_running_query)
         self._view_model.query_result_changed.connect(self.update_query_result)
+        self._view_model.query_rows_fetched.connect(self.add_query_result_rows)
+        self._view_model.export_progress.connect(self.update_export_progress)
+        self._view_model.export_finished.connect(self.show_export_finished_message)
+        self._view_model.export_error.connect(self.show_export_error_message)
+        self._view_model.indexes_changed.connect(self.update_indexes_list)
+        self._view_model.index_error.connect(self.show_index_error_message)
         self._view_model.query_error_changed.connect(self.show_query_error_message)
         self._view_model.undo_available_changed.connect(lambda enabled: update_button_enabled(self.undo_button, enabled))
         self._view_model.redo_available_changed.connect(lambda enabled: update_button_enabled(self.redo_button, enabled))
+        self._view_model.find_hits_found.connect(self.add_find_hits)
+        self._view_model.find_progress.connect(self.update_find_status)
+        self._view_model.find_finished.connect(self.on_find_finished)
+        self._view_model.find_error.connect(self.show_find_error_message)
+        self._view_model.find_restarted.connect(self.reset_find_hits)
 
         # Connect navigation controller to UI
         self._nav_controller.nav_destination_changed.connect(self.update_nav_bar)
 
     @QtCore.pyqtSlot(dict)
     def update_table(self, table: dict):
+        same_table = (
+            self.table_view is not None
+            and self.table_name == table["table_name"]
+            and self.table.columns.equals(table["data"].columns)
+        )
         self.table_name = table["table_name"]
         self.table = table["data"]
+        self.table_version = table.get("version")
+
+        # Refresh the existing model in place to keep scroll position and selection
+        if same_table:
+            self.table_model.update_dataframe(self.table, self.get_row_order())
+            self.update_page_limit()
+            return
 
         # Clear existing table from layout
         layout = self.table_container.layout()
@@ -212,18 +343,35 @@ class DataTableView(AbstractView):
             if widget:
                 widget.deleteLater()
 
-        # Add the QTableView for the DataFrame
+        # Add the QTableView for the full DataFrame; rows are formatted lazily as they scroll into view
+        self.filter_expression = ""
+        self.filter_expression_edit.clear()
+        self.table_filter.clear()
+        self.sort_keys = []
+        self.sorter.clear()
+        self._view_model.cancel_find()
+        self.reset_find_hits()
         self.table_view = QTableView()
         self.table_view.setSelectionMode(QTableView.SelectionMode.SingleSelection)
         self.table_view.setSelectionBehavior(QTableView.SelectionBehavior.SelectItems)
+        self.table_view.setVerticalScrollMode(QAbstractItemView.ScrollMode.ScrollPerItem)
+        self.table_view.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.table_model = DataFrameModel(self.table)
+        self.table_model.update_editing(self.editing)
+        self.table_model.row_edited.connect(self.handle_row_edited)
+        self.table_view.setModel(self.table_model)
+        self.table_view.verticalScrollBar().valueChanged.connect(self.update_page_number)
+        self.table_view.horizontalHeader().sectionClicked.connect(self.on_header_clicked)
         self.update_page_size(self.page_size)
-        self.update_table_page()
 
         # Populate sorting/filtering dropdowns
         self.sort_dropdown.clear()
         self.sort_dropdown.addItem("None")
         self.filter_dropdown.clear()
         self.filter_dropdown.addItem("None")
+        self.find_column_select.clear()
+        self.find_column_select.addItem("All columns")
+        self.find_column_select.addItems([str(column) for column in self.table.columns])
 
         for column in self.table.columns:
             self.sort_dropdown.addItem(f"{column} (ascending)")
@@ -238,7 +386,7 @@ class DataTableView(AbstractView):
                     self.filter_dropdown.addItem(f"{column} ({category})")
 
         # Update table sizing
-        resize_table_view(self.table_view)
+        resize_table_view(self.table_view, fit_height=False)
 
         layout.addWidget(self.table_view)
 
@@ -297,42 +445,41 @@ class DataTableView(AbstractView):
         if layout.count():
             widget = layout.itemAt(0).widget()
             if isinstance(widget, QTableView):
-                resize_table_view(widget)
+                resize_table_view(widget, fit_height=False)
 
-    def get_page_dataframe(self):
-        # Check for filtering
-        df = self.table_filtered if self.filtered else self.table
+    def get_page_count(self) -> int:
+        return self.table_model.rowCount() // self.page_size + 1
 
-        start_index = (self.page - 1) * self.page_size
-        end_index = min(self.page * self.page_size, len(df))
-        return df.iloc[start_index:end_index]
+    def update_page(self, page: int):
+        """Scroll the table so the first row of the given page is at the top."""
+        self.page = max(1, min(page, self.get_page_count()))
+        self.page_number.setText(str(self.page))
 
-    def update_table_page(self):
-        self.table_page = self.get_page_dataframe()
-        self.table_model = DataFrameModel(self.table_page)
-        self.table_model.update_editing(self.editing)
-        self.table_model.dataChanged.connect(self.handle_data_changed)
-        self.table_view.setModel(None) # Detach old model
-        self.table_view.setModel(self.table_model)
+        if self.table_model.rowCount():
+            first_row = self.table_model.index((self.page - 1) * self.page_size, 0)
+            self.table_view.scrollTo(first_row, QAbstractItemView.ScrollHint.PositionAtTop)
 
-    def update_page(self, page: int):
-        self.page = page
+    def update_page_number(self):
+        """Track the page containing the top visible row as the user scrolls."""
+        top_row = max(self.table_view.rowAt(0), 0)
+        self.page = top_row // self.page_size + 1
         self.page_number.setText(str(self.page))
-        self.update_table_page()
-        self.redraw_table()
 
     def on_prev_page_button_clicked(self):
         if self.page > 1:
             self.update_page(self.page - 1)
 
     def on_next_page_button_clicked(self):
-        if self.page * self.page_size < len(self.table):
+        if self.page * self.page_size < self.table_model.rowCount():
             self.update_page(self.page + 1)
 
+    def update_page_limit(self):
+        self.page_number.setValidator(QtGui.QIntValidator(1, self.get_page_count()))
+        self.page_limit.setText(f"/{self.get_page_count()}")
+
     def update_page_size(self, page_size: int):
         self.page_size = page_size
-        self.page_number.setValidator(QtGui.QIntValidator(1, len(self.table) // self.page_size + 1))
-        self.page_limit.setText(f"/{len(self.table) // self.page_size + 1}")
+        self.update_page_limit()
 
         # Reset page
         self.update_page(self.page)
@@ -349,20 +496,220 @@ class DataTableView(AbstractView):
             self.edit_toggle_button.setText("Enter Edit Mode")
             self.edit_toggle_button.setChecked(False)
 
-    def update_query_result(self, query_result: DataFrame):
+    def add_running_query(self, query_id: int, query: str):
+        summary = " ".join(query.split())
+        if len(summary) > 40:
+            summary = summary[:37] + "..."
+
+        row = QWidget()
+        row.setLayout(QHBoxLayout())
+        row.layout().setContentsMargins(0, 0, 0, 0)
+        label = QLabel(f"#{query_id} {summary} (0.0 s)")
+        label.setToolTip(query)
+        cancel_button = QPushButton("Cancel")
+        cancel_button.clicked.connect(lambda: self._view_model.cancel_query(query_id))
+        cancel_button.clicked.connect(lambda: cancel_button.setEnabled(False))
+        row.layout().addWidget(label, stretch=1)
+        row.layout().addWidget(cancel_button)
+
+        self.running_queries_box.layout().addWidget(row)
+        self.running_queries[query_id] = (row, label, summary)
+
+    def update_query_elapsed(self, query_id: int, elapsed: float):
+        if query_id in self.running_queries:
+            _, label, summary = self.running_queries[query_id]
+            label.setText(f"#{query_id} {summary} ({elapsed:.1f} s)")
+
+    def remove_running_query(self, query_id: int, success: bool):
+        row, _, _ = self.running_queries.pop(query_id, (None, None, None))
+        if row:
+            self.running_queries_box.layout().removeWidget(row)
+            row.deleteLater()
+
+        # Running a query may have closed the cursors of other open results
+        for result_id in self.result_dialogs:
+            self.update_query_result_status(result_id)
+
+    def update_query_result(self, query_id: int, query_result, first_block: DataFrame):
         self.query_result = query_result
-        self.show_query_result_dialog()
-
-    def show_query_result_dialog(self):
-        result_dialog = QDialog()
-        result_dialog.setWindowTitle("Query Result")
+        self.show_query_result_dialog(query_id, first_block)
+
+    def show_query_result_dialog(self, query_id: int, first_block: DataFrame):
+        """Shows a query result in a non-modal dialog, so several results can
+        stay open while other queries run. Further rows are fetched from the
+        result cursor on the query's worker thread as the table is
+        scrolled."""
+        result_dialog = QDialog(self)
+        result_dialog.setWindowTitle(f"Query Result #{query_id}")
         result_dialog.setLayout(QVBoxLayout())
         result_dialog.setFixedSize(1000, 600)
+        result_dialog.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
         result_dialog_table_view = QTableView()
-        result_dialog_model = DataFrameModel(self.query_result)
+        result_dialog_model = QueryResultModel(self.query_result, first_block)
+        result_dialog_model.fetch_requested.connect(lambda size: self._view_model.fetch_query_rows(query_id, size))
         result_dialog_table_view.setModel(result_dialog_model)
         result_dialog.layout().addWidget(result_dialog_table_view)
-        result_dialog.exec()
+
+        status_row = QHBoxLayout()
+        status_label = QLabel()
+        export_button = QPushButton("Export Full Result")
+        export_button.clicked.connect(lambda: self.open_query_export_dialog(query_id))
+        status_row.addWidget(status_label, stretch=1)
+        status_row.addWidget(export_button)
+        result_dialog.layout().addLayout(status_row)
+
+        # Query profile, with the plan if one was requested
+        profile_label = QLabel()
+        result_dialog.layout().addWidget(profile_label)
+        plan = self.query_result.profile["plan"]
+        if plan:
+            plan_text_edit = QTextEdit()
+            plan_text_edit.setReadOnly(True)
+            plan_text_edit.setPlainText("\n".join(plan))
+            plan_text_edit.setFixedHeight(100)
+            result_dialog.layout().addWidget(plan_text_edit)
+
+        self.result_dialogs[query_id] = (result_dialog, status_label, result_dialog_model, profile_label)
+        result_dialog_model.rows_fetched.connect(lambda _: self.update_query_result_status(query_id))
+        result_dialog.finished.connect(lambda: self.close_query_result_dialog(query_id))
+        self.update_query_result_status(query_id)
+        result_dialog.show()
+
+    def add_query_result_rows(self, query_id: int, block: DataFrame):
+        if query_id in self.result_dialogs:
+            self.result_dialogs[query_id][2].append_block(block)
+
+    def update_query_result_status(self, query_id: int):
+        if query_id not in self.result_dialogs:
+            return
+
+        _, status_label, result_model, profile_label = self.result_dialogs[query_id]
+        cursor = result_model.get_cursor()
+        profile_label.setText(format_query_profile(cursor.profile))
+        row_count = cursor.row_count
+        loaded = result_model.rowCount()
+
+        if row_count is None:
+            text = f"{loaded:,} rows loaded, scroll down to load more"
+        elif loaded < row_count:
+            text = f"{loaded:,} of {row_count:,} rows loaded"
+        else:
+            text = f"{row_count:,} rows"
+        if cursor.stale:
+            text += " (loading stopped because a table in the query changed)"
+
+        status_label.setText(text)
+
+    def close_query_result_dialog(self, query_id: int):
+        self.result_dialogs.pop(query_id, None)
+        self._view_model.close_query_result(query_id)
+
+    def open_query_export_dialog(self, query_id: int):
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Export Query Result", f"query_result_{query_id}.csv", "CSV Files (*.csv)"
+        )
+
+        if path:
+            self._view_model.export_query_result(query_id, path)
+
+    def show_query_log_dialog(self):
+        log_dialog = QDialog(self)
+        log_dialog.setWindowTitle("Query Log")
+        log_dialog.setLayout(QVBoxLayout())
+        log_dialog.setFixedSize(1000, 400)
+        log_dialog.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+
+        columns = ["query", "route", "cached", "synced_tables", "sync_seconds", "planning_seconds", "execution_seconds",
+                   "conversion_seconds", "rows"]
+        log = pd.DataFrame(self._view_model.get_query_log(), columns=columns + ["started"])
+        log.insert(0, "started_at", pd.to_datetime(log.pop("started"), unit="s"))
+        log["synced_tables"] = log["synced_tables"].map(", ".join)
+
+        log_table_view = QTableView()
+        log_table_view.setModel(DataFrameModel(log, float_precision=4))
+        log_dialog.layout().addWidget(log_table_view)
+        log_dialog.show()
+
+    def show_indexes_dialog(self):
+        """Shows the SQL indexes declared on loaded tables, with controls to
+        index columns of the current table and to drop indexes."""
+        if self.indexes_dialog is not None:
+            self.indexes_dialog.raise_()
+            return
+
+        self.indexes_dialog = QDialog(self)
+        self.indexes_dialog.setWindowTitle("Query Indexes")
+        self.indexes_dialog.setLayout(QVBoxLayout())
+        self.indexes_dialog.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+        self.indexes_dialog.finished.connect(self.close_indexes_dialog)
+
+        self.indexes_dialog.layout().addWidget(QLabel(f"Columns of {self.table_name} to index together:"))
+        self.index_columns_list = QListWidget()
+        self.index_columns_list.setSelectionMode(QAbstractItemView.SelectionMode.MultiSelection)
+        self.index_columns_list.addItems([str(column) for column in self.table.columns])
+        create_index_button = QPushButton("Create Index")
+        create_index_button.clicked.connect(lambda: self._view_model.create_index(
+            self.table_name, [item.text() for item in self.index_columns_list.selectedItems()]
+        ))
+        self.indexes_dialog.layout().addWidget(self.index_columns_list)
+        self.indexes_dialog.layout().addWidget(create_index_button)
+
+        self.indexes_dialog.layout().addWidget(QLabel("Declared indexes (built when a query next reads the table):"))
+        self.indexes_list = QListWidget()
+        drop_index_button = QPushButton("Drop Index")
+        drop_index_button.clicked.connect(lambda: [
+            self._view_model.drop_index(item.data(Qt.ItemDataRole.UserRole))
+            for item in self.indexes_list.selectedItems()
+        ])
+        self.indexes_dialog.layout().addWidget(self.indexes_list)
+        self.indexes_dialog.layout().addWidget(drop_index_button)
+
+        self.update_indexes_list(self._view_model.get_indexes())
+        self.indexes_dialog.show()
+
+    def close_indexes_dialog(self):
+        self.indexes_dialog = None
+
+    def update_indexes_list(self, indexes: list[dict]):
+        if self.indexes_dialog is None:
+            return
+
+        self.indexes_list.clear()
+        for index in indexes:
+            status = "built" if index["built"] else "pending"
+            item = QListWidgetItem(f"{index['name']}: {index['table']} ({', '.join(index['columns'])}) - {status}")
+            item.setData(Qt.ItemDataRole.UserRole, index["name"])
+            self.indexes_list.addItem(item)
+
+    def show_index_error_message(self, error: str):
+        error_dialog = QMessageBox()
+        error_dialog.setWindowTitle("Index Error")
+        error_dialog.setText("There was an error changing the query indexes.")
+        error_dialog.setInformativeText(error)
+        error_dialog.setIcon(QMessageBox.Icon.Warning)
+        error_dialog.exec()
+
+    def update_export_progress(self, query_id: int, rows_written: int):
+        if query_id in self.result_dialogs:
+            self.result_dialogs[query_id][1].setText(f"Exporting... {rows_written:,} rows written")
+
+    def show_export_finished_message(self, query_id: int, success: bool, path: str):
+        self.update_query_result_status(query_id)
+        if not success:
+            return
+
+        self.export_message_box = QMessageBox()
+        self.export_message_box.setWindowTitle("Query Export")
+        self.export_message_box.setText(f"The query result was exported to {path}.")
+        self.export_message_box.show()
+
+    def show_export_error_message(self, error: str):
+        self.export_message_box = QMessageBox()
+        self.export_message_box.setWindowTitle("Query Export")
+        self.export_message_box.setText("There was an error exporting the query result.")
+        self.export_message_box.setInformativeText(error)
+        self.export_message_box.setIcon(QMessageBox.Icon.Warning)
+        self.export_message_box.show()
 
     def show_query_error_message(self, error: str):
         error_dialog = QMessageBox()
@@ -381,63 +728,189 @@ class DataTableView(AbstractView):
         error_dialog.setIcon(QMessageBox.Icon.Warning)
         error_dialog.exec()
 
-    def handle_data_changed(self, top_left: QModelIndex, bottom_right: QModelIndex):
-        row = top_left.row()
-        new_row_df = self.table_view.model().get_dataframe().iloc[[row]]
+    def handle_row_edited(self, position: int):
+        new_row_df = self.table_view.model().get_dataframe().iloc[[position]]
+        self._view_model.update_row(position, new_row_df)
 
-        # Adjust row for page number
-        row_adjusted = row + (self.page - 1) * self.page_size
+    def get_row_order(self):
+        """Returns the displayed row positions, composed from the cached sort
+        permutation and filter mask, or None when every row is shown in its
+        natural order."""
+        version = (self.table_name, self.table_version)
+        permutation = None
 
-        self._view_model.update_row(row_adjusted, new_row_df)
+        if self.sort_keys:
+            permutation = self.sorter.get_permutation(self.table, self.sort_keys, version)
 
-    def sort_results(self, by: str, ascending: bool):
-        df = self.table_filtered if self.filtered else self.table
+        if not self.filter_expression:
+            return permutation
 
-        if by is None or ascending is None:
-            df.sort_index(ascending=True, inplace=True)
-            self.update_page(1)
-            return
+        return self.table_filter.get_rows(self.table, self.filter_expression, version, permutation)
+
+    def apply_sort(self, sort_keys: list[tuple[str, bool]]):
+        previous_keys = self.sort_keys
+        self.sort_keys = sort_keys
 
-        # Sort the table and update the view
+        # Render through the permutation; the shared table is never reordered
         try:
-            df.sort_values(by, ascending=ascending, inplace=True)
+            self.table_model.set_row_order(self.get_row_order())
+            self.update_sort_indicator()
             self.update_page(1)
         except TypeError as e:
+            self.sort_keys = previous_keys
             self.show_sorting_error_message(str(e))
 
+    def sort_results(self, by: str, ascending: bool):
+        if by is None or ascending is None:
+            self.apply_sort([])
+        else:
+            self.apply_sort([(by, ascending)])
+
+    def on_header_clicked(self, section: int):
+        """Sort by the clicked column, toggling direction on repeated clicks.
+        Shift+click adds the column as an additional tie-breaking sort key."""
+        column = self.table.columns[section]
+        directions = dict(self.sort_keys)
+        ascending = not directions.get(column, False)
+
+        if QApplication.keyboardModifiers() & Qt.KeyboardModifier.ShiftModifier and self.sort_keys:
+            sort_keys = [(key, direction) for key, direction in self.sort_keys if key != column]
+            sort_keys.append((column, ascending))
+        else:
+            sort_keys = [(column, ascending)]
+
+        self.apply_sort(sort_keys)
+
+    def update_sort_indicator(self):
+        header = self.table_view.horizontalHeader()
+        if self.sort_keys:
+            column, ascending = self.sort_keys[0]
+            order = Qt.SortOrder.AscendingOrder if ascending else Qt.SortOrder.DescendingOrder
+            header.setSortIndicatorShown(True)
+            header.setSortIndicator(self.table.columns.get_loc(column), order)
+        else:
+            header.setSortIndicatorShown(False)
+
     def get_sort(self):
         sort = self.sort_dropdown.currentText()
         if sort == "None" or sort == "":
             return None, None
         else:
-            sort = sort.split(" ")
-            sort_by = sort[0]
-            sort_ascending = sort[1] == "(ascending)"
+            sort_by, direction = sort.rsplit(" ", 1)
+            sort_ascending = direction == "(ascending)"
             return sort_by, sort_ascending
 
     def filter_results(self, by: str, value: str):
         if by is None or value is None:
-            self.filtered = False
+            expression = ""
+        else:
+            expression = f"\"{by.replace('"', '""')}\" = '{value.replace("'", "''")}'"
+
+        self.filter_expression_edit.setText(expression)
+        self.apply_filter(expression)
+
+    def apply_filter(self, expression: str):
+        previous_expression = self.filter_expression
+        self.filter_expression = expression.strip()
+
+        # Render through the cached filter mask; no filtered copy of the table is made
+        try:
+            self.table_model.set_row_order(self.get_row_order())
+            self.update_page_limit()
             self.update_page(1)
+        except (ValueError, TypeError) as e:
+            self.filter_expression = previous_expression
+            self.show_filter_error_message(str(e))
+
+    def show_filter_error_message(self, error: str):
+        error_dialog = QMessageBox()
+        error_dialog.setWindowTitle("Filter Error")
+        error_dialog.setText("The filter expression could not be applied.")
+        error_dialog.setInformativeText(error)
+        error_dialog.setIcon(QMessageBox.Icon.Warning)
+        error_dialog.exec()
+
+    def on_find_clicked(self):
+        self.reset_find_hits()
+
+        columns = None
+        if self.find_column_select.currentIndex() > 0:
+            columns = [self.table.columns[self.find_column_select.currentIndex() - 1]]
+
+        self.find_stop_button.setEnabled(True)
+        self._view_model.start_find(self.find_edit.text(), columns, self.find_regex_checkbox.isChecked())
+
+    def reset_find_hits(self):
+        self.find_hit_chunks = []
+        self.find_hits = None
+        self.find_position = -1
+        self.find_status_label.setText("")
+
+    def add_find_hits(self, rows: np.ndarray, columns: np.ndarray):
+        self.find_hit_chunks.append((rows, columns))
+        self.find_hits = None
+
+        # Jump to the first hit as soon as it is found
+        if self.find_position == -1:
+            self.goto_find_hit(1)
+
+    def get_find_hits(self) -> tuple[np.ndarray, np.ndarray]:
+        if self.find_hits is None:
+            if self.find_hit_chunks:
+                self.find_hits = (
+                    np.concatenate([rows for rows, _ in self.find_hit_chunks]),
+                    np.concatenate([columns for _, columns in self.find_hit_chunks])
+                )
+            else:
+                self.find_hits = (np.array([], dtype=int), np.array([], dtype=int))
+        return self.find_hits
+
+    def goto_find_hit(self, step: int):
+        """Select the next or previous hit, skipping hits hidden by the active filter."""
+        rows, columns = self.get_find_hits()
+        if not len(rows) or self.table_model is None:
             return
 
-        # Parse boolean values
-        if value == "True":
-            value = True
-        elif value == "False":
-            value = False
+        position = self.find_position
+        for _ in range(len(rows)):
+            position = (position + step) % len(rows)
+            view_row = self.table_model.map_from_source(int(rows[position]))
+
+            if view_row != -1:
+                self.find_position = position
+                index = self.table_model.index(view_row, int(columns[position]))
+                self.table_view.setCurrentIndex(index)
+                self.table_view.scrollTo(index, QAbstractItemView.ScrollHint.PositionAtCenter)
+                break
+
+        self.update_find_status()
+
+    def update_find_status(self, progress: int = None):
+        hit_count = sum(len(rows) for rows, _ in self.find_hit_chunks)
+        status = f"{self.find_position + 1} of {hit_count} matches"
+        if progress is not None and progress < 100:
+            status += f" (searched {progress}%)"
+        self.find_status_label.setText(status)
+
+    def on_find_finished(self, success: bool):
+        self.find_stop_button.setEnabled(False)
+        if not self.find_hit_chunks:
+            self.find_status_label.setText("No matches" if success else "Search stopped")
+        else:
+            self.update_find_status()
 
-        # Filter the table and update the view
-        self.table_filtered = self.table[self.table[by] == value]
-        self.filtered = True
-        self.update_page(1)
+    def show_find_error_message(self, error: str):
+        error_dialog = QMessageBox()
+        error_dialog.setWindowTitle("Find Error")
+        error_dialog.setText("There was an error searching the table.")
+        error_dialog.setInformativeText(error)
+        error_dialog.setIcon(QMessageBox.Icon.Warning)
+        error_dialog.exec()
 
     def get_filter(self):
         filter_text = self.filter_dropdown.currentText()
         if filter_text == "None" or filter_text == "":
             return None, None
         else:
-            filter_text = filter_text.split(" ")
-            filter_by = filter_text[0]
-            filter_value = filter_text[1].strip("()")
-            return filter_by, filter_value
+            match = re.fullmatch(r"(.*) \((.*)\)", filter_text)
+            return match.group(1), match.group(2)
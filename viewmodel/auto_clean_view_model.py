@@ -1,11 +1,16 @@
+import copy
+import os
+
 from PyQt6.QtCore import pyqtSignal, QThread
 from pandas import DataFrame
 
+from core import Configuration, load_config_file, save_config_file
 from navigation import Screen
-from services import DataCleaningService, AnalyticsService, DatabaseService
-from utils import Configuration, AnalyticsNotifier
+from services import DataCleaningService, AnalyticsService, DatabaseService, apply_config_template, \
+    build_cleaning_plan, select_cleaning_plan
+from utils import AnalyticsNotifier
 from viewmodel import ViewModel
-from workers import CleaningWorker, ScriptWorker
+from workers import BatchCleaningWorker, CleaningWorker, ScriptWorker, FileCleaningWorker
 
 
 class AutoCleanViewModel(ViewModel):
@@ -19,6 +24,14 @@ class AutoCleanViewModel(ViewModel):
     current_step_changed: pyqtSignal = pyqtSignal(str)
     cleaning_stats_updated: pyqtSignal = pyqtSignal(dict)
     script_finished: pyqtSignal = pyqtSignal(bool)
+    script_error: pyqtSignal = pyqtSignal(str)
+    cleaning_plan_changed: pyqtSignal = pyqtSignal(dict)
+    file_cleaning_progress: pyqtSignal = pyqtSignal(int, int)
+    file_cleaning_finished: pyqtSignal = pyqtSignal(bool, dict)
+    batch_started: pyqtSignal = pyqtSignal(list)
+    batch_table_progress: pyqtSignal = pyqtSignal(str, int)
+    batch_table_finished: pyqtSignal = pyqtSignal(str, dict)
+    batch_finished: pyqtSignal = pyqtSignal(dict)
 
     def __init__(
             self,
@@ -41,6 +54,9 @@ class AutoCleanViewModel(ViewModel):
         self.worker = None
         self.worker_thread = None
         self.stats = {}
+        self._file_cleaning_stats = {}
+        self._batch_configs: dict[str, dict] = {}
+        self._batch_summary = {}
 
         # Connect to model updates
         self.database_service.model.data_changed.connect(self.on_data_changed)
@@ -160,6 +176,9 @@ class AutoCleanViewModel(ViewModel):
         self._notifier.analytics_updated.emit(self.analytics_service.analytics_available)
 
     def run_current_config(self):
+        self.run_config(self._cleaning_config, self._analytics_config)
+
+    def run_config(self, cleaning_config: dict, analytics_config: dict):
         self._cleaning_running = True
         self.cleaning_running_changed.emit(self._cleaning_running)
 
@@ -171,11 +190,114 @@ class AutoCleanViewModel(ViewModel):
         self.worker = CleaningWorker(
             self.data_cleaning_service,
             self.analytics_service,
-            self._cleaning_config,
-            self._analytics_config
+            cleaning_config,
+            analytics_config
         )
         self.start_worker(self.on_run_finished, self.cleaning_error, self.progress_updated, self.current_step_changed)
 
+    def replay_config_file(self, config_path: str):
+        """Runs a saved cleaning and analytics configuration on the current
+        table, skipping options for columns the table does not have. The
+        configuration shown for editing is left as it is."""
+        try:
+            cleaning_config, analytics_config = load_config_file(config_path)
+        except (OSError, ValueError) as e:
+            self.cleaning_error.emit(f"Error loading configuration: {str(e)}")
+            return
+
+        columns = list(self.data_cleaning_service.table.columns)
+        analytics_config[Configuration.COLUMNS] = {
+            column: options for column, options in analytics_config[Configuration.COLUMNS].items() if column in columns
+        }
+        self.analytics_service.set_analytics_config(analytics_config)
+        self.run_config(apply_config_template(cleaning_config, columns), analytics_config)
+
+    def clean_file(self, source: str, destination: str):
+        """Applies the current cleaning configuration to a CSV or Parquet file
+        chunk by chunk, writing the cleaned rows to the destination without
+        loading the file into the model."""
+        self._cleaning_running = True
+        self.cleaning_running_changed.emit(self._cleaning_running)
+        self._file_cleaning_stats = {}
+
+        cleaner = self.data_cleaning_service.create_streaming_cleaner(self._cleaning_config)
+        self.worker = FileCleaningWorker(cleaner, source, destination)
+        self.worker.progress.connect(self.file_cleaning_progress.emit)
+        self.worker.stats_ready.connect(lambda stats: setattr(self, "_file_cleaning_stats", stats))
+        self.start_worker(self.on_file_cleaning_finished, self.cleaning_error)
+
+    def on_file_cleaning_finished(self, success: bool):
+        self._cleaning_running = False
+        self.cleaning_running_changed.emit(self._cleaning_running)
+        self.file_cleaning_finished.emit(success, self._file_cleaning_stats)
+
+    def set_batch_config(self, table_name: str, config: dict = None):
+        """Sets the configuration a table uses in batch cleaning, or the
+        current configuration if none is given. Tables without their own
+        configuration use the current one as a template."""
+        self._batch_configs[table_name] = copy.deepcopy(config if config is not None else self._cleaning_config)
+
+    def clear_batch_configs(self):
+        self._batch_configs = {}
+
+    def get_batch_configs(self, table_names: list[str] = None) -> dict[str, dict]:
+        """Returns the configuration of each table for a batch run, matching
+        the current configuration's columns by name for tables that have no
+        configuration of their own."""
+        database = self.data_cleaning_service.model.get_database() or {}
+        if table_names is None:
+            table_names = list(database.keys())
+
+        return {
+            table_name: self._batch_configs[table_name] if table_name in self._batch_configs
+            else apply_config_template(self._cleaning_config, list(database[table_name].columns))
+            for table_name in table_names
+        }
+
+    def run_batch(self, table_names: list[str] = None, max_workers: int = None):
+        """Cleans every table (or the given tables) in the database, several
+        at a time, reporting progress per table and a combined summary."""
+        configs = self.get_batch_configs(table_names)
+        if not configs:
+            return
+
+        self._cleaning_running = True
+        self.cleaning_running_changed.emit(self._cleaning_running)
+        self._batch_summary = {}
+        self.batch_started.emit(list(configs.keys()))
+
+        self.worker = BatchCleaningWorker(
+            self.data_cleaning_service,
+            configs,
+            max_workers or min(len(configs), os.cpu_count() or 1)
+        )
+        self.worker.table_progress.connect(self.batch_table_progress.emit)
+        self.worker.table_finished.connect(self.batch_table_finished.emit)
+        self.worker.summary_ready.connect(lambda summary: setattr(self, "_batch_summary", summary))
+        self.start_worker(self.on_batch_finished, self.cleaning_error)
+
+    def on_batch_finished(self, success: bool):
+        self._cleaning_running = False
+        self.cleaning_running_changed.emit(self._cleaning_running)
+        self.batch_finished.emit(self._batch_summary)
+
+    def preview_cleaning_plan(self):
+        """Builds the cleaning plan for the current configuration without
+        running it, and emits its steps, row estimates and flags."""
+        try:
+            plan = select_cleaning_plan(build_cleaning_plan(self._cleaning_config), self.data_cleaning_service.table)
+        except ValueError as e:
+            self.cleaning_error.emit(f"Error building cleaning plan: {str(e)}")
+            return
+
+        self.cleaning_plan_changed.emit({
+            "steps": plan.describe(),
+            "positions": [step["position"] + 1 for step in plan.steps],
+            "estimated_rows": plan.estimated_rows,
+            "table_rows": self.data_cleaning_service.get_table_length(),
+            "flags": plan.flags
+        })
+
     def on_run_finished(self, success: bool):
         self._cleaning_running = False
         self.cleaning_running_changed.emit(self._cleaning_running)
@@ -186,12 +308,24 @@ class AutoCleanViewModel(ViewModel):
             self.analytics_service.set_analytics_available(True)
             self.emit_analytics_signals()
 
-    def run_script_from_file(self, script_path: str):
-        self.worker = ScriptWorker(self.data_cleaning_service, script_path)
-        self.start_worker(self.on_script_finished)
+    def run_script_from_file(self, script_path: str, in_process: bool = True):
+        """Runs a cleaning script on its table. In process, the result replaces
+        the table in the model; otherwise the script runs as a separate Python
+        process and writes its own output file."""
+        self.worker = ScriptWorker(self.data_cleaning_service, script_path, in_process)
+        self.start_worker(self.on_script_finished, self.script_error)
 
     def on_script_finished(self, success: bool):
         self.script_finished.emit(success)
 
     def save_config_to_file(self, file_path: str):
         self.data_cleaning_service.save_cleaning_script(file_path)
+
+        # Save the configuration as well, so the run can be replayed without the script
+        save_config_file(
+            os.path.join(file_path, "cleaning_config.json"),
+            self._cleaning_config,
+            self._analytics_config,
+            self.data_cleaning_service.table_name,
+            list(self.data_cleaning_service.table.columns)
+        )
@@ -1,10 +1,12 @@
-from PyQt6.QtCore import pyqtSignal
+import time
+
+from PyQt6.QtCore import pyqtSignal, QThread, QTimer
 from pandas import DataFrame
-from pandasql import PandaSQLException
 
 from navigation import Screen
 from services import DataEditorService, QueryService
 from viewmodel import ViewModel
+from workers import FindWorker, QueryWorker, QueryExportWorker
 
 
 class DataViewerViewModel(ViewModel):
@@ -12,10 +14,24 @@ class DataViewerViewModel(ViewModel):
     nav_destination_changed: pyqtSignal = pyqtSignal(Screen)
     data_changed: pyqtSignal = pyqtSignal(dict)
     is_editing_changed: pyqtSignal = pyqtSignal(bool)
-    query_result_changed: pyqtSignal = pyqtSignal(DataFrame)
+    query_started: pyqtSignal = pyqtSignal(int, str)
+    query_elapsed_changed: pyqtSignal = pyqtSignal(int, float)
+    query_finished: pyqtSignal = pyqtSignal(int, bool)
+    query_result_changed: pyqtSignal = pyqtSignal(int, object, object)
+    query_rows_fetched: pyqtSignal = pyqtSignal(int, object)
     query_error_changed: pyqtSignal = pyqtSignal(str)
+    export_progress: pyqtSignal = pyqtSignal(int, int)
+    export_finished: pyqtSignal = pyqtSignal(int, bool, str)
+    export_error: pyqtSignal = pyqtSignal(str)
+    indexes_changed: pyqtSignal = pyqtSignal(list)
+    index_error: pyqtSignal = pyqtSignal(str)
     undo_available_changed: pyqtSignal = pyqtSignal(bool)
     redo_available_changed: pyqtSignal = pyqtSignal(bool)
+    find_hits_found: pyqtSignal = pyqtSignal(object, object)
+    find_progress: pyqtSignal = pyqtSignal(int)
+    find_finished: pyqtSignal = pyqtSignal(bool)
+    find_error: pyqtSignal = pyqtSignal(str)
+    find_restarted: pyqtSignal = pyqtSignal()
 
     def __init__(self, data_editor_service: DataEditorService, query_service: QueryService):
         super().__init__()
@@ -27,6 +43,28 @@ class DataViewerViewModel(ViewModel):
         self._is_editing = False
         self._query_result = None
 
+        # Find thread attributes, keyed by search id until each thread finishes
+        self._find_id = 0
+        self._find_workers: dict[int, tuple[QThread, FindWorker]] = {}
+
+        # Arguments and table version of the running search, which is re-run if the table changes
+        self._find_request: tuple | None = None
+        self._find_version: int | None = None
+
+        # Query thread attributes, keyed by query id until each thread finishes
+        self._query_id = 0
+        self._query_workers: dict[int, tuple[QThread, QueryWorker]] = {}
+        self._query_start_times: dict[int, float] = {}
+        self._query_timer = QTimer()
+        self._query_timer.setInterval(100)
+        self._query_timer.timeout.connect(self.emit_query_elapsed)
+        self._queries: dict[int, str] = {}
+        self._query_cursors: dict[int, object] = {}
+
+        # Export thread attributes, keyed by query id until each thread finishes
+        self._export_workers: dict[int, tuple[QThread, QueryExportWorker]] = {}
+        self._export_paths: dict[int, str] = {}
+
         # Connect to model updates
         self.data_editor_service.model.data_changed.connect(self.on_database_update)
 
@@ -37,14 +75,22 @@ class DataViewerViewModel(ViewModel):
     def on_database_update(self, database: dict[str, DataFrame]):
         if self._table_name:
             self._data = database[self._table_name]
-            self.data_changed.emit({"table_name": self._table_name, "data": self._data.copy(deep=True)})
+            self.emit_data_changed()
+            self.restart_stale_find()
 
     def set_table(self, table_name: str):
         # Set and retrieve table in the service
         self.data_editor_service.set_table(table_name)
         self._table_name = table_name
         self._data = self.data_editor_service.get_current_table()
-        self.data_changed.emit({"table_name": self._table_name, "data": self._data.copy(deep=True)})
+        self.emit_data_changed()
+
+    def emit_data_changed(self):
+        self.data_changed.emit({
+            "table_name": self._table_name,
+            "data": self._data.copy(deep=True),
+            "version": self.data_editor_service.model.get_table_version(self._table_name)
+        })
 
     def toggle_editing(self):
         self._is_editing = not self._is_editing
@@ -59,21 +105,240 @@ class DataViewerViewModel(ViewModel):
         self._data = self.data_editor_service.get_current_table()
         self.emit_update_signals()
 
-    def set_query_result(self, query_result: DataFrame):
-        self._query_result = query_result
-        self.query_result_changed.emit(query_result)
+    def set_query_result(self, query_id: int, query_cursor, first_block: DataFrame):
+        """Publish the cursor streaming a query's result with its first block
+        of rows. The view requests further blocks with fetch_query_rows and
+        closes the cursor with close_query_result."""
+        self._query_result = query_cursor
+        self._query_cursors[query_id] = query_cursor
+        self.query_result_changed.emit(query_id, query_cursor, first_block)
 
-    def execute_query(self, query: str):
-        self.query_service.set_query(query)
-        result = None
+    def fetch_query_rows(self, query_id: int, size: int):
+        """Fetch the next block of a query result on its worker thread. The
+        rows arrive through query_rows_fetched."""
+        if query_id in self._query_workers:
+            self._query_workers[query_id][1].fetch_requested.emit(size)
+        else:
+            # The cursor was exhausted or closed, which stopped its worker
+            query_cursor = self._query_cursors.get(query_id)
+            self.query_rows_fetched.emit(query_id, DataFrame(columns=query_cursor.columns if query_cursor else []))
 
+    def set_pushdown_enabled(self, enabled: bool):
+        self.query_service.set_pushdown_enabled(enabled)
+
+    def create_index(self, table_name: str, columns: list[str]):
+        try:
+            self.query_service.create_index(table_name, columns)
+        except ValueError as e:
+            self.index_error.emit(str(e))
+        self.indexes_changed.emit(self.get_indexes())
+
+    def drop_index(self, index_name: str):
         try:
-            result = self.query_service.execute_query()
-        except PandaSQLException as e:
-            self.query_error_changed.emit(str(e))
+            self.query_service.drop_index(index_name)
+        except ValueError as e:
+            self.index_error.emit(str(e))
+        self.indexes_changed.emit(self.get_indexes())
+
+    def get_indexes(self) -> list[dict]:
+        return self.query_service.get_indexes()
+
+    def get_query_log(self) -> list[dict]:
+        return self.query_service.get_query_log()
+
+    def close_query_result(self, query_id: int):
+        query_cursor = self._query_cursors.pop(query_id, None)
+        if query_id in self._query_workers:
+            # Stop any block being fetched; the worker closes the cursor on its own thread
+            _, worker = self._query_workers[query_id]
+            worker.cancel()
+            worker.close_requested.emit()
+        elif query_cursor is not None:
+            query_cursor.close()
+
+    def execute_query(self, query: str, explain: bool = False) -> int:
+        """Run a query on its own worker thread and return its id. Several
+        queries can run at once; each reports its first rows or error when
+        done. The worker thread keeps streaming the result until its cursor is
+        exhausted or closed. With explain set, the query plan is included in
+        the result profile."""
+        self.query_service.set_query(query)
+
+        self._query_id += 1
+        query_id = self._query_id
+        self._queries[query_id] = query
+        worker = QueryWorker(query_id, self.query_service, query, explain)
+        worker_thread = QThread()
+        worker.moveToThread(worker_thread)
+        self._query_workers[query_id] = (worker_thread, worker)
+        self._query_start_times[query_id] = time.perf_counter()
+
+        # Connect signals and slots
+        worker.result_ready.connect(self.set_query_result)
+        worker.rows_fetched.connect(self.query_rows_fetched)
+        worker.error.connect(self.on_query_error)
+        worker.finished.connect(self.on_query_finished)
+        worker.fetch_requested.connect(worker.fetch)
+        worker.close_requested.connect(worker.close)
+
+        # Thread cleanup, releasing references only once the cursor is done and the thread has stopped
+        worker.closed.connect(worker_thread.quit)
+        worker_thread.finished.connect(lambda: self.release_query_thread(query_id))
+
+        # Connect thread start to worker task
+        worker_thread.started.connect(worker.run)
+
+        # Start worker thread and elapsed time updates
+        worker_thread.start()
+        self._query_timer.start()
+        self.query_started.emit(query_id, query)
+
+        return query_id
+
+    def cancel_query(self, query_id: int):
+        if query_id in self._query_workers:
+            self._query_workers[query_id][1].cancel()
+
+    def get_query_elapsed(self, query_id: int) -> float:
+        return time.perf_counter() - self._query_start_times[query_id]
+
+    def emit_query_elapsed(self):
+        for query_id in self._query_start_times:
+            self.query_elapsed_changed.emit(query_id, self.get_query_elapsed(query_id))
+
+    def on_query_error(self, query_id: int, error: str):
+        self.query_error_changed.emit(error)
+
+    def on_query_finished(self, query_id: int, success: bool):
+        if query_id in self._query_start_times:
+            self.query_elapsed_changed.emit(query_id, self.get_query_elapsed(query_id))
+            del self._query_start_times[query_id]
+
+        if not self._query_start_times:
+            self._query_timer.stop()
+
+        self.query_finished.emit(query_id, success)
+
+    def release_query_thread(self, query_id: int):
+        worker_thread, _ = self._query_workers.pop(query_id, (None, None))
+        if worker_thread:
+            worker_thread.wait()
+
+    def export_query_result(self, query_id: int, path: str):
+        """Write the full result of a query to a CSV file on a worker thread,
+        streaming it in chunks rather than from the rows already shown."""
+        if query_id not in self._queries or query_id in self._export_workers:
+            return
+
+        worker = QueryExportWorker(query_id, self.query_service, self._queries[query_id], path)
+        worker_thread = QThread()
+        worker.moveToThread(worker_thread)
+        self._export_workers[query_id] = (worker_thread, worker)
+        self._export_paths[query_id] = path
+
+        # Connect signals and slots
+        worker.progress.connect(self.export_progress)
+        worker.error.connect(lambda _, error: self.export_error.emit(error))
+        worker.finished.connect(self.on_export_finished)
+
+        # Thread cleanup, releasing references only once the thread has stopped
+        worker.finished.connect(worker_thread.quit)
+        worker_thread.finished.connect(lambda: self.release_export_thread(query_id))
+
+        # Connect thread start to worker task
+        worker_thread.started.connect(worker.run)
+
+        # Start worker thread
+        worker_thread.start()
+
+    def cancel_export(self, query_id: int):
+        if query_id in self._export_workers:
+            self._export_workers[query_id][1].cancel()
+
+    def on_export_finished(self, query_id: int, success: bool):
+        self.export_finished.emit(query_id, success, self._export_paths.pop(query_id, ""))
+
+    def release_export_thread(self, query_id: int):
+        worker_thread, _ = self._export_workers.pop(query_id, (None, None))
+        if worker_thread:
+            worker_thread.wait()
+
+    def start_find(self, pattern: str, columns: list[str] = None, regex: bool = False):
+        """Search the current table on a worker thread, cancelling any search
+        already in progress. Hits are streamed through find_hits_found."""
+        self.cancel_find()
+
+        if not pattern or self._data is None:
+            self.find_finished.emit(False)
+            return
+
+        self._find_id += 1
+        self._find_request = (pattern, columns, regex)
+        self._find_version = self.data_editor_service.model.get_table_version(self._table_name)
+
+        # The worker searches its own copy of this version of the table, so edits made while
+        # it runs cannot change the rows under it
+        worker = FindWorker(self._find_id, self._data, pattern, columns, regex)
+        worker_thread = QThread()
+        worker.moveToThread(worker_thread)
+        self._find_workers[self._find_id] = (worker_thread, worker)
+
+        # Connect signals and slots
+        worker.hits_found.connect(self.on_find_hits_found)
+        worker.progress.connect(self.on_find_progress)
+        worker.error.connect(self.on_find_error)
+        worker.finished.connect(self.on_find_finished)
+
+        # Thread cleanup, releasing references only once the thread has stopped
+        search_id = self._find_id
+        worker.finished.connect(worker_thread.quit)
+        worker_thread.finished.connect(lambda: self.release_find_thread(search_id))
+
+        # Connect thread start to worker task
+        worker_thread.started.connect(worker.run)
+
+        # Start worker thread
+        worker_thread.start()
+
+    def cancel_find(self):
+        self._find_request = None
+        if self._find_id in self._find_workers:
+            self._find_workers[self._find_id][1].cancel()
+
+    def is_find_stale(self) -> bool:
+        """Whether the table changed since the running search took its snapshot."""
+        return self._find_version != self.data_editor_service.model.get_table_version(self._table_name)
+
+    def restart_stale_find(self):
+        """Runs the current search again on the changed table. Hits already
+        found refer to the old version, so the view discards them first."""
+        if self._find_request is None or not self.is_find_stale():
+            return
+
+        self.find_restarted.emit()
+        self.start_find(*self._find_request)
+
+    def on_find_hits_found(self, search_id: int, rows, columns):
+        if search_id == self._find_id and not self.is_find_stale():
+            self.find_hits_found.emit(rows, columns)
+
+    def on_find_progress(self, search_id: int, progress: int):
+        if search_id == self._find_id:
+            self.find_progress.emit(progress)
+
+    def on_find_error(self, search_id: int, error: str):
+        if search_id == self._find_id:
+            self.find_error.emit(error)
+
+    def on_find_finished(self, search_id: int, success: bool):
+        if search_id == self._find_id:
+            self._find_request = None
+            self.find_finished.emit(success)
 
-        if result is not None:
-            self.set_query_result(result)
+    def release_find_thread(self, search_id: int):
+        worker_thread, _ = self._find_workers.pop(search_id, (None, None))
+        if worker_thread:
+            worker_thread.wait()
 
     def undo_change(self):
         self.data_editor_service.undo_change()
@@ -1,4 +1,10 @@
+from .batch_cleaning_worker import BatchCleaningWorker
 from .cleaning_worker import CleaningWorker
+from .database_export_worker import DatabaseExportWorker
 from .database_loader_worker import DatabaseLoaderWorker
+from .file_cleaning_worker import FileCleaningWorker
 from .file_loader_worker import FileLoaderWorker
+from .find_worker import FindWorker
+from .query_export_worker import QueryExportWorker
+from .query_worker import QueryWorker
 from .script_worker import ScriptWorker
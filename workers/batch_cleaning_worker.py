@@ -0,0 +1,33 @@
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from services import DataCleaningService, summarize_batch
+
+
+class BatchCleaningWorker(QObject):
+    finished: pyqtSignal = pyqtSignal(bool)
+    error: pyqtSignal = pyqtSignal(str)
+    table_progress: pyqtSignal = pyqtSignal(str, int)
+    table_finished: pyqtSignal = pyqtSignal(str, dict)
+    summary_ready: pyqtSignal = pyqtSignal(dict)
+
+    def __init__(self, data_cleaning_service: DataCleaningService, configs: dict[str, dict], max_workers: int = 4):
+        super().__init__()
+        self.data_cleaning_service = data_cleaning_service
+        self.configs = configs
+        self.max_workers = max_workers
+
+    def run(self):
+        """Clean every configured table, several at a time, using a separate thread."""
+        try:
+            results = self.data_cleaning_service.clean_tables(
+                self.configs,
+                self.max_workers,
+                self.table_progress.emit,
+                self.table_finished.emit
+            )
+            summary = summarize_batch(results)
+            self.summary_ready.emit(summary)
+            self.finished.emit(not summary["failed"])
+        except Exception as e:
+            self.error.emit(f"Error cleaning tables: {str(e)}")
+            self.finished.emit(False)
@@ -1,8 +1,10 @@
-import pandas as pd
+import os
+
 from PyQt6.QtCore import QObject, pyqtSignal
 
-from services import DataCleaningService, AnalyticsService
-from utils import Configuration
+from core import Configuration
+from services import DataCleaningService, AnalyticsService, build_cleaning_plan, select_cleaning_plan
+from services.cleaning_plan import ROW_FILTERS
 
 
 class CleaningWorker(QObject):
@@ -33,97 +35,19 @@ class CleaningWorker(QObject):
     def run(self):
         """Apply the cleaning and analytics operations using a separate thread."""
         try:
-            self.step.emit("Starting cleaning operations...")
-
-            # Column-specific cleaning
-            for column, options in self.cleaning_config[Configuration.COLUMNS].items():
-                for key, value in options.items():
-                    if key == Configuration.DATA_TYPE:
-                        self.step.emit("Changing data types...")
-                        types_changed = self.data_cleaning_service.set_data_type(column, value)
-                        self.data_types_converted.emit(types_changed)
-                        self.cleaning_operations.emit(self.data_cleaning_service.get_table_length() * types_changed)
-                        self.progress.emit(20)
-                    elif key == Configuration.INT_MIN:
-                        self.step.emit("Removing integer outliers...")
-                        min_int = int(value) if value != "" else float("-inf")
-                        dropped = self.data_cleaning_service.drop_outliers(column, min_int, float("inf"))
-                        self.outliers_removed.emit(dropped)
-                        self.cleaning_operations.emit(dropped)
-                    elif key == Configuration.INT_MAX:
-                        self.step.emit("Removing integer outliers...")
-                        max_int = int(value) if value != "" else float("inf")
-                        dropped = self.data_cleaning_service.drop_outliers(column, float("-inf"), max_int)
-                        self.outliers_removed.emit(dropped)
-                        self.cleaning_operations.emit(dropped)
-                        self.progress.emit(20)
-                    elif key == Configuration.FLOAT_MIN:
-                        self.step.emit("Removing floating point outliers...")
-                        min_float = float(value) if value != "" else float("-inf")
-                        dropped = self.data_cleaning_service.drop_outliers(column, min_float, float("inf"))
-                        self.outliers_removed.emit(dropped)
-                        self.cleaning_operations.emit(dropped)
-                    elif key == Configuration.FLOAT_MAX:
-                        self.step.emit("Removing floating point outliers...")
-                        max_float = float(value) if value != "" else float("inf")
-                        dropped = self.data_cleaning_service.drop_outliers(column, float("-inf"), max_float)
-                        self.outliers_removed.emit(dropped)
-                        self.cleaning_operations.emit(dropped)
-                        self.progress.emit(20)
-                    elif key == Configuration.STRING_MAX:
-                        self.step.emit("Trimming strings...")
-                        max_length = int(value) if value != "" else 1000000
-                        changed = self.data_cleaning_service.truncate_strings(column, max_length)
-                        self.cleaning_operations.emit(changed)
-                        self.progress.emit(20)
-                    elif key == Configuration.DATE_MIN:
-                        self.step.emit("Removing date outliers...")
-                        dropped = self.data_cleaning_service.drop_date_outliers(column, pd.to_datetime(value), pd.to_datetime("2100-01-01"))
-                        self.outliers_removed.emit(dropped)
-                        self.cleaning_operations.emit(dropped)
-                    elif key == Configuration.DATE_MAX:
-                        self.step.emit("Removing date outliers...")
-                        dropped = self.data_cleaning_service.drop_date_outliers(column, pd.to_datetime("1900-01-01"), pd.to_datetime(value))
-                        self.outliers_removed.emit(dropped)
-                        self.cleaning_operations.emit(dropped)
-                        self.progress.emit(20)
-                    elif key == Configuration.CATEGORIES:
-                        self.step.emit("Correcting categories...")
-                        if value != "":
-                            changed = self.data_cleaning_service.autocorrect_categories(column, value.split())
-                            self.cleaning_operations.emit(changed)
-
-            self.progress.emit(50)
-
-            # General cleaning
-            if self.cleaning_config[Configuration.DELETE_DUPLICATES]:
-                self.step.emit("Deleting duplicate records...")
-                dropped = self.data_cleaning_service.drop_duplicates()
-                self.duplicates_removed.emit(dropped)
-                self.cleaning_operations.emit(dropped)
+            # The script is generated from the table before cleaning, so every type conversion is included
+            self.step.emit("Generating cleaning script...")
+            self.data_cleaning_service.generate_cleaning_script(self.cleaning_config)
 
-            self.progress.emit(60)
+            self.step.emit("Starting cleaning operations...")
 
-            if self.cleaning_config[Configuration.DROP_MISSING]:
-                self.step.emit("Dropping records with missing values...")
-                dropped = self.data_cleaning_service.drop_missing_all()
-                self.missing_values_dropped.emit(dropped)
-                self.cleaning_operations.emit(dropped)
-            elif self.cleaning_config[Configuration.IMPUTE_MISSING_MEAN]:
-                self.step.emit("Imputing missing values with mean...")
-                imputed = self.data_cleaning_service.impute_missing_mean_all()
-                self.missing_values_imputed.emit(imputed)
-                self.cleaning_operations.emit(imputed)
-            elif self.cleaning_config[Configuration.IMPUTE_MISSING_MEDIAN]:
-                self.step.emit("Imputing missing values with median...")
-                imputed = self.data_cleaning_service.impute_missing_median_all()
-                self.missing_values_imputed.emit(imputed)
-                self.cleaning_operations.emit(imputed)
-
-            self.progress.emit(75)
+            # Compile the whole configuration and run it in one pass over the table, rewriting independent columns
+            # on every core. Selective filters only move first when that cannot change the results.
+            plan = select_cleaning_plan(build_cleaning_plan(self.cleaning_config), self.data_cleaning_service.table)
+            for flag in plan.flags:
+                self.step.emit(flag)
+            self.data_cleaning_service.execute_cleaning_plan(plan, self.report_cleaning_step, os.cpu_count() or 1)
 
-            self.step.emit("Generating cleaning script...")
-            self.data_cleaning_service.generate_cleaning_script(self.cleaning_config)
             self.progress.emit(80)
 
             self.step.emit("Gathering analytics...")
@@ -167,3 +91,32 @@ class CleaningWorker(QObject):
         except Exception as e:
             self.error.emit(f"Error cleaning data: {str(e)}")
             self.finished.emit(False)
+
+    def report_cleaning_step(self, step: dict, result: dict):
+        """Emits the statistics for one executed step of the cleaning plan."""
+        operation, changed = step["operation"], result["changed"]
+        self.step.emit(step["description"])
+
+        if operation == Configuration.DATA_TYPE:
+            self.data_types_converted.emit(changed)
+            self.cleaning_operations.emit(result["rows"] * changed)
+        elif operation in ROW_FILTERS:
+            self.outliers_removed.emit(changed)
+            self.cleaning_operations.emit(changed)
+        elif operation == Configuration.DELETE_DUPLICATES:
+            self.duplicates_removed.emit(changed)
+            self.cleaning_operations.emit(changed)
+        elif operation == Configuration.DROP_MISSING:
+            self.missing_values_dropped.emit(changed)
+            self.cleaning_operations.emit(changed)
+        elif operation in (Configuration.IMPUTE_MISSING_MEAN, Configuration.IMPUTE_MISSING_MEDIAN):
+            self.missing_values_imputed.emit(changed)
+            self.cleaning_operations.emit(changed)
+        else:
+            self.cleaning_operations.emit(changed)
+
+        # Report the same progress as when each option ran as a separate operation
+        if step["column"] is not None:
+            self.progress.emit(20)
+        else:
+            self.progress.emit(60)
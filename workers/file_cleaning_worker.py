@@ -0,0 +1,41 @@
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from services.streaming_cleaner import StreamingCleaner
+
+
+class FileCleaningWorker(QObject):
+    finished: pyqtSignal = pyqtSignal(bool)
+    error: pyqtSignal = pyqtSignal(str)
+    progress: pyqtSignal = pyqtSignal(int, int)
+    stats_ready: pyqtSignal = pyqtSignal(dict)
+
+    def __init__(self, cleaner: StreamingCleaner, source: str, destination: str):
+        super().__init__()
+        self.cleaner = cleaner
+        self.source = source
+        self.destination = destination
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def run(self):
+        """Clean a file chunk by chunk into the destination using a separate thread."""
+        try:
+            cleaning = self.cleaner.clean_file(self.source, self.destination)
+
+            # Closing the generator early discards the partially written output
+            try:
+                for progress in cleaning:
+                    if self._cancelled:
+                        break
+                    self.progress.emit(progress["pass"], progress["rows_read"])
+            finally:
+                cleaning.close()
+
+            if not self._cancelled:
+                self.stats_ready.emit(self.cleaner.stats)
+            self.finished.emit(not self._cancelled)
+        except Exception as e:
+            self.error.emit(f"Error cleaning file: {str(e)}")
+            self.finished.emit(False)
@@ -0,0 +1,45 @@
+from PyQt6.QtCore import QObject, pyqtSignal
+from pandas import DataFrame
+
+from utils.table_search import iter_table_matches
+
+
+class FindWorker(QObject):
+    finished: pyqtSignal = pyqtSignal(int, bool)
+    error: pyqtSignal = pyqtSignal(int, str)
+    progress: pyqtSignal = pyqtSignal(int, int)
+    hits_found: pyqtSignal = pyqtSignal(int, object, object)
+
+    def __init__(self, search_id: int, table: DataFrame, pattern: str, columns: list[str] = None, regex: bool = False):
+        super().__init__()
+        self.search_id = search_id
+        self.table = table
+        self.pattern = pattern
+        self.columns = columns
+        self.regex = regex
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def run(self):
+        """Search the table in chunks using a separate thread, streaming hits as they are found."""
+        try:
+            # Search a copy, taken here so the GUI thread is not blocked copying large tables.
+            # Edits made while copying change the table version, so the view model drops these hits.
+            table = self.table.copy()
+            total_rows = max(table.shape[0], 1)
+
+            for rows, columns, scanned in iter_table_matches(table, self.pattern, self.columns, self.regex):
+                if self._cancelled:
+                    self.finished.emit(self.search_id, False)
+                    return
+
+                if len(rows):
+                    self.hits_found.emit(self.search_id, rows, columns)
+                self.progress.emit(self.search_id, int(scanned / total_rows * 100))
+
+            self.finished.emit(self.search_id, True)
+        except Exception as e:
+            self.error.emit(self.search_id, f"Error searching table: {str(e)}")
+            self.finished.emit(self.search_id, False)
@@ -0,0 +1,44 @@
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from services import QueryService
+
+
+class QueryExportWorker(QObject):
+    finished: pyqtSignal = pyqtSignal(int, bool)
+    error: pyqtSignal = pyqtSignal(int, str)
+    progress: pyqtSignal = pyqtSignal(int, int)
+
+    def __init__(self, query_id: int, query_service: QueryService, query: str, path: str):
+        super().__init__()
+        self.query_id = query_id
+        self.query_service = query_service
+        self.query = query
+        self.path = path
+        self._connection = None
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+        if self._connection is not None:
+            self.query_service.interrupt(self._connection)
+
+    def run(self):
+        """Write the full query result to a CSV file in chunks using a separate thread."""
+        try:
+            self._connection = self.query_service.open_connection()
+            export = self.query_service.export_query(self.query, self.path, connection=self._connection)
+
+            # Closing the export early removes the partially written file
+            try:
+                for rows_written in export:
+                    if self._cancelled:
+                        break
+                    self.progress.emit(self.query_id, rows_written)
+            finally:
+                export.close()
+
+            self.finished.emit(self.query_id, not self._cancelled)
+        except Exception as e:
+            if not self._cancelled:
+                self.error.emit(self.query_id, f"Error exporting query result: {str(e)}")
+            self.finished.emit(self.query_id, False)
@@ -0,0 +1,91 @@
+from PyQt6.QtCore import QObject, pyqtSignal
+from pandas import DataFrame
+
+from services import QueryService
+
+
+class QueryWorker(QObject):
+    finished: pyqtSignal = pyqtSignal(int, bool)
+    error: pyqtSignal = pyqtSignal(int, str)
+    result_ready: pyqtSignal = pyqtSignal(int, object, object)
+    rows_fetched: pyqtSignal = pyqtSignal(int, object)
+    closed: pyqtSignal = pyqtSignal(int)
+
+    # Requests from the GUI thread, connected to fetch and close once the worker is on its thread
+    fetch_requested: pyqtSignal = pyqtSignal(int)
+    close_requested: pyqtSignal = pyqtSignal()
+
+    def __init__(self, query_id: int, query_service: QueryService, query: str, explain: bool = False,
+                 fetch_size: int = 1000):
+        super().__init__()
+        self.query_id = query_id
+        self.query_service = query_service
+        self.query = query
+        self.explain = explain
+        self.fetch_size = fetch_size
+        self._connection = None
+        self._cursor = None
+        self._cancelled = False
+
+    def cancel(self):
+        """Stop the query or the block being fetched, interrupting the SQL engine or source database."""
+        self._cancelled = True
+        if self._cursor is not None:
+            self._cursor.interrupt()
+        elif self._connection is not None:
+            self.query_service.interrupt(self._connection)
+
+    def run(self):
+        """Run the query and fetch its first block of rows using a separate
+        thread, so the sorting, grouping and scanning done before the first
+        rows arrive never blocks the GUI. The cursor then stays open on this
+        thread, fetching further blocks on request, until it is exhausted or
+        closed. Its row count is known once it is exhausted, so the query is
+        not run a second time to count it."""
+        try:
+            self._connection = self.query_service.open_connection()
+            if self._cancelled:
+                self._connection.close()
+                self.finished.emit(self.query_id, False)
+                self.closed.emit(self.query_id)
+                return
+
+            # The cursor takes ownership of the connection
+            self._cursor = self.query_service.open_cursor(self.query, self._connection, self.explain)
+            block = self._cursor.fetch(self.fetch_size)
+
+            if self._cancelled:
+                self._cursor.close()
+                self.finished.emit(self.query_id, False)
+            else:
+                self.result_ready.emit(self.query_id, self._cursor, block)
+                self.finished.emit(self.query_id, True)
+        except Exception as e:
+            if self._cursor is not None:
+                self._cursor.close()
+            if not self._cancelled:
+                self.error.emit(self.query_id, str(e))
+            self.finished.emit(self.query_id, False)
+
+        if self._cursor is None or self._cursor.exhausted:
+            self.closed.emit(self.query_id)
+
+    def fetch(self, size: int):
+        """Fetch the next block of rows on the worker thread. Every request is
+        answered through rows_fetched, with an empty block once the cursor is
+        exhausted or if the fetch failed."""
+        block = None
+        try:
+            if not self._cancelled:
+                block = self._cursor.fetch(size)
+        except Exception as e:
+            if not self._cancelled:
+                self.error.emit(self.query_id, str(e))
+
+        self.rows_fetched.emit(self.query_id, block if block is not None else DataFrame(columns=self._cursor.columns))
+        if self._cursor.exhausted:
+            self.closed.emit(self.query_id)
+
+    def close(self):
+        self._cursor.close()
+        self.closed.emit(self.query_id)
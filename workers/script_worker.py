@@ -5,12 +5,22 @@ from services import DataCleaningService
 
 class ScriptWorker(QObject):
     finished: pyqtSignal = pyqtSignal(bool)
+    error: pyqtSignal = pyqtSignal(str)
 
-    def __init__(self, data_cleaning_service: DataCleaningService, script_path: str):
+    def __init__(self, data_cleaning_service: DataCleaningService, script_path: str, in_process: bool = True):
         super().__init__()
         self.data_cleaning_service = data_cleaning_service
         self.script_path = script_path
+        self.in_process = in_process
 
     def run(self):
-        success = self.data_cleaning_service.apply_cleaning_script(self.script_path)
-        self.finished.emit(success)
+        """Run a cleaning script using a separate thread."""
+        try:
+            if self.in_process:
+                self.data_cleaning_service.run_cleaning_script(self.script_path)
+            else:
+                self.data_cleaning_service.apply_cleaning_script(self.script_path)
+            self.finished.emit(True)
+        except Exception as e:
+            self.error.emit(str(e))
+            self.finished.emit(False)